@@ -0,0 +1,238 @@
+"""
+Nightly multi-league feature build.
+Each league (football-data division) is built in its own worker process: its
+season CSVs are read by the shared season loader (threads + parsed-season
+cache), concatenated, run through
+league_engine.build_league_features with the division's config and written as
+one consolidated features CSV. Leagues are submitted largest first, so the
+batch takes about as long as its slowest league. Each worker gets a fresh
+process with its address space capped (--max-mem-mb), so one oversized league
+fails on its own instead of taking the machine down. A run summary with
+per-league status, sizes, timings and peak RSS is written next to the outputs.
+
+    python src/batch_build.py                          # every division in league_engine.DIVISIONS
+    python src/batch_build.py SP1 E0 --workers 2 --max-mem-mb 2048
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError: # Windows: no memory cap
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(BASE_DIR)
+sys.path.append(BASE_DIR)
+try:
+    from src.league_engine import DIVISIONS, build_league_features
+    from src.season_loader import load_seasons, MATCH_COLUMNS, LOAD_THREADS
+except ImportError:
+    from league_engine import DIVISIONS, build_league_features
+    from season_loader import load_seasons, MATCH_COLUMNS, LOAD_THREADS
+
+# Where each division's season files live; the rest are looked up in DEFAULT_DATA_DIR
+LEAGUE_DATA_DIRS = {
+    'SP1': os.path.join(BASE_DIR, 'data'),
+    'E0': os.path.join(ROOT_DIR, 'Premier', 'data'),
+}
+DEFAULT_DATA_DIR = os.path.join(ROOT_DIR, 'data', 'football_data')
+DEFAULT_OUT_DIR = os.path.join(ROOT_DIR, 'data', 'features')
+SUMMARY_FILE = 'run_summary.json'
+
+SEASON_PATTERNS = ('{div}_*.csv', '{div}-*.csv') # SP1_2425.csv, E0-2024-25.csv
+DEFAULT_MAX_MEM_MB = 4096
+STAT_COLUMNS = ['HS', 'HST', 'AS', 'AST', 'HF', 'HY', 'HR', 'AF', 'AY', 'AR', 'HC', 'AC']
+
+
+def season_files(data_dir, division):
+    files = set()
+    for pattern in SEASON_PATTERNS:
+        files.update(glob.glob(os.path.join(data_dir, pattern.format(div=division))))
+    return sorted(files)
+
+
+def load_league(files, threads=LOAD_THREADS):
+    """All seasons of one league, chronological. Overlapping files (e.g. *_latest.csv) are de-duplicated."""
+    frames = [f for f in load_seasons(files, threads=threads) if len(f)]
+    if not frames:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    df = df.dropna(subset=['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR'])
+    df = df.drop_duplicates(subset=['Date', 'HomeTeam', 'AwayTeam'], keep='last')
+    for col in STAT_COLUMNS:
+        if col not in df.columns: df[col] = 0
+    # Season start year (Aug 2023 -> 2023, Jan 2024 -> 2023)
+    df['Season'] = df['Date'].dt.year - (df['Date'].dt.month <= 7)
+    return df.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def _peak_rss_mb():
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round((peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024), 1)
+
+
+def _limit_memory(max_mem_mb):
+    if resource is None or not max_mem_mb: return
+    limit = int(max_mem_mb) * 2 ** 20
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY: limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def build_league(division, data_dir, out_dir, load_threads=LOAD_THREADS):
+    """Worker: one league end to end. Always returns a summary dict (errors included)."""
+    config = DIVISIONS[division]
+    result = {'division': division, 'league': config.name, 'status': 'ok', 'files': 0, 'matches': 0}
+    t0 = time.perf_counter()
+    try:
+        files = season_files(data_dir, division)
+        result['files'] = len(files)
+        if not files:
+            result['status'] = 'skipped'
+            result['error'] = f"no season files in {data_dir}"
+            return result
+
+        t = time.perf_counter()
+        df = load_league(files, load_threads)
+        result['load_s'] = round(time.perf_counter() - t, 3)
+        if df.empty:
+            result['status'] = 'skipped'
+            result['error'] = "season files contain no matches"
+            return result
+
+        t = time.perf_counter()
+        df = build_league_features(df, config)
+        result['build_s'] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        os.makedirs(out_dir, exist_ok=True)
+        out_file = os.path.join(out_dir, f'{division}_features.csv')
+        df.to_csv(out_file, index=False)
+        result['write_s'] = round(time.perf_counter() - t, 3)
+
+        result.update({
+            'matches': len(df),
+            'teams': int(pd.concat([df['HomeTeam'], df['AwayTeam']]).nunique()),
+            'seasons': [int(df['Season'].min()), int(df['Season'].max())],
+            'output': out_file,
+        })
+    except MemoryError:
+        result['status'] = 'failed'
+        result['error'] = 'MemoryError (worker memory cap reached)'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    finally:
+        result['wall_s'] = round(time.perf_counter() - t0, 3)
+        result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def _skipped(division, data_dir):
+    return {'division': division, 'league': DIVISIONS[division].name, 'status': 'skipped', 'files': 0,
+            'matches': 0, 'error': f"no season files in {data_dir}", 'wall_s': 0.0}
+
+
+def _log_league(r, log):
+    icon = {'ok': '✅', 'skipped': '⏭️'}.get(r['status'], '❌')
+    detail = f"{r['matches']} matches in {r['wall_s']:.2f}s" if r['status'] == 'ok' else r.get('error', '')
+    log(f"   {icon} {r['division']:<4} {r['league']:<16} {detail}")
+
+
+def run_batch(divisions=None, data_dir=None, out_dir=DEFAULT_OUT_DIR, workers=None,
+              max_mem_mb=DEFAULT_MAX_MEM_MB, load_threads=LOAD_THREADS, log=print):
+    """
+    Builds every division in its own process and writes out_dir/run_summary.json.
+    data_dir overrides the per-league source directories (LEAGUE_DATA_DIRS / DEFAULT_DATA_DIR).
+    """
+    divisions = list(divisions or DIVISIONS)
+    unknown = [d for d in divisions if d not in DIVISIONS]
+    if unknown:
+        raise ValueError(f"Unknown division(s) {unknown}. Known: {sorted(DIVISIONS)}")
+    sources = {d: data_dir or LEAGUE_DATA_DIRS.get(d, DEFAULT_DATA_DIR) for d in divisions}
+    sizes = {d: sum(os.path.getsize(f) for f in season_files(sources[d], d)) for d in divisions}
+    # Largest league first: the batch then finishes close to the slowest single league
+    divisions.sort(key=lambda d: sizes[d], reverse=True)
+    todo = [d for d in divisions if sizes[d]]
+    workers = workers or max(1, min(len(todo), os.cpu_count() or 1))
+
+    started = datetime.now()
+    t0 = time.perf_counter()
+    results = {d: _skipped(d, sources[d]) for d in divisions if not sizes[d]}
+    log(f"🚀 Batch build: {len(todo)}/{len(divisions)} leagues with data, {workers} workers, "
+        f"cap {max_mem_mb or '-'} MB/worker")
+
+    # Fresh spawned process per league: its memory is returned to the OS as soon as it finishes
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, max_tasks_per_child=1,
+                             initializer=_limit_memory, initargs=(max_mem_mb,)) as pool:
+        futures = {pool.submit(build_league, d, sources[d], out_dir, load_threads): d for d in todo}
+        for future in as_completed(futures):
+            d = futures[future]
+            try:
+                r = future.result()
+            except BrokenProcessPool as e:
+                r = {'division': d, 'league': DIVISIONS[d].name, 'status': 'failed',
+                     'error': f"worker died ({e}); memory cap too low?"}
+            except Exception as e:
+                r = {'division': d, 'league': DIVISIONS[d].name, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+            results[d] = r
+            _log_league(r, log)
+    for d in divisions:
+        if not sizes[d]: _log_league(results[d], log)
+
+    summary = {
+        'started': started.isoformat(timespec='seconds'),
+        'wall_s': round(time.perf_counter() - t0, 3),
+        'workers': workers,
+        'max_mem_mb': max_mem_mb,
+        'ok': sum(r['status'] == 'ok' for r in results.values()),
+        'failed': sum(r['status'] == 'failed' for r in results.values()),
+        'leagues': [results[d] for d in divisions],
+    }
+    slowest = max((r.get('wall_s', 0) for r in results.values()), default=0)
+    summary['slowest_league_s'] = slowest
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    log(f"🏁 Batch done in {summary['wall_s']:.2f}s (slowest league {slowest:.2f}s). "
+        f"Summary: {os.path.join(out_dir, SUMMARY_FILE)}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build features for several leagues in parallel.")
+    parser.add_argument('divisions', nargs='*', help=f"Division codes (default: all of {', '.join(DIVISIONS)})")
+    parser.add_argument('--data-dir', help="Directory with the season CSVs of every league (default: per league).")
+    parser.add_argument('--out-dir', default=DEFAULT_OUT_DIR)
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per league, up to the CPU count).")
+    parser.add_argument('--max-mem-mb', type=int, default=DEFAULT_MAX_MEM_MB,
+                        help="Address-space cap per worker in MB (0: no cap).")
+    parser.add_argument('--load-threads', type=int, default=LOAD_THREADS, help="Threads reading season files per league.")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = run_batch(args.divisions, args.data_dir, args.out_dir, args.workers,
+                            args.max_mem_mb, args.load_threads)
+    except ValueError as e:
+        parser.error(str(e))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
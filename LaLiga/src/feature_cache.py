@@ -0,0 +1,82 @@
+"""
+Content-addressed cache for generate_features.
+The key is a hash of the input match rows, the engine version and the static JSON
+files, so an unchanged download returns the stored feature frame instead of
+recomputing it. Entries are pickles in data/cache/features, evicted least
+recently used first once the directory grows past MAX_CACHE_BYTES.
+"""
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+try:
+    from src.feature_engineering import generate_features, static_files_digest, FEATURE_ENGINE_VERSION
+    from src.feature_state import FeatureState
+except ImportError:
+    from feature_engineering import generate_features, static_files_digest, FEATURE_ENGINE_VERSION
+    from feature_state import FeatureState
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def frame_digest(df):
+    """Hash of the column names, dtypes and row values of `df` (order-sensitive, index ignored)."""
+    h = hashlib.sha1()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def cache_key(df, data_dir='data'):
+    h = hashlib.sha1()
+    h.update(FEATURE_ENGINE_VERSION.encode())
+    h.update(static_files_digest(data_dir).encode())
+    h.update(frame_digest(df).encode())
+    return h.hexdigest()
+
+
+def _evict(cache_dir, max_bytes):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.pkl'): continue
+        path = os.path.join(cache_dir, name)
+        st = os.stat(path)
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes: break
+        os.remove(path)
+        total -= size
+
+
+def cached_generate_features(df, return_state=False, data_dir='data', cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+    """generate_features(df, return_state) backed by the on-disk cache."""
+    cache_dir = cache_dir or os.path.join(data_dir, 'cache', 'features')
+    path = os.path.join(cache_dir, cache_key(df, data_dir) + '.pkl')
+
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                features, state_dict = pickle.load(f)
+            os.utime(path) # Mark as recently used
+            if not return_state:
+                return features
+            return features, FeatureState.from_dict(state_dict)
+        except Exception:
+            pass # Corrupt or incompatible entry: rebuild below
+
+    features, state = generate_features(df, return_state=True, data_dir=data_dir)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump((features, state.to_dict()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        _evict(cache_dir, max_bytes)
+    except OSError:
+        pass # Cache is best-effort
+
+    return (features, state) if return_state else features
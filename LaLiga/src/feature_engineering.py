@@ -2,67 +2,65 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import hashlib
+
+try:
+    from src.feature_state import FeatureState
+    from src.tracing import trace, traced
+    from src.league_engine import (LALIGA, side_metrics, long_format, team_rolling, scatter_back,
+                                   h2h_points, rate_matches, POSSESSION_EST)
+except ImportError:
+    from feature_state import FeatureState
+    from tracing import trace, traced
+    from league_engine import (LALIGA, side_metrics, long_format, team_rolling, scatter_back,
+                               h2h_points, rate_matches, POSSESSION_EST)
+
+FEATURE_ENGINE_VERSION = '3.2'
+H2H_WINDOWS = LALIGA.h2h_windows
+
+# Rolling form features: (output column, long-format metric, window, agg, fill for no history),
+# defined with the rest of the LaLiga settings in league_engine.LALIGA.
+ROLLING_SPEC = LALIGA.rolling_spec
+
+# Long-format metric -> (home column, away column) of the per-match values in self.df
+# (the away goal difference is the negated Goal_Diff)
+SIDE_COLUMNS = {
+    'xG': ('PostMatch_Home_xG', 'PostMatch_Away_xG'),
+    'Pts': ('Home_Points', 'Away_Points'),
+    'Press': ('PostMatch_Home_Pressure', 'PostMatch_Away_Pressure'),
+    'GD': ('Goal_Diff', None),
+    'FT': ('PostMatch_Home_Field_Tilt', 'PostMatch_Away_Field_Tilt'),
+    'Dom': ('PostMatch_Home_Dominance', 'PostMatch_Away_Dominance'),
+    'PDO': ('PostMatch_Home_PDO', 'PostMatch_Away_PDO'),
+    'PPDA': ('PostMatch_Home_PPDA_Proxy', 'PostMatch_Away_PPDA_Proxy'),
+}
 
 class ProFeatureEngine:
     def __init__(self, df):
         self.df = df.copy()
         if 'Date' in self.df.columns:
             self.df['Date'] = pd.to_datetime(self.df['Date'], dayfirst=True, errors='coerce')
-        self.df = self.df.sort_values(['Date'])
+        self.df = self.df.sort_values(['Date'], kind='stable')
         
     def _calculate_base_metrics(self):
         # Fallback for older data or missing columns
         for col in ['HS', 'HST', 'AS', 'AST', 'HF', 'HY', 'HR', 'AF', 'AY', 'AR', 'HC', 'AC']:
             if col not in self.df.columns: self.df[col] = 0
 
-        self.df['Home_Points'] = np.where(self.df['FTR'] == 'H', 3, np.where(self.df['FTR'] == 'D', 1, 0))
-        self.df['Away_Points'] = np.where(self.df['FTR'] == 'A', 3, np.where(self.df['FTR'] == 'D', 1, 0))
-        
-        # xG Proxy
-        self.df['PostMatch_Home_xG'] = (self.df['HS'] * 0.09) + (self.df['HST'] * 0.29)
-        self.df['PostMatch_Away_xG'] = (self.df['AS'] * 0.09) + (self.df['AST'] * 0.29)
-        
-        # Goal Diff
-        self.df['Goal_Diff'] = self.df['FTHG'] - self.df['FTAG']
-        
-        # Pressure Proxy
-        self.df['Home_Possession_Est'] = 0.50 
-        self.df['Away_Possession_Est'] = 0.50
-        
-        # Avoid div by zero
-        self.df['PostMatch_Home_Pressure'] = (self.df['HF'] + self.df['HY'] + self.df['HR']) / np.maximum(self.df['Away_Possession_Est'], 0.1)
-        self.df['PostMatch_Away_Pressure'] = (self.df['AF'] + self.df['AY'] + self.df['AR']) / np.maximum(self.df['Home_Possession_Est'], 0.1)
+        # Per-match values (shared league engine formulas, LaLiga config)
+        m = side_metrics(self.df, LALIGA, ['Pts', 'xG', 'GD', 'Press', 'FT', 'Dom', 'PDO', 'PPDA'])
+        self.df['Home_Points'], self.df['Away_Points'] = m['Pts']
+        self.df['PostMatch_Home_xG'], self.df['PostMatch_Away_xG'] = m['xG']
+        self.df['Goal_Diff'] = m['GD'][0]
+        self.df['Home_Possession_Est'] = POSSESSION_EST
+        self.df['Away_Possession_Est'] = POSSESSION_EST
+        self.df['PostMatch_Home_Pressure'], self.df['PostMatch_Away_Pressure'] = m['Press']
 
         # --- BIGDATA ENGINE v3.0 METRICS ---
-        
-        # 1. Field Tilt (Shots + Corners Share)
-        # Denom with epsilon
-        total_actions = self.df['HS'] + self.df['HC'] + self.df['AS'] + self.df['AC']
-        self.df['PostMatch_Home_Field_Tilt'] = (self.df['HS'] + self.df['HC']) / (total_actions + 1e-6)
-        self.df['PostMatch_Away_Field_Tilt'] = (self.df['AS'] + self.df['AC']) / (total_actions + 1e-6)
-
-        # 1.5 Dominance (Corners Share) - NEW LEAKAGE FREE VERSION
-        total_corners = self.df['HC'] + self.df['AC']
-        self.df['PostMatch_Home_Dominance'] = np.where(total_corners > 0, self.df['HC'] / total_corners, 0.5)
-        self.df['PostMatch_Away_Dominance'] = np.where(total_corners > 0, self.df['AC'] / total_corners, 0.5)
-        
-        # 2. PDO (Sustainability)
-        # Formula: (GF / SoT_For) + (1 - (GA / SoT_Against))
-        # Protect against div0
-        h_sot = self.df['HST'].replace(0, 1)
-        a_sot = self.df['AST'].replace(0, 1)
-        
-        self.df['PostMatch_Home_PDO'] = (self.df['FTHG'] / h_sot) + (1 - (self.df['FTAG'] / a_sot))
-        # Away PDO: (Goals_Away/SoT_Away) + (1 - (Goals_Home/SoT_Home))
-        self.df['PostMatch_Away_PDO'] = (self.df['FTAG'] / a_sot) + (1 - (self.df['FTHG'] / h_sot))
-        
-        # 3. PPDA Proxy (Intensidad Presion)
-        # Formula: (Opp_Shots + Opp_Corners) / (My_Fouls + My_Cards + 1)
-        h_def_actions = self.df['HF'] + self.df['HY'] + self.df['HR'] + 1
-        a_def_actions = self.df['AF'] + self.df['AY'] + self.df['AR'] + 1
-        
-        self.df['PostMatch_Home_PPDA_Proxy'] = (self.df['AS'] + self.df['AC']) / h_def_actions
-        self.df['PostMatch_Away_PPDA_Proxy'] = (self.df['HS'] + self.df['HC']) / a_def_actions
+        # Field Tilt, Dominance (corner share, leakage free), PDO (sustainability), PPDA proxy
+        for metric in ('FT', 'Dom', 'PDO', 'PPDA'):
+            home_col, away_col = SIDE_COLUMNS[metric]
+            self.df[home_col], self.df[away_col] = m[metric]
         
         # 4. Market Wisdom (Implied Prob)
         # Check B365 columns
@@ -76,296 +74,345 @@ class ProFeatureEngine:
         else:
             self.df['Away_Market_Wisdom'] = 0.33
         
-    def _rolling_features(self, window=5):
-        # Columns needed for calculation
-        required = ['Date', 'HomeTeam', 'AwayTeam', 'PostMatch_Home_xG', 'PostMatch_Away_xG', 'Home_Points', 'Away_Points', 
-                    'PostMatch_Home_Pressure', 'PostMatch_Away_Pressure', 'Goal_Diff',
-                    'PostMatch_Home_Field_Tilt', 'PostMatch_Away_Field_Tilt',
-                    'PostMatch_Home_Dominance', 'PostMatch_Away_Dominance',
-                    'PostMatch_Home_PDO', 'PostMatch_Away_PDO',
-                    'PostMatch_Home_PPDA_Proxy', 'PostMatch_Away_PPDA_Proxy']
-        
-        # Filter available columns only (in case some are missing in future reuse)
-        required = [c for c in required if c in self.df.columns]
-        
-        df_lite = self.df[required].copy()
-        
-        # Prepare Long Format for GroupBy
-        # Note: Goal Diff for Away team is inverted (FTAG - FTHG = -(FTHG - FTAG))
-        home_side = df_lite[['Date', 'HomeTeam', 'PostMatch_Home_xG', 'Home_Points', 'PostMatch_Home_Pressure', 'Goal_Diff', 'PostMatch_Home_Field_Tilt', 'PostMatch_Home_Dominance', 'PostMatch_Home_PDO', 'PostMatch_Home_PPDA_Proxy']].rename(
-            columns={
-                'HomeTeam': 'Team', 'PostMatch_Home_xG': 'xG', 'Home_Points': 'Pts', 'PostMatch_Home_Pressure': 'Press', 'Goal_Diff': 'GD',
-                'PostMatch_Home_Field_Tilt': 'FT', 'PostMatch_Home_Dominance': 'Dom', 'PostMatch_Home_PDO': 'PDO', 'PostMatch_Home_PPDA_Proxy': 'PPDA'
-            }
-        )
-        away_side = df_lite[['Date', 'AwayTeam', 'PostMatch_Away_xG', 'Away_Points', 'PostMatch_Away_Pressure', 'Goal_Diff', 'PostMatch_Away_Field_Tilt', 'PostMatch_Away_Dominance', 'PostMatch_Away_PDO', 'PostMatch_Away_PPDA_Proxy']].rename(
-            columns={
-                'AwayTeam': 'Team', 'PostMatch_Away_xG': 'xG', 'Away_Points': 'Pts', 'PostMatch_Away_Pressure': 'Press',
-                'PostMatch_Away_Field_Tilt': 'FT', 'PostMatch_Away_Dominance': 'Dom', 'PostMatch_Away_PDO': 'PDO', 'PostMatch_Away_PPDA_Proxy': 'PPDA'
-            }
-        )
-        away_side['GD'] = -away_side['Goal_Diff'] # Invert for Away
-        away_side = away_side.drop(columns=['Goal_Diff'])
-        
-        all_matches = pd.concat([home_side, away_side]).sort_values('Date')
-        grouped = all_matches.groupby('Team')
-        
-        # Rolling Features
-        # Rolling Features
-        all_matches['xG_Avg_L5'] = grouped['xG'].transform(lambda x: x.shift(1).rolling(window, min_periods=1).mean()).fillna(0)
-        all_matches['Streak_L5'] = grouped['Pts'].transform(lambda x: x.shift(1).rolling(window, min_periods=1).sum()).fillna(0)
-        all_matches['Pressure_Avg_L5'] = grouped['Press'].transform(lambda x: x.shift(1).rolling(window, min_periods=1).mean()).fillna(0)
-        all_matches['Goal_Diff_L5'] = grouped['GD'].transform(lambda x: x.shift(1).rolling(window, min_periods=1).sum()).fillna(0)
-        
-        # --- NEW ROLLING ---
-        all_matches['Field_Tilt_L5'] = grouped['FT'].transform(lambda x: x.shift(1).rolling(window, min_periods=1).mean()).fillna(0.5)
-        all_matches['Dominance_Avg_L5'] = grouped['Dom'].transform(lambda x: x.shift(1).rolling(window, min_periods=1).mean()).fillna(0.5)
-        # PDO (Rolling 10 as requested)
-        all_matches['PDO_L5'] = grouped['PDO'].transform(lambda x: x.shift(1).rolling(10, min_periods=1).mean()).fillna(1.0)
-        all_matches['PPDA_Proxy_L5'] = grouped['PPDA'].transform(lambda x: x.shift(1).rolling(window, min_periods=1).mean()).fillna(10.0) # Default mid value
-        
-        # Rest Days
-        all_matches['Last_Date'] = grouped['Date'].shift(1)
-        all_matches['Rest_Days'] = (all_matches['Date'] - all_matches['Last_Date']).dt.days.fillna(7) # Default 7 days
-        all_matches['Rest_Days'] = all_matches['Rest_Days'].clip(upper=30) # Cap at 30
-        
-        # Merge back Home
-        cols_to_merge = ['Date', 'Team', 'xG_Avg_L5', 'Streak_L5', 'Pressure_Avg_L5', 'Goal_Diff_L5', 'Rest_Days', 'Field_Tilt_L5', 'Dominance_Avg_L5', 'PDO_L5', 'PPDA_Proxy_L5']
-        
-        self.df = self.df.merge(
-            all_matches[cols_to_merge],
-            left_on=['Date', 'HomeTeam'], right_on=['Date', 'Team'], how='left'
-        ).rename(columns={
-            'xG_Avg_L5': 'Home_xG_Avg_L5', 
-            'Streak_L5': 'Home_Streak_L5', 
-            'Pressure_Avg_L5': 'Home_Pressure_Avg_L5',
-            'Goal_Diff_L5': 'Home_Goal_Diff_L5',
-            'Rest_Days': 'Home_Rest_Days',
-            'Field_Tilt_L5': 'Home_Field_Tilt_L5',
-            'Dominance_Avg_L5': 'Home_Dominance_Avg_L5',
-            'PDO_L5': 'Home_PDO_L5',
-            'PPDA_Proxy_L5': 'Home_PPDA_Proxy_L5'
-        }).drop(columns=['Team'])
-        
-        # Merge back Away
-        self.df = self.df.merge(
-            all_matches[cols_to_merge],
-            left_on=['Date', 'AwayTeam'], right_on=['Date', 'Team'], how='left'
-        ).rename(columns={
-            'xG_Avg_L5': 'Away_xG_Avg_L5', 
-            'Streak_L5': 'Away_Streak_L5', 
-            'Pressure_Avg_L5': 'Away_Pressure_Avg_L5',
-            'Goal_Diff_L5': 'Away_Goal_Diff_L5',
-            'Rest_Days': 'Away_Rest_Days',
-            'Field_Tilt_L5': 'Away_Field_Tilt_L5',
-            'Dominance_Avg_L5': 'Away_Dominance_Avg_L5',
-            'PDO_L5': 'Away_PDO_L5',
-            'PPDA_Proxy_L5': 'Away_PPDA_Proxy_L5'
-        }).drop(columns=['Team'])
-        
-    def _h2h_features(self, window=3):
-        h2h_home = []
-        h2h_away = []
-        history = {} 
-        
-        for idx, row in self.df.iterrows():
-            h, a = row['HomeTeam'], row['AwayTeam']
-            h_pts = row['Home_Points']
-            a_pts = row['Away_Points']
-            pair = tuple(sorted([h, a]))
-            
-            if pair not in history: history[pair] = []
-            past_games = history[pair]
+    def _long_format(self):
+        """One row per (match, side), chronological, carrying the match row number and a home flag."""
+        # Positional index: long-format rows point back to their match by row number and side
+        self.df.index = pd.RangeIndex(len(self.df))
+        metrics = {}
+        for metric, (home_col, away_col) in SIDE_COLUMNS.items():
+            if home_col not in self.df.columns: continue
+            home = self.df[home_col]
+            metrics[metric] = (home, -home if away_col is None else self.df[away_col])
+        return long_format(self.df, metrics)
+
+    def _rolling_features(self, spec=ROLLING_SPEC):
+        all_matches = team_rolling(self._long_format(), spec, LALIGA.rest_default, LALIGA.rest_cap)
+        scatter_back(self.df, all_matches, [out_col for out_col, _, _, _, _ in spec] + ['Rest_Days'])
+        
+    def _h2h_features(self, windows=(3,)):
+        """Head-to-head form: mean points each side took from the last N meetings of the pair.
+        `windows` may be an int or a tuple (e.g. (3, 5, 10)) and produces one
+        Home_/Away_H2H_L{w} pair per window (see league_engine.h2h_points).
+        """
+        if isinstance(windows, int): windows = (windows,)
+        h2h = h2h_points(self.df['HomeTeam'], self.df['AwayTeam'],
+                         self.df['Home_Points'], self.df['Away_Points'], windows, mode='mean')
+        for w, (home_vals, away_vals) in h2h.items():
+            self.df[f'Home_H2H_L{w}'] = home_vals
+            self.df[f'Away_H2H_L{w}'] = away_vals
+
+    def _rolling_features_from_state(self, state):
+        """Same features as _rolling_features, resuming from the per-team buffers in `state` (O(new rows))."""
+        all_matches = self._long_format()
+        spec = state.spec
+        metrics = list(dict.fromkeys(metric for _, metric, _, _, _ in spec))
+        depth = state.rolling_depth
+        
+        teams = all_matches['Team'].tolist()
+        dates = all_matches['Date'].tolist()
+        values = {m: all_matches[m].tolist() for m in metrics}
+        results = {out_col: [] for out_col, _, _, _, _ in spec}
+        rest_days = []
+        
+        for i, team in enumerate(teams):
+            bufs = state.rolling.setdefault(team, {m: [] for m in metrics})
+            for out_col, metric, win, agg, fill in spec:
+                window = [v for v in bufs[metric][-win:] if v == v] # NaN-skipping, like rolling(min_periods=1)
+                if not window:
+                    results[out_col].append(fill)
+                else:
+                    results[out_col].append(sum(window) / len(window) if agg == 'mean' else sum(window))
             
-            if not past_games:
-                h2h_home.append(1.5) 
-                h2h_away.append(1.5)
-            else:
-                # Home H2H points
-                rel_h = [g_pts_h if g_h == h else g_pts_a for g_h, g_pts_h, g_pts_a in past_games[-window:]]
-                h2h_home.append(np.mean(rel_h))
-                
-                # Away H2H points (inverse of what happened in that game from their perspective)
-                # If H won (3pts), A got 0. If H lost (0pts), A got 3.
-                rel_a = [g_pts_h if g_h == a else g_pts_a for g_h, g_pts_h, g_pts_a in past_games[-window:]]
-                h2h_away.append(np.mean(rel_a))
-                
-            history[pair].append((h, h_pts, a_pts))
+            last = state.last_played.get(team)
+            rest_days.append(min((dates[i] - pd.Timestamp(last)).days, LALIGA.rest_cap) if last else LALIGA.rest_default)
             
-        self.df['Home_H2H_L3'] = h2h_home
-        self.df['Away_H2H_L3'] = h2h_away
+            for m in metrics:
+                bufs[m] = (bufs[m] + [values[m][i]])[-depth:]
+            state.last_played[team] = dates[i].isoformat()
+        
+        for out_col, vals in results.items():
+            all_matches[out_col] = np.array(vals, dtype=float)
+        all_matches['Rest_Days'] = np.array(rest_days, dtype=float)
+        scatter_back(self.df, all_matches, list(results) + ['Rest_Days'])
+
+    def _h2h_features_from_state(self, state):
+        """Same features as _h2h_features, resuming from the pair buffers in `state`."""
+        windows = state.h2h_windows
+        depth = state.h2h_depth
+        out = {w: ([], []) for w in windows}
+        
+        rows = zip(self.df['HomeTeam'].tolist(), self.df['AwayTeam'].tolist(),
+                   self.df['Home_Points'].tolist(), self.df['Away_Points'].tolist())
+        for h, a, h_pts, a_pts in rows:
+            past = state.h2h.setdefault(FeatureState.pair_key(h, a), [])
+            for w in windows:
+                games = past[-w:]
+                if not games:
+                    out[w][0].append(1.5)
+                    out[w][1].append(1.5)
+                else:
+                    out[w][0].append(sum(gh_pts if g_h == h else ga_pts for g_h, gh_pts, ga_pts in games) / len(games))
+                    out[w][1].append(sum(gh_pts if g_h == a else ga_pts for g_h, gh_pts, ga_pts in games) / len(games))
+            past.append([h, h_pts, a_pts])
+            del past[:-depth]
+        
+        for w, (home_vals, away_vals) in out.items():
+            self.df[f'Home_H2H_L{w}'] = np.array(home_vals, dtype=float)
+            self.df[f'Away_H2H_L{w}'] = np.array(away_vals, dtype=float)
+
+    def snapshot(self, state):
+        """Stores the end-of-history rolling, rest-day and H2H buffers of self.df (after run) in `state`."""
+        depth = state.rolling_depth
+        metrics = list(dict.fromkeys(metric for _, metric, _, _, _ in state.spec))
+        
+        tail = self._long_format().groupby('Team', sort=False).tail(depth)
+        state.rolling, state.last_played = {}, {}
+        for team, g in tail.groupby('Team', sort=False):
+            state.rolling[team] = {m: g[m].tolist() for m in metrics}
+            state.last_played[team] = g['Date'].iloc[-1].isoformat()
+        
+        pairs = pd.DataFrame({
+            'key': [FeatureState.pair_key(h, a) for h, a in zip(self.df['HomeTeam'], self.df['AwayTeam'])],
+            'h': self.df['HomeTeam'].to_numpy(),
+            'hp': self.df['Home_Points'].to_numpy(),
+            'ap': self.df['Away_Points'].to_numpy(),
+        }).groupby('key', sort=False).tail(state.h2h_depth)
+        state.h2h = {}
+        for key, h, hp, ap in pairs.itertuples(index=False, name=None):
+            state.h2h.setdefault(key, []).append([h, int(hp), int(ap)])
+        
+        state.last_date = self.df['Date'].max()
+        return state
 
     def run(self):
-        self._calculate_base_metrics()
-        self._rolling_features()
-        self._h2h_features()
+        n = len(self.df)
+        with trace('base_metrics', rows=n): self._calculate_base_metrics()
+        with trace('rolling', rows=n): self._rolling_features()
+        with trace('h2h', rows=n): self._h2h_features(H2H_WINDOWS)
         return self.df
 
-def enrich_static_data(df, data_dir='data'):
-    """Populates FIFA and Market Value using history + new static files."""
-    
-    # Load History
+    def run_incremental(self, state):
+        """run() for matches played after the snapshot in `state`; updates the state in place."""
+        n = len(self.df)
+        with trace('base_metrics', rows=n): self._calculate_base_metrics()
+        with trace('rolling_from_state', rows=n): self._rolling_features_from_state(state)
+        with trace('h2h_from_state', rows=n): self._h2h_features_from_state(state)
+        state.last_date = self.df['Date'].max()
+        return self.df
+
+STATIC_FILES = ('sofifa_history.json', 'transfermarkt_history.json', 'fifa_ratings_2526.json', 'market_values_2526.json')
+
+def _load_json(path, default):
     try:
-        with open(os.path.join(data_dir, 'sofifa_history.json'), 'r', encoding='utf-8') as f: sofifa_hist = json.load(f)
-        with open(os.path.join(data_dir, 'transfermarkt_history.json'), 'r', encoding='utf-8') as f: tm_hist = json.load(f)
+        with open(path, 'r', encoding='utf-8') as f: return json.load(f)
     except:
-        sofifa_hist, tm_hist = {}, {}
-        
-    # Load NEW 25/26 Data
+        return default
+
+def _parse_tm_val(val_str):
+    """Helper to parse old TM format ('€327.50m', '€1.2bn', '€500Th')."""
+    if not isinstance(val_str, str): return 10.0
+    clean = val_str.replace('€', '').replace('m', '').replace('Th', '/1000').strip()
     try:
-        with open(os.path.join(data_dir, 'fifa_ratings_2526.json'), 'r', encoding='utf-8') as f: fifa_now = json.load(f)
-        with open(os.path.join(data_dir, 'market_values_2526.json'), 'r', encoding='utf-8') as f: tm_now = json.load(f)
-    except:
-        fifa_now, tm_now = {}, {}
-        
-    home_fifa, away_fifa = [], []
-    home_val, away_val = [], []
-    
-    # Helper to parse old TM format
-    def parse_tm_val(val_str):
-        if not isinstance(val_str, str): return 10.0
-        clean = val_str.replace('€', '').replace('m', '').replace('Th', '/1000').strip()
-        try:
-            if 'bn' in clean: return float(clean.replace('bn', '')) * 1000
-            if '/1000' in clean: return float(clean.replace('/1000', '')) / 1000
-            return float(clean)
-        except: return 10.0
+        if 'bn' in clean: return float(clean.replace('bn', '')) * 1000
+        if '/1000' in clean: return float(clean.replace('/1000', '')) / 1000
+        return float(clean)
+    except: return 10.0
 
-    def get_hist_val(team, year, dataset, key):
-        if str(year) not in dataset: return None
-        # Simple substring match
-        for item in dataset[str(year)]:
-            if team in item['team'] or item['team'] in team:
-                if key == 'ova': return int(item['ova'])
-                if key == 'value': return parse_tm_val(item.get('value', '0'))
-        return None
+def _get_hist_val(team, year_key, dataset, key):
+    if year_key not in dataset: return None
+    # Simple substring match
+    for item in dataset[year_key]:
+        if team in item['team'] or item['team'] in team:
+            if key == 'ova': return int(item['ova'])
+            if key == 'value': return _parse_tm_val(item.get('value', '0'))
+    return None
 
-    for idx, row in df.iterrows():
-        season = row.get('Season', 2025) # Default to 25/26 if missing
-        h, a = row['HomeTeam'], row['AwayTeam']
-        
-        h_ova, a_ova = 75, 75
-        h_v, a_v = 10.0, 10.0
-        
-        # LOGIC: If Season >= 2025 (2025/26), use NEW JSON. Else Use HISTORY.
-        if season >= 2025:
-            h_ova = fifa_now.get(h, 75)
-            a_ova = fifa_now.get(a, 75)
-            h_v = tm_now.get(h, 50.0)
-            a_v = tm_now.get(a, 50.0)
+def static_files_digest(data_dir):
+    h = hashlib.sha1()
+    for name in STATIC_FILES:
+        path = os.path.join(data_dir, name)
+        h.update(name.encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as f: h.update(f.read())
         else:
-            # Historical Lookup
-            ho = get_hist_val(h, season, sofifa_hist, 'ova')
-            if ho: h_ova = ho
-            ao = get_hist_val(a, season, sofifa_hist, 'ova')
-            if ao: a_ova = ao
-            
-            hv = get_hist_val(h, season, tm_hist, 'value')
-            if hv: h_v = hv
-            av = get_hist_val(a, season, tm_hist, 'value')
-            if av: a_v = av
-            
-        home_fifa.append(h_ova)
-        away_fifa.append(a_ova)
-        home_val.append(h_v)
-        away_val.append(a_v)
-        
-    df['Home_FIFA_Ova'] = home_fifa
-    df['Away_FIFA_Ova'] = away_fifa
-    df['Home_Market_Value'] = home_val
-    df['Away_Market_Value'] = away_val
-    return df
+            h.update(b'missing')
+    return h.hexdigest()[:16]
 
-def calculate_ratings(df):
-    """Calculates Elo and Dixon-Coles-like Attack/Defense ratings iteratively."""
+def build_static_index(keys, data_dir='data'):
+    """
+    Resolves (season_key, team) -> (ova, value) once per distinct pair.
+    season_key is str(Season), as used by the history JSON files.
+    The resolved index is cached on disk (data_dir/cache) keyed by the hash of the static JSON
+    files, so only pairs never seen before need the substring scan over the history.
+    """
+    cache_dir = os.path.join(data_dir, 'cache')
+    digest = static_files_digest(data_dir)
+    cache_file = os.path.join(cache_dir, f'static_index_{digest}.json')
     
-    elo_ratings = {team: 1500 for team in pd.concat([df['HomeTeam'], df['AwayTeam']]).unique()}
-    elo_k = 20
-    defense_ratings = {team: 1.0 for team in elo_ratings.keys()}
-    attack_ratings = {team: 1.0 for team in elo_ratings.keys()}
+    index = {}
+    if os.path.exists(cache_file):
+        for season_key, is_current, team, ova, val in _load_json(cache_file, []):
+            index[(season_key, is_current, team)] = (ova, val)
     
-    h_elo, a_elo = [], []
-    h_att, a_att = [], []
-    h_def, a_def = [], []
+    missing = [k for k in keys if k not in index]
+    if not missing:
+        return index
     
-    dc_lr = 0.01
+    sofifa_hist = _load_json(os.path.join(data_dir, 'sofifa_history.json'), {})
+    tm_hist = _load_json(os.path.join(data_dir, 'transfermarkt_history.json'), {})
+    fifa_now = _load_json(os.path.join(data_dir, 'fifa_ratings_2526.json'), {})
+    tm_now = _load_json(os.path.join(data_dir, 'market_values_2526.json'), {})
     
-    for idx, row in df.iterrows():
-        h, a = row['HomeTeam'], row['AwayTeam']
-        
-        # Snapshot PRE-MATCH ratings
-        he = elo_ratings.get(h, 1500)
-        ae = elo_ratings.get(a, 1500)
-        hat = attack_ratings.get(h, 1.0)
-        hde = defense_ratings.get(h, 1.0)
-        aat = attack_ratings.get(a, 1.0)
-        ade = defense_ratings.get(a, 1.0)
-        
-        h_elo.append(he)
-        a_elo.append(ae)
-        h_att.append(hat)
-        h_def.append(hde)
-        a_att.append(aat)
-        a_def.append(ade)
-        
-        # Skip update if match hasn't been played (FTHG is NaN)
-        # Assuming FTHG NaN means future match
-        if pd.isna(row.get('FTHG')) or pd.isna(row.get('FTR')):
-            continue
-            
-        # --- UPDATE ELO ---
-        score = 1.0 if row['FTR'] == 'H' else (0.5 if row['FTR'] == 'D' else 0.0)
-        dr = ae - (he + 70) # Home Advantage
-        e_prob = 1 / (1 + 10 ** (dr / 400))
-        
-        new_he = he + elo_k * (score - e_prob)
-        new_ae = ae + elo_k * ((1 - score) - (1 - e_prob))
-        
-        elo_ratings[h] = new_he
-        elo_ratings[a] = new_ae
-        
-        # --- UPDATE DIXON-COLES ---
-        fthg = row['FTHG']
-        ftag = row['FTAG']
-        
-        pred_hg = hat * ade
-        pred_ag = aat * hde
-        
-        err_h = fthg - pred_hg
-        err_a = ftag - pred_ag
-        
-        attack_ratings[h] += dc_lr * err_h * ade
-        defense_ratings[a] += dc_lr * err_h * hat
-        
-        attack_ratings[a] += dc_lr * err_a * hde
-        defense_ratings[h] += dc_lr * err_a * aat
-
-    df['Home_Elo'] = h_elo
-    df['Away_Elo'] = a_elo
-    df['Home_Att_Strength'] = h_att
-    df['Away_Att_Strength'] = a_att
-    df['Home_Def_Weakness'] = h_def
-    df['Away_Def_Weakness'] = a_def
+    for season_key, is_current, team in missing:
+        # LOGIC: If Season >= 2025 (2025/26), use NEW JSON. Else Use HISTORY.
+        if is_current:
+            ova = fifa_now.get(team, 75)
+            val = tm_now.get(team, 50.0)
+        else:
+            ova = _get_hist_val(team, season_key, sofifa_hist, 'ova') or 75
+            val = _get_hist_val(team, season_key, tm_hist, 'value') or 10.0
+        index[(season_key, is_current, team)] = (ova, val)
     
-    return df
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop indexes built from older versions of the JSON files
+        for old in os.listdir(cache_dir):
+            if old.startswith('static_index_') and old != os.path.basename(cache_file):
+                os.remove(os.path.join(cache_dir, old))
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump([[*k, *v] for k, v in index.items()], f, ensure_ascii=False)
+    except OSError:
+        pass # Read-only data dir: index is still valid for this run
+    return index
 
-def generate_features(df):
-    """Main pipeline execution."""
-    eng = ProFeatureEngine(df)
-    # 1. Cleanup Duplicates (BigDataEngine v3.0) - Forced Cleanup
-    eng.df = eng.df.loc[:, ~eng.df.columns.duplicated()].copy()
+@traced('static_data')
+def enrich_static_data(df, data_dir='data'):
+    """Populates FIFA and Market Value using history + new static files."""
+    n = len(df)
+    seasons = df['Season'].tolist() if 'Season' in df.columns else [2025] * n # Default to 25/26 if missing
+    
+    # Season flags resolved once per distinct season value
+    season_info = {s: (str(s), bool(s >= 2025)) for s in set(seasons)}
+    season_key = [season_info[s][0] for s in seasons]
+    is_current = [season_info[s][1] for s in seasons]
     
-    df = eng.run()
-    # Ensure cleanup propagates after merge
-    df = df.loc[:, ~df.columns.duplicated()].copy()
+    # Long format (home rows, then away rows) so both sides share one lookup
+    long_keys = pd.DataFrame({
+        'season_key': season_key * 2,
+        'is_current': is_current * 2,
+        'team': df['HomeTeam'].tolist() + df['AwayTeam'].tolist(),
+    })
     
-    df = enrich_static_data(df)
-    df = calculate_ratings(df)
+    index = build_static_index(set(long_keys.itertuples(index=False, name=None)), data_dir)
+    table = pd.DataFrame(
+        [(*k, *v) for k, v in index.items()],
+        columns=['season_key', 'is_current', 'team', 'ova', 'value']
+    )
+    resolved = long_keys.merge(table, on=['season_key', 'is_current', 'team'], how='left')
     
+    df['Home_FIFA_Ova'] = resolved['ova'].to_numpy()[:n]
+    df['Away_FIFA_Ova'] = resolved['ova'].to_numpy()[n:]
+    df['Home_Market_Value'] = resolved['value'].to_numpy()[:n]
+    df['Away_Market_Value'] = resolved['value'].to_numpy()[n:]
+    return df
+
+@traced('ratings')
+def calculate_ratings(df, state=None):
+    """Calculates Elo and Dixon-Coles-like Attack/Defense ratings iteratively.
+    With a FeatureState, starts from its ratings and stores the final ones back."""
+    r = rate_matches(df, LALIGA, init_state=state.ratings if state is not None else None)
+    if state is not None:
+        state.ratings.update(r['state'])
+
+    df['Home_Elo'] = r['home_elo']
+    df['Away_Elo'] = r['away_elo']
+    df['Home_Att_Strength'] = r['home_att']
+    df['Away_Att_Strength'] = r['away_att']
+    df['Home_Def_Weakness'] = r['home_def']
+    df['Away_Def_Weakness'] = r['away_def']
+    
+    return df
+
+def _drop_leakage(df):
     # --- LEAKAGE PROTECTION (BigDataEngine v3.1) ---
     # Drop all 'PostMatch_' columns so they NEVER reach the model/dashboard
     leakage_cols = [c for c in df.columns if c.startswith('PostMatch_')]
     if leakage_cols:
         df = df.drop(columns=leakage_cols)
-        
     return df
+
+def new_feature_state():
+    return FeatureState(FEATURE_ENGINE_VERSION, ROLLING_SPEC, H2H_WINDOWS)
+
+def generate_features(df, return_state=False, data_dir='data'):
+    """Main pipeline execution.
+    With return_state=True also returns the end-of-history FeatureState for update_features."""
+    with trace('generate_features', rows=len(df)):
+        with trace('engine_init', rows=len(df)):
+            eng = ProFeatureEngine(df)
+            # 1. Cleanup Duplicates (BigDataEngine v3.0) - Forced Cleanup
+            eng.df = eng.df.loc[:, ~eng.df.columns.duplicated()].copy()
+        
+        df = eng.run()
+        state = None
+        if return_state:
+            with trace('snapshot', rows=len(df)): state = eng.snapshot(new_feature_state())
+        
+        df = enrich_static_data(df, data_dir)
+        df = calculate_ratings(df, state)
+        df = _drop_leakage(df)
+    
+    return (df, state) if return_state else df
+
+def update_features(df_new, state, data_dir='data'):
+    """
+    Incremental mode: features for matches played after state.last_date, in O(new matches).
+    Resumes Elo/Att/Def, rolling buffers, rest days and H2H from `state` and advances it.
+    Matches on or before the snapshot date need a full rebuild (generate_features).
+    """
+    if not state.is_compatible(FEATURE_ENGINE_VERSION, ROLLING_SPEC, H2H_WINDOWS):
+        raise ValueError("Feature state was built by a different engine version/spec. Run a full rebuild.")
+    
+    with trace('update_features', rows=len(df_new)):
+        eng = ProFeatureEngine(df_new)
+        eng.df = eng.df.loc[:, ~eng.df.columns.duplicated()].copy()
+        if state.last_date is not None and (eng.df['Date'] <= state.last_date).any():
+            raise ValueError(f"update_features only appends matches after {state.last_date.date()}. Run a full rebuild.")
+        
+        df = eng.run_incremental(state)
+        df = enrich_static_data(df, data_dir)
+        df = calculate_ratings(df, state)
+        return _drop_leakage(df)
+
+def check_incremental_consistency(df, n_new=20, atol=1e-9):
+    """
+    Builds `df` in full, then again as (history without the last n_new matches) + update_features(last n_new),
+    and returns the max absolute difference per feature column on the appended matches.
+    Rolling means are summed in a different order, so only float rounding (~1e-15) is expected.
+    """
+    eng = ProFeatureEngine(df)
+    df = eng.df
+    cut = df['Date'].iloc[-n_new]
+    history, new = df[df['Date'] < cut], df[df['Date'] >= cut]
+    
+    full = generate_features(df)
+    _, state = generate_features(history, return_state=True)
+    inc = update_features(new, state)
+    
+    # Both builds keep the (stable) chronological input order, so rows align by position
+    full_new = full[full['Date'] >= cut].reset_index(drop=True)
+    inc = inc.reset_index(drop=True)
+    keys = ['Date', 'HomeTeam', 'AwayTeam']
+    if len(full_new) != len(inc) or not full_new[keys].equals(inc[keys]):
+        return False, {}
+    
+    diffs = {}
+    for c in inc.columns:
+        if c in keys or c not in full_new.columns or not pd.api.types.is_numeric_dtype(inc[c]): continue
+        a, b = full_new[c].astype(float), inc[c].astype(float)
+        if (a.isna() != b.isna()).any():
+            diffs[c] = float('inf')
+        else:
+            diffs[c] = float((a - b).abs().max()) if a.notna().any() else 0.0
+    ok = all(d <= atol for d in diffs.values())
+    return ok, diffs
@@ -0,0 +1,83 @@
+"""
+End-of-history snapshot of the feature engine, so new matchdays can be appended
+without recomputing 25 seasons.
+Holds everything the sequential features depend on:
+  - ratings:     {team: [elo, att, def]} after the last match
+  - rolling:     {team: {metric: [last N long-format values]}} for ROLLING_SPEC
+  - last_played: {team: 'YYYY-MM-DD'} for Rest Days
+  - h2h:         {'TeamA|TeamB': [[home, home_pts, away_pts], ...]} last meetings (sorted pair key)
+  - last_date:   date of the last match covered by the snapshot
+Persisted as JSON next to the rest of the data files.
+"""
+import json
+import os
+
+import pandas as pd
+
+
+class FeatureState:
+    def __init__(self, version, spec, h2h_windows):
+        self.version = version
+        self.spec = [list(s) for s in spec]
+        self.h2h_windows = list(h2h_windows)
+        self.last_date = None
+        self.ratings = {}
+        self.rolling = {}
+        self.last_played = {}
+        self.h2h = {}
+
+    @property
+    def rolling_depth(self):
+        return max(s[2] for s in self.spec)
+
+    @property
+    def h2h_depth(self):
+        return max(self.h2h_windows)
+
+    @staticmethod
+    def pair_key(team_a, team_b):
+        return '|'.join(sorted([team_a, team_b]))
+
+    def is_compatible(self, version, spec, h2h_windows):
+        return (self.version == version
+                and self.spec == [list(s) for s in spec]
+                and self.h2h_windows == list(h2h_windows))
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'spec': self.spec,
+            'h2h_windows': self.h2h_windows,
+            'last_date': None if self.last_date is None else pd.Timestamp(self.last_date).isoformat(),
+            'ratings': self.ratings,
+            'rolling': self.rolling,
+            'last_played': self.last_played,
+            'h2h': self.h2h,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls(d['version'], d['spec'], d['h2h_windows'])
+        state.last_date = None if d['last_date'] is None else pd.Timestamp(d['last_date'])
+        state.ratings = {t: tuple(v) for t, v in d['ratings'].items()}
+        state.rolling = d['rolling']
+        state.last_played = d['last_played']
+        state.h2h = d['h2h']
+        return state
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except (ValueError, KeyError, TypeError):
+            return None
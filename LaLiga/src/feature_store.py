@@ -0,0 +1,217 @@
+"""
+Season-partitioned Parquet store for the engineered feature table.
+Replaces re-parsing df_final_app.csv on every dashboard load:
+  data/feature_store/season=2024/part.parquet
+  data/feature_store/_manifest.json   (column order + per-season content hash)
+Teams/results are stored as categoricals and integer-valued columns (counts,
+streaks) as float32, which holds them exactly; every other float, derived
+features included, stays float64. The table read back is therefore value for
+value the one written, and the incremental update re-exports the same CSV as a
+full rebuild. Only seasons whose content changed are rewritten. Readers can ask for a subset of columns and seasons.
+Needs pyarrow; without it the store is skipped and readers fall back to the CSV.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+STORE_VERSION = 2 # v1 narrowed derived features to float32
+MANIFEST = '_manifest.json'
+PART_FILE = 'part.parquet'
+
+CATEGORICAL_COLUMNS = ('HomeTeam', 'AwayTeam', 'FTR', 'Div')
+
+
+def season_of(df):
+    """Partition key per row: the Season column when set, else the season start year from Date (Jul-Jun)."""
+    dates = pd.to_datetime(df['Date'])
+    derived = dates.dt.year - (dates.dt.month < 7).astype(int)
+    if 'Season' in df.columns:
+        derived = pd.to_numeric(df['Season'], errors='coerce').fillna(derived)
+    return derived.astype(int)
+
+
+def _is_small_int(s):
+    # Whole numbers below 2**24 round-trip exactly through float32 (NaN allowed)
+    v = s.dropna().to_numpy()
+    return bool(np.all(np.mod(v, 1) == 0) and np.all(np.abs(v) < 2 ** 24))
+
+
+def store_dtypes(df):
+    """Explicit on-disk dtype per column."""
+    dtypes = {}
+    for col in df.columns:
+        s = df[col]
+        if col == 'Date':
+            dtypes[col] = 'datetime64[ns]'
+        elif col in CATEGORICAL_COLUMNS:
+            dtypes[col] = 'category'
+        elif pd.api.types.is_bool_dtype(s) or not pd.api.types.is_numeric_dtype(s):
+            dtypes[col] = s.dtype
+        elif pd.api.types.is_integer_dtype(s) and s.min() >= -32768 and s.max() <= 32767:
+            dtypes[col] = 'int16'
+        elif _is_small_int(s):
+            dtypes[col] = 'float32'
+        else:
+            dtypes[col] = 'float64'
+    return dtypes
+
+
+def _partition_digest(part):
+    h = hashlib.sha1()
+    h.update(repr([(str(c), str(t)) for c, t in part.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _load_manifest(store_dir):
+    try:
+        with open(os.path.join(store_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == STORE_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def write_store(df, store_dir, csv_path=None, dtypes=None):
+    """
+    Writes `df` as one Parquet file per season, skipping seasons whose content is
+    unchanged since the last write. Optionally exports the full table as CSV too.
+    `dtypes` overrides the on-disk types (default: store_dtypes).
+    Returns the list of seasons that were (re)written.
+    """
+    if csv_path:
+        df.to_csv(csv_path, index=False)
+    if not HAS_PARQUET:
+        print("⚠️ pyarrow not installed: feature store skipped (CSV only).")
+        return []
+
+    typed = df.astype(store_dtypes(df) if dtypes is None else dtypes)
+    seasons = season_of(df).to_numpy()
+    old = _load_manifest(store_dir) or {'seasons': {}}
+    manifest = {'version': STORE_VERSION, 'columns': list(typed.columns),
+                'dtypes': {c: str(t) for c, t in typed.dtypes.items()}, 'seasons': {}}
+
+    os.makedirs(store_dir, exist_ok=True)
+    written = []
+    for season in np.unique(seasons):
+        part = typed[seasons == season].reset_index(drop=True)
+        # Categories are re-derived per partition so a season file only lists its own teams
+        for col in part.columns:
+            if isinstance(part[col].dtype, pd.CategoricalDtype):
+                part[col] = part[col].cat.remove_unused_categories()
+        key = str(int(season))
+        digest = _partition_digest(part)
+        manifest['seasons'][key] = {'rows': len(part), 'digest': digest}
+        path = os.path.join(store_dir, f'season={key}', PART_FILE)
+        if old['seasons'].get(key, {}).get('digest') == digest and os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part.to_parquet(path + '.tmp', index=False, engine='pyarrow')
+        os.replace(path + '.tmp', path)
+        written.append(int(season))
+
+    # Drop seasons that disappeared from the table
+    for key in set(old['seasons']) - set(manifest['seasons']):
+        shutil.rmtree(os.path.join(store_dir, f'season={key}'), ignore_errors=True)
+
+    tmp = os.path.join(store_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(store_dir, MANIFEST))
+    return written
+
+
+def store_seasons(store_dir):
+    manifest = _load_manifest(store_dir)
+    return sorted(int(s) for s in manifest['seasons']) if manifest else []
+
+
+def read_store(store_dir, columns=None, seasons=None):
+    """
+    Loads the feature table from the store. `columns` restricts the columns read
+    from disk (unknown names are ignored), `seasons` the partitions opened.
+    Returns None if there is no usable store.
+    """
+    if not HAS_PARQUET:
+        return None
+    manifest = _load_manifest(store_dir)
+    if manifest is None:
+        return None
+
+    if columns is not None:
+        wanted = set(columns)
+        columns = [c for c in manifest['columns'] if c in wanted]
+    keys = sorted(manifest['seasons'], key=int)
+    if seasons is not None:
+        wanted_seasons = {int(s) for s in seasons}
+        keys = [k for k in keys if int(k) in wanted_seasons]
+
+    # One Arrow table per season, converted to pandas once (categories unified by Arrow)
+    tables = [pq.read_table(os.path.join(store_dir, f'season={k}', PART_FILE), columns=columns) for k in keys]
+    if not tables:
+        cols = columns if columns is not None else manifest['columns']
+        return pd.DataFrame({c: pd.Series(dtype=manifest['dtypes'][c]) for c in cols})
+
+    df = pa.concat_tables(tables, promote_options='default').unify_dictionaries().to_pandas()
+    if 'Date' in df.columns:
+        df = df.sort_values('Date', kind='stable').reset_index(drop=True)
+    return df
+
+
+def load_features(store_dir, csv_path, columns=None, seasons=None):
+    """read_store with a fallback to the CSV export (same column/season selection, parsed Date)."""
+    df = None
+    try:
+        df = read_store(store_dir, columns=columns, seasons=seasons)
+    except Exception as e:
+        print(f"⚠️ Feature store unreadable ({e}). Falling back to CSV.")
+    if df is not None:
+        return df
+
+    wanted = None if columns is None else set(columns)
+    usecols = None if wanted is None else (lambda c: c in wanted or c in ('Date', 'Season'))
+    df = pd.read_csv(csv_path, usecols=usecols)
+    df['Date'] = pd.to_datetime(df['Date'])
+    if seasons is not None:
+        df = df[season_of(df).isin([int(s) for s in seasons]).to_numpy()].reset_index(drop=True)
+    if wanted is not None:
+        df = df[[c for c in df.columns if c in wanted]]
+    return df
+
+
+def map_team_names(df, mapping):
+    """Renames HomeTeam/AwayTeam through `mapping` (unmapped names kept), categorical or not."""
+    for col in ('HomeTeam', 'AwayTeam'):
+        if col not in df.columns: continue
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # Map the few categories instead of every row
+            cats = s.cat.categories
+            renamed = pd.Index([mapping.get(t, t) for t in cats])
+            df[col] = pd.Categorical(renamed[s.cat.codes.to_numpy()].where(s.cat.codes.to_numpy() >= 0))
+        else:
+            df[col] = s.map(mapping).fillna(s)
+    return df
+
+
+if __name__ == "__main__":
+    # One-off migration: build the store from the existing CSV export
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    csv_file = os.path.join(base_dir, 'df_final_app.csv')
+    df_csv = pd.read_csv(csv_file)
+    df_csv['Date'] = pd.to_datetime(df_csv['Date'])
+    seasons_written = write_store(df_csv, os.path.join(base_dir, 'data', 'feature_store'))
+    print(f"✅ Feature store written: {len(seasons_written)} seasons from {csv_file}")
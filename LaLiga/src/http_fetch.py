@@ -0,0 +1,199 @@
+"""
+Conditional, cached HTTP downloads (football-data.co.uk season CSVs).
+Every URL has a local copy plus a small sidecar (<file>.meta.json) with its
+ETag / Last-Modified, so the next fetch is a conditional GET: an unchanged
+file costs one 304 round-trip and is served from disk. One pooled
+requests.Session is shared by all fetches (keep-alive), transient failures
+(connection errors, timeouts, 429/5xx) are retried with full-jitter
+exponential backoff, and if the server stays unreachable the last good copy
+is returned as 'stale'. fetch_many downloads several seasons/divisions
+concurrently.
+
+    fetcher = CachedFetcher('data/cache/http')
+    res = fetcher.fetch(season_url('SP1', 2024))
+    res.status   # 'fetched' | 'not_modified' | 'stale' | 'error'
+    res.changed  # body differs from the previous local copy
+    res.sha1     # digest of the local copy
+
+    python src/http_fetch.py --divisions SP1 E0 --seasons 2023 2024 --dest ../data/football_data
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Overridable so tests and mirrors can point at a local stand-in server
+FOOTBALL_DATA_BASE_URL = os.environ.get('FOOTBALL_DATA_BASE_URL', 'https://www.football-data.co.uk/mmz4281')
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, 'data', 'cache', 'http')
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+META_SUFFIX = '.meta.json'
+
+
+def season_url(division, season, base_url=None):
+    """football-data URL of a season CSV: season 2024 (2024/25) -> .../2425/SP1.csv"""
+    code = f'{season % 100:02d}{(season + 1) % 100:02d}'
+    return f"{(base_url or FOOTBALL_DATA_BASE_URL).rstrip('/')}/{code}/{division}.csv"
+
+
+class FetchResult:
+    __slots__ = ('url', 'path', 'status', 'changed', 'sha1', 'http_status', 'attempts', 'error')
+
+    def __init__(self, url, path, status, changed=False, sha1=None, http_status=None, attempts=0, error=None):
+        self.url = url
+        self.path = path
+        self.status = status
+        self.changed = changed
+        self.sha1 = sha1
+        self.http_status = http_status
+        self.attempts = attempts
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status in ('fetched', 'not_modified', 'stale')
+
+    def content(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def __repr__(self):
+        return f"FetchResult({self.url!r}, {self.status!r}, changed={self.changed})"
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class CachedFetcher:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, timeout=10, retries=3, backoff=0.5, max_backoff=8.0,
+                 pool_size=8, session=None):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def local_path(self, url):
+        """Cache file for `url`: <cache_dir>/<path segments joined by '_'> (e.g. 2425_SP1.csv)."""
+        parts = [p for p in urlsplit(url).path.split('/') if p]
+        name = '_'.join(parts[-2:]) if parts else hashlib.sha1(url.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, name)
+
+    def _load_meta(self, path):
+        try:
+            with open(path + META_SUFFIX, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, path, body, meta):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        for target, data in ((path, body), (path + META_SUFFIX, json.dumps(meta, indent=1).encode())):
+            tmp = f'{target}.tmp{os.getpid()}'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, target)
+
+    def _sleep(self, attempt, retry_after=None):
+        if retry_after is not None:
+            delay = min(self.max_backoff, retry_after)
+        else:
+            # Full jitter: uniform(0, min(cap, base * 2^attempt))
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        time.sleep(delay)
+
+    def fetch(self, url, dest=None):
+        """Conditional GET of `url` into `dest` (default: local_path(url))."""
+        path = dest or self.local_path(url)
+        meta = self._load_meta(path) if os.path.exists(path) else {}
+        headers = {}
+        if meta.get('etag'): headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'): headers['If-Modified-Since'] = meta['last_modified']
+
+        error, http_status = None, None
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                resp = self.session.get(url, headers=headers, timeout=self.timeout)
+                http_status = resp.status_code
+                if resp.status_code == 304 and meta:
+                    return FetchResult(url, path, 'not_modified', False, meta.get('sha1'), 304, attempt + 1)
+                if resp.status_code == 200:
+                    body = resp.content
+                    sha1 = _digest(body)
+                    self._store(path, body, {
+                        'url': url,
+                        'etag': resp.headers.get('ETag'),
+                        'last_modified': resp.headers.get('Last-Modified'),
+                        'sha1': sha1,
+                        'size': len(body),
+                        'fetched_at': datetime.now().isoformat(timespec='seconds'),
+                    })
+                    return FetchResult(url, path, 'fetched', sha1 != meta.get('sha1'), sha1, 200, attempt + 1)
+                error = f"HTTP {resp.status_code}"
+                if resp.status_code not in RETRY_STATUS:
+                    break
+                ra = resp.headers.get('Retry-After')
+                retry_after = float(ra) if ra and ra.isdigit() else None
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt < self.retries:
+                self._sleep(attempt, retry_after)
+
+        if meta and os.path.exists(path):
+            # Server unreachable: last good copy
+            return FetchResult(url, path, 'stale', False, meta.get('sha1'), http_status, attempt + 1, error)
+        return FetchResult(url, None, 'error', False, None, http_status, attempt + 1, error)
+
+    def fetch_many(self, urls, dests=None, workers=4):
+        """fetch() for several URLs concurrently (shared connection pool). Returns {url: FetchResult}."""
+        urls = list(urls)
+        dests = list(dests) if dests is not None else [None] * len(urls)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+            results = pool.map(lambda job: self.fetch(*job), zip(urls, dests))
+            return dict(zip(urls, results))
+
+
+def download_seasons(divisions, seasons, dest_dir, fetcher=None, workers=4, base_url=None):
+    """Season CSVs as <dest_dir>/<DIV>_<yyyy>.csv (the batch_build naming), fetched in parallel."""
+    fetcher = fetcher or CachedFetcher(dest_dir)
+    jobs = [(season_url(d, s, base_url), os.path.join(dest_dir, f'{d}_{s % 100:02d}{(s + 1) % 100:02d}.csv'))
+            for d in divisions for s in seasons]
+    return fetcher.fetch_many([u for u, _ in jobs], [p for _, p in jobs], workers=workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download football-data season CSVs (conditional, cached).")
+    parser.add_argument('--divisions', nargs='+', default=['SP1'])
+    parser.add_argument('--seasons', type=int, nargs='+', required=True, help="Season start years, e.g. 2023 2024")
+    parser.add_argument('--dest', default=os.path.join(os.path.dirname(BASE_DIR), 'data', 'football_data'))
+    parser.add_argument('--base-url', default=None, help=f"Default: {FOOTBALL_DATA_BASE_URL}")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    results = download_seasons(args.divisions, args.seasons, args.dest, workers=args.workers, base_url=args.base_url)
+    for url, r in results.items():
+        icon = {'fetched': '⬇️', 'not_modified': '✔️', 'stale': '⚠️'}.get(r.status, '❌')
+        print(f"   {icon} {r.status:<12} {url}" + (f"  ({r.error})" if r.error else ''))
+    return 0 if all(r.ok for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
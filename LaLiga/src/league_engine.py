@@ -0,0 +1,431 @@
+"""
+League-agnostic feature engine.
+A LeagueConfig holds everything that differs between leagues/pipelines (xG
+weights, pressure formula, rolling windows, Elo K and home advantage, H2H
+window, team alias table); the vectorized building blocks below turn a
+football-data match frame (HomeTeam, AwayTeam, FTHG, FTAG, FTR, HS, ...) into
+pre-match Home_/Away_ feature columns for any of them:
+
+    normalize_teams -> side_metrics -> long_format -> team_rolling -> scatter_back
+                                                   -> h2h_points
+                                                   -> rate_matches (shared Elo/Att/Def kernel)
+
+build_league_features chains them. LaLiga's ProFeatureEngine and the Premier
+scripts are wrappers that add their own extras (static data, exports), so a
+new league only needs a config here.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+try:
+    from src.rating_kernel import compute_ratings
+except ImportError:
+    from rating_kernel import compute_ratings
+
+POSSESSION_EST = 0.50 # No possession data in football-data CSVs: both sides assumed 50%
+
+
+class LeagueConfig:
+    """
+    rolling_spec: (output column, long-format metric, window, agg, fill for no history).
+    h2h_mode: 'mean'    -> mean points of each side over the last h2h_windows meetings (fill 1.5)
+              'entries' -> points summed over the last N (team, points) entries of the pair,
+                           two entries per meeting (consolidated Premier dataset)
+    xg_fallback: (goals weight, constant) when shot columns are missing; None -> shots count as 0.
+    rest_cap: upper bound for rest days (None: uncapped).
+    """
+    def __init__(self, name, division, rolling_spec, xg_weights=(0.09, 0.29), xg_fallback=None,
+                 pressure='fouls_cards', pressure_fallback=None, points_from='FTR',
+                 elo_k=20, home_adv=70, dc_lr=0.01, h2h_windows=(3,), h2h_mode='mean',
+                 rest_default=7, rest_cap=30, team_aliases=None):
+        self.name = name
+        self.division = division
+        self.rolling_spec = [tuple(s) for s in rolling_spec]
+        self.xg_weights = xg_weights
+        self.xg_fallback = xg_fallback
+        self.pressure = pressure
+        self.pressure_fallback = pressure_fallback
+        self.points_from = points_from
+        self.elo_k = elo_k
+        self.home_adv = home_adv
+        self.dc_lr = dc_lr
+        self.h2h_windows = tuple(h2h_windows)
+        self.h2h_mode = h2h_mode
+        self.rest_default = rest_default
+        self.rest_cap = rest_cap
+        self.team_aliases = team_aliases or {}
+
+    def __repr__(self):
+        return f"LeagueConfig({self.name!r}, {self.division!r})"
+
+
+# --- Per-match metrics: name -> fn(df, config) -> (home values, away values) ---
+
+def _has(df, cols):
+    return all(c in df.columns for c in cols)
+
+def match_points(df, config):
+    if config.points_from == 'goals':
+        hg, ag = df['FTHG'], df['FTAG']
+        return (np.where(hg > ag, 3, np.where(hg == ag, 1, 0)),
+                np.where(ag > hg, 3, np.where(ag == hg, 1, 0)))
+    return (np.where(df['FTR'] == 'H', 3, np.where(df['FTR'] == 'D', 1, 0)),
+            np.where(df['FTR'] == 'A', 3, np.where(df['FTR'] == 'D', 1, 0)))
+
+def xg_proxy(df, config):
+    shots_w, sot_w = config.xg_weights
+    if _has(df, ('HS', 'HST', 'AS', 'AST')) or config.xg_fallback is None:
+        return (df['HS'] * shots_w) + (df['HST'] * sot_w), (df['AS'] * shots_w) + (df['AST'] * sot_w)
+    goals_w, const = config.xg_fallback
+    return df['FTHG'] * goals_w + const, df['FTAG'] * goals_w + const
+
+def _pressure_fouls_cards(df):
+    # Defensive actions per unit of opponent possession
+    return ((df['HF'] + df['HY'] + df['HR']) / POSSESSION_EST,
+            (df['AF'] + df['AY'] + df['AR']) / POSSESSION_EST)
+
+def _pressure_shot_ratio(df):
+    return ((df['HS'] + df['HST']) / (df['AS'] + df['AST'] + 1),
+            (df['AS'] + df['AST']) / (df['HS'] + df['HST'] + 1))
+
+def _pressure_corner_share(df):
+    total_c = df['HC'] + df['AC']
+    return (df['HC'] / total_c * 100).fillna(50), (df['AC'] / total_c * 100).fillna(50)
+
+# name -> (required columns, formula)
+PRESSURE_FORMULAS = {
+    'fouls_cards': (('HF', 'HY', 'HR', 'AF', 'AY', 'AR'), _pressure_fouls_cards),
+    'shot_ratio': (('HS', 'HST', 'AS', 'AST'), _pressure_shot_ratio),
+    'corner_share': (('HC', 'AC'), _pressure_corner_share),
+}
+
+def pressure_proxy(df, config):
+    required, formula = PRESSURE_FORMULAS[config.pressure]
+    if not _has(df, required) and config.pressure_fallback is not None:
+        fill = np.full(len(df), config.pressure_fallback)
+        return fill, fill.copy()
+    return formula(df)
+
+def _goal_diff(df, config):
+    return df['FTHG'] - df['FTAG'], df['FTAG'] - df['FTHG']
+
+def _field_tilt(df, config):
+    # Shots + corners share, epsilon-protected
+    total_actions = df['HS'] + df['HC'] + df['AS'] + df['AC']
+    return (df['HS'] + df['HC']) / (total_actions + 1e-6), (df['AS'] + df['AC']) / (total_actions + 1e-6)
+
+def _corner_dominance(df, config):
+    total_corners = df['HC'] + df['AC']
+    return (np.where(total_corners > 0, df['HC'] / total_corners, 0.5),
+            np.where(total_corners > 0, df['AC'] / total_corners, 0.5))
+
+def _pdo(df, config):
+    # (GF / SoT_For) + (1 - GA / SoT_Against), SoT of 0 counted as 1
+    h_sot = df['HST'].replace(0, 1)
+    a_sot = df['AST'].replace(0, 1)
+    return (df['FTHG'] / h_sot) + (1 - (df['FTAG'] / a_sot)), (df['FTAG'] / a_sot) + (1 - (df['FTHG'] / h_sot))
+
+def _ppda(df, config):
+    # (Opp_Shots + Opp_Corners) / (My_Fouls + My_Cards + 1)
+    h_def_actions = df['HF'] + df['HY'] + df['HR'] + 1
+    a_def_actions = df['AF'] + df['AY'] + df['AR'] + 1
+    return (df['AS'] + df['AC']) / h_def_actions, (df['HS'] + df['HC']) / a_def_actions
+
+SIDE_METRICS = {
+    'Pts': match_points,
+    'xG': xg_proxy,
+    'Press': pressure_proxy,
+    'GD': _goal_diff,
+    'GF': lambda df, config: (df['FTHG'], df['FTAG']),
+    'GA': lambda df, config: (df['FTAG'], df['FTHG']),
+    'FT': _field_tilt,
+    'Dom': _corner_dominance,
+    'PDO': _pdo,
+    'PPDA': _ppda,
+}
+
+def side_metrics(df, config, names=None):
+    """{metric: (home values, away values)} for `names` (default: the metrics of config.rolling_spec)."""
+    if names is None:
+        names = dict.fromkeys(metric for _, metric, _, _, _ in config.rolling_spec)
+    return {m: SIDE_METRICS[m](df, config) for m in names}
+
+
+# --- Team names ---
+
+def normalize_teams(df, aliases, columns=('HomeTeam', 'AwayTeam')):
+    """Strips names and maps aliases to the canonical name, once per distinct name."""
+    if not aliases: return df
+    for col in columns:
+        codes, uniques = pd.factorize(df[col])
+        canonical = np.array([aliases.get(u.strip(), u.strip()) if isinstance(u, str) else u for u in uniques],
+                             dtype=object)
+        out = df[col].to_numpy(dtype=object).copy()
+        known = codes >= 0
+        out[known] = canonical[codes[known]]
+        df[col] = out
+    return df
+
+
+# --- Long format, rolling windows, scatter back ---
+
+def group_starts(sorted_keys):
+    """For an array sorted by group, the position where each row's group begins."""
+    pos = np.arange(len(sorted_keys))
+    if not len(pos): return pos
+    new_group = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    return np.maximum.accumulate(np.where(new_group, pos, 0))
+
+class TeamWindowIndexer(BaseIndexer):
+    """Trailing window of `window_size` rows that never crosses into the previous team's rows."""
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.team_start).astype(np.int64)
+        return start, end
+
+def long_format(df, metrics):
+    """
+    One row per (match, side), chronological (stable: home sides before away sides
+    on the same date), with Date, Team, one column per metric, the match row number
+    and a home flag. `metrics` is {name: (home values, away values)}.
+    """
+    n = len(df)
+    rows = np.arange(n)
+    sides = []
+    for team_col, idx, is_home in (('HomeTeam', 0, True), ('AwayTeam', 1, False)):
+        side = {'Date': df['Date'].to_numpy(), 'Team': df[team_col].to_numpy()}
+        for name, values in metrics.items():
+            side[name] = np.asarray(values[idx])
+        side['Row'], side['Is_Home'] = rows, is_home
+        sides.append(pd.DataFrame(side))
+    return pd.concat(sides).sort_values('Date', kind='stable').reset_index(drop=True)
+
+def team_rolling(long, spec, rest_default=7, rest_cap=30):
+    """
+    Adds each spec output column (pre-match: previous matches of the team only) and
+    Rest_Days to `long`. Entries sharing a (window, agg) are rolled together, so an
+    extra feature does not add another full pass.
+    """
+    # Team-coded, contiguous per team (stable sort keeps the chronological order inside each team)
+    team_code = pd.factorize(long['Team'])[0]
+    order = np.argsort(team_code, kind='stable')
+    by_team = long.iloc[order]
+    team_key = team_code[order]
+
+    # One shift for every metric (and the date, for rest days)
+    metrics = list(dict.fromkeys(metric for _, metric, _, _, _ in spec))
+    shifted = by_team.groupby(team_key, sort=False)[metrics + ['Date']].shift(1)
+
+    # One rolling pass per distinct (window, agg), covering all metrics that share it
+    passes = {}
+    for out_col, metric, win, agg, fill in spec:
+        passes.setdefault((win, agg), []).append((out_col, metric, fill))
+
+    team_start = group_starts(team_key)
+    for (win, agg), outputs in passes.items():
+        cols = list(dict.fromkeys(metric for _, metric, _ in outputs))
+        indexer = TeamWindowIndexer(window_size=win, team_start=team_start)
+        rolled = getattr(shifted[cols].rolling(indexer, min_periods=1), agg)()
+        for out_col, metric, fill in outputs:
+            long[out_col] = rolled[metric].fillna(fill)
+
+    rest = (long['Date'] - shifted['Date']).dt.days.fillna(rest_default)
+    long['Rest_Days'] = rest.clip(upper=rest_cap) if rest_cap is not None else rest
+    return long
+
+def scatter_back(df, long, feature_cols):
+    """Writes long-format columns back as Home_/Away_ columns of `df`, by position (no joins)."""
+    n = len(df)
+    row = long['Row'].to_numpy()
+    is_home = long['Is_Home'].to_numpy()
+
+    for c in feature_cols:
+        vals = long[c].to_numpy()
+        for prefix, side in (('Home', is_home), ('Away', ~is_home)):
+            out = np.empty(n, dtype=vals.dtype)
+            out[row[side]] = vals[side]
+            df[f'{prefix}_{c}'] = out
+
+
+# --- Head to head ---
+
+def h2h_points(home_teams, away_teams, home_pts, away_pts, windows=(3,), mode='mean'):
+    """
+    Pre-match head-to-head points of each side, vectorized over an unordered pair key:
+    meetings are grouped per pair (stable, keeping the input's chronological order)
+    and windows are read from cumulative sums. Returns {window: (home values, away values)}.
+    """
+    home_teams, away_teams = np.asarray(home_teams, dtype=object), np.asarray(away_teams, dtype=object)
+    n = len(home_teams)
+    codes, _ = pd.factorize(np.concatenate([home_teams, away_teams]))
+    h_code, a_code = codes[:n].astype(np.int64), codes[n:].astype(np.int64)
+    lo, hi = np.minimum(h_code, a_code), np.maximum(h_code, a_code)
+    pair = lo * (codes.max() + 2 if n else 2) + hi
+    home_is_lo = h_code == lo
+
+    order = np.argsort(pair, kind='stable')
+    pos = np.arange(n)
+    n_prev = pos - group_starts(pair[order]) # previous meetings of the pair
+
+    if mode == 'mean':
+        h_pts = np.asarray(home_pts, dtype=float)
+        a_pts = np.asarray(away_pts, dtype=float)
+        # Points from the perspective of each member of the pair
+        lo_vals = np.where(home_is_lo, h_pts, a_pts)[order]
+        hi_vals = np.where(home_is_lo, a_pts, h_pts)[order]
+        cum_lo, cum_hi = np.r_[0.0, np.cumsum(lo_vals)], np.r_[0.0, np.cumsum(hi_vals)]
+        end, prev = pos, n_prev
+    elif mode == 'entries':
+        h_pts = np.asarray(home_pts, dtype=np.int64)
+        a_pts = np.asarray(away_pts, dtype=np.int64)
+        # Two entries per meeting, (home, points) then (away, points)
+        lo_entries, hi_entries = np.empty(2 * n, dtype=np.int64), np.empty(2 * n, dtype=np.int64)
+        lo_entries[0::2] = np.where(home_is_lo, h_pts, 0)[order]
+        lo_entries[1::2] = np.where(home_is_lo, 0, a_pts)[order]
+        hi_entries[0::2] = np.where(home_is_lo, 0, h_pts)[order]
+        hi_entries[1::2] = np.where(home_is_lo, a_pts, 0)[order]
+        cum_lo, cum_hi = np.r_[0, np.cumsum(lo_entries)], np.r_[0, np.cumsum(hi_entries)]
+        end, prev = 2 * pos, 2 * n_prev
+    else:
+        raise ValueError(f"Unknown H2H mode {mode!r}")
+
+    out = {}
+    for w in windows:
+        k = np.minimum(prev, w)
+        lo_sum = cum_lo[end] - cum_lo[end - k]
+        hi_sum = cum_hi[end] - cum_hi[end - k]
+        if mode == 'mean':
+            safe_k = np.maximum(k, 1)
+            lo_sum = np.where(k > 0, lo_sum / safe_k, 1.5)
+            hi_sum = np.where(k > 0, hi_sum / safe_k, 1.5)
+
+        # Scatter back to the original row order
+        lo_res, hi_res = np.empty(n, dtype=lo_sum.dtype), np.empty(n, dtype=hi_sum.dtype)
+        lo_res[order] = lo_sum
+        hi_res[order] = hi_sum
+        out[w] = (np.where(home_is_lo, lo_res, hi_res), np.where(home_is_lo, hi_res, lo_res))
+    return out
+
+
+# --- Ratings ---
+
+def rate_matches(df, config, init_state=None):
+    """Elo + Attack/Defense ratings with the league's K, home advantage and learning rate."""
+    n = len(df)
+    return compute_ratings(
+        df['HomeTeam'], df['AwayTeam'],
+        df['FTHG'] if 'FTHG' in df.columns else np.full(n, np.nan),
+        df['FTAG'] if 'FTAG' in df.columns else np.full(n, np.nan),
+        df['FTR'] if 'FTR' in df.columns else pd.Series([None] * n, dtype=object),
+        elo_k=config.elo_k, home_adv=config.home_adv, dc_lr=config.dc_lr,
+        init_state=init_state
+    )
+
+
+def build_league_features(df, config, ratings=True):
+    """
+    Standard pre-match features of `df` (chronological) for `config`: team names
+    normalized, every rolling_spec column + Rest_Days, H2H_L{w} and Elo as
+    Home_/Away_ columns. Returns the frame (modified in place).
+    """
+    normalize_teams(df, config.team_aliases)
+    metrics = side_metrics(df, config)
+
+    long = team_rolling(long_format(df, metrics), config.rolling_spec, config.rest_default, config.rest_cap)
+    scatter_back(df, long, [out_col for out_col, _, _, _, _ in config.rolling_spec] + ['Rest_Days'])
+
+    if config.h2h_windows:
+        home_pts, away_pts = metrics['Pts'] if 'Pts' in metrics else match_points(df, config)
+        h2h = h2h_points(df['HomeTeam'], df['AwayTeam'], home_pts, away_pts, config.h2h_windows, config.h2h_mode)
+        for w, (home_vals, away_vals) in h2h.items():
+            df[f'Home_H2H_L{w}'] = home_vals
+            df[f'Away_H2H_L{w}'] = away_vals
+
+    if ratings:
+        r = rate_matches(df, config)
+        df['Home_Elo'] = r['home_elo']
+        df['Away_Elo'] = r['away_elo']
+    return df
+
+
+# --- League configs ---
+
+LALIGA = LeagueConfig(
+    'LaLiga', 'SP1',
+    rolling_spec=[
+        ('xG_Avg_L5', 'xG', 5, 'mean', 0),
+        ('Streak_L5', 'Pts', 5, 'sum', 0),
+        ('Pressure_Avg_L5', 'Press', 5, 'mean', 0),
+        ('Goal_Diff_L5', 'GD', 5, 'sum', 0),
+        ('Field_Tilt_L5', 'FT', 5, 'mean', 0.5),
+        ('Dominance_Avg_L5', 'Dom', 5, 'mean', 0.5),
+        ('PDO_L5', 'PDO', 10, 'mean', 1.0), # PDO (Rolling 10 as requested)
+        ('PPDA_Proxy_L5', 'PPDA', 5, 'mean', 10.0), # Default mid value
+    ],
+    xg_weights=(0.09, 0.29), pressure='fouls_cards',
+    elo_k=20, home_adv=70, dc_lr=0.01, h2h_windows=(3,), h2h_mode='mean',
+)
+
+# Premier/build_premier_features.py (football-data names -> dashboard names)
+PREMIER = LeagueConfig(
+    'Premier League', 'E0',
+    rolling_spec=[
+        ('xG_Avg_L5', 'xG', 5, 'mean', np.nan),
+        ('Streak_L5', 'Pts', 5, 'mean', np.nan),
+        ('Pressure_Avg_L5', 'Press', 5, 'mean', np.nan),
+    ],
+    xg_weights=(0.10, 0.35), xg_fallback=(0.9, 0.0),
+    pressure='shot_ratio', pressure_fallback=1.0,
+    elo_k=20, home_adv=0, h2h_windows=(),
+    team_aliases={
+        'Man United': 'Manchester United', 'Man City': 'Manchester City',
+        'Spurs': 'Tottenham', 'Newcastle': 'Newcastle United',
+        'Leicester': 'Leicester City', 'Norwich': 'Norwich City',
+        'Leeds': 'Leeds United', 'Sheffield United': 'Sheffield Utd',
+        'West Ham': 'West Ham United', 'Wolves': 'Wolverhampton',
+        'Brighton': 'Brighton', 'Huddersfield': 'Huddersfield',
+        'Cardiff': 'Cardiff City', 'Swansea': 'Swansea City',
+        'Stoke': 'Stoke City', 'Hull': 'Hull City',
+        'QPR': 'QPR', 'West Brom': 'West Brom',
+        'Bournemouth': 'Bournemouth', "Nott'm Forest": 'Nott. Forest',
+        'Luton': 'Luton', 'Ipswich': 'Ipswich',
+    },
+)
+
+# Premier/scripts/4_consolidate_dataset.py (names already normalized by 1_consolidate_matches.py)
+PREMIER_CONSOLIDATED = LeagueConfig(
+    'Premier League (consolidated)', 'E0',
+    rolling_spec=[
+        ('Att_Strength', 'GF', 10, 'mean', 1.0),
+        ('Def_Weakness', 'GA', 10, 'mean', 1.0),
+        ('xG_Avg_L5', 'xG', 5, 'mean', 1.0),
+        ('Streak_L5', 'Pts', 5, 'sum', 0),
+        ('Pressure_Avg_L5', 'Press', 5, 'mean', 50),
+        ('Goal_Diff_L5', 'GD', 5, 'sum', 0),
+    ],
+    xg_weights=(0.05, 0.2), xg_fallback=(0.8, 0.2),
+    pressure='corner_share', pressure_fallback=50, points_from='goals',
+    elo_k=32, home_adv=0, h2h_windows=(3,), h2h_mode='entries', rest_cap=None,
+)
+
+# Other football-data divisions: LaLiga feature set and rating settings (the LeagueConfig defaults)
+SEGUNDA = LeagueConfig('LaLiga 2', 'SP2', rolling_spec=LALIGA.rolling_spec)
+CHAMPIONSHIP = LeagueConfig('Championship', 'E1', rolling_spec=LALIGA.rolling_spec)
+BUNDESLIGA = LeagueConfig('Bundesliga', 'D1', rolling_spec=LALIGA.rolling_spec)
+SERIE_A = LeagueConfig('Serie A', 'I1', rolling_spec=LALIGA.rolling_spec)
+LIGUE_1 = LeagueConfig('Ligue 1', 'F1', rolling_spec=LALIGA.rolling_spec)
+
+LEAGUES = {
+    'laliga': LALIGA,
+    'premier': PREMIER,
+    'premier_consolidated': PREMIER_CONSOLIDATED,
+    'segunda': SEGUNDA,
+    'championship': CHAMPIONSHIP,
+    'bundesliga': BUNDESLIGA,
+    'serie_a': SERIE_A,
+    'ligue_1': LIGUE_1,
+}
+
+# football-data division code -> config used for that division's season files
+DIVISIONS = {c.division: c for c in (LALIGA, SEGUNDA, PREMIER, CHAMPIONSHIP, BUNDESLIGA, SERIE_A, LIGUE_1)}
@@ -0,0 +1,124 @@
+"""
+Keyed store of the raw match rows (results, stats, odds) the features are built from.
+One row per (Date, HomeTeam, AwayTeam). upsert() merges a download into it and
+reports the diff instead of concatenating and de-duplicating the whole table:
+  - inserted:  keys not in the store yet
+  - updated:   known keys whose incoming values differ (e.g. a corrected result)
+  - unchanged: known keys with identical values
+Only inserted/updated rows are written into the table, so callers can process
+just the delta (update_features for new matches, a rebuild when history changed).
+Persisted season-partitioned through feature_store (only changed seasons are
+rewritten) with the in-memory dtypes, so a rebuild sees exactly the stored inputs:
+  data/match_store/season=2024/part.parquet
+Without pyarrow it is kept as data/matches.csv.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.feature_store import HAS_PARQUET, CATEGORICAL_COLUMNS, write_store, load_features
+except ImportError:
+    from feature_store import HAS_PARQUET, CATEGORICAL_COLUMNS, write_store, load_features
+
+KEY = ['Date', 'HomeTeam', 'AwayTeam']
+# Input columns of the feature pipeline (everything else in the feature table is derived)
+MATCH_COLUMNS = ['Date', 'Season', 'Div', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR',
+                 'HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR',
+                 'B365H', 'B365D', 'B365A']
+
+
+class UpsertResult:
+    """Diff of one upsert; each attribute holds the incoming rows of that kind (key columns included)."""
+    __slots__ = ('inserted', 'updated', 'unchanged')
+
+    def __init__(self, inserted, updated, unchanged):
+        self.inserted = inserted
+        self.updated = updated
+        self.unchanged = unchanged
+
+    @property
+    def changed(self):
+        return len(self.inserted) + len(self.updated) > 0
+
+    @property
+    def delta(self):
+        """Inserted and updated rows, by date."""
+        return pd.concat([self.inserted, self.updated], ignore_index=True).sort_values('Date', kind='stable')
+
+    def summary(self):
+        return f"{len(self.inserted)} inserted, {len(self.updated)} updated, {len(self.unchanged)} unchanged"
+
+
+def _keyed(df):
+    """Rows with a full key, Date parsed, one row per key (last wins), indexed by KEY."""
+    df = df.dropna(subset=KEY).copy()
+    df['Date'] = pd.to_datetime(df['Date'])
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    df = df.drop_duplicates(subset=KEY, keep='last')
+    return df.set_index(KEY)
+
+
+def _same(a, b):
+    """Row mask: every column equal (NaN == NaN)."""
+    eq = (a.to_numpy() == b.to_numpy()) | (a.isna().to_numpy() & b.isna().to_numpy())
+    return eq.all(axis=1)
+
+
+class MatchStore:
+    def __init__(self, df=None):
+        self._df = _keyed(df if df is not None else pd.DataFrame(columns=KEY))
+
+    @classmethod
+    def load(cls, store_dir, csv_path):
+        """The saved store, or an empty one."""
+        if not (os.path.exists(store_dir) or os.path.exists(csv_path)):
+            return cls()
+        return cls(load_features(store_dir, csv_path))
+
+    @classmethod
+    def from_features(cls, df):
+        """Seeds a store from the match columns of an existing feature table."""
+        return cls(df[[c for c in MATCH_COLUMNS if c in df.columns]])
+
+    def __len__(self):
+        return len(self._df)
+
+    @property
+    def matches(self):
+        """All matches as a flat frame, by date (store order within a day)."""
+        return self._df.reset_index().sort_values('Date', kind='stable').reset_index(drop=True)
+
+    def upsert(self, df_new):
+        """
+        Merges `df_new` (any subset of columns plus KEY) into the store and returns the UpsertResult.
+        Columns missing from `df_new` are left as they are on existing rows (NaN on new ones).
+        """
+        new = _keyed(df_new)
+        cols = list(new.columns)
+        for col in cols:
+            if col not in self._df.columns:
+                self._df[col] = np.nan
+
+        known = new.index.isin(self._df.index)
+        inserted, candidates = new[~known], new[known]
+        same = _same(candidates, self._df.loc[candidates.index, cols]) if len(candidates) else np.ones(0, bool)
+        updated, unchanged = candidates[~same], candidates[same]
+
+        if len(updated):
+            self._df.loc[updated.index, cols] = updated
+        if len(inserted):
+            self._df = pd.concat([self._df, inserted.reindex(columns=self._df.columns)])
+        return UpsertResult(inserted.reset_index(), updated.reset_index(), unchanged.reset_index())
+
+    def save(self, store_dir, csv_path):
+        """Writes the store; returns the seasons rewritten (Parquet) or [] (CSV)."""
+        df = self.matches
+        if not HAS_PARQUET:
+            df.to_csv(csv_path, index=False)
+            return []
+        dtypes = {c: ('category' if c in CATEGORICAL_COLUMNS else df[c].dtype) for c in df.columns}
+        return write_store(df, store_dir, dtypes=dtypes)
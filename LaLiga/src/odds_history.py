@@ -0,0 +1,261 @@
+"""
+Append-only history of the Winamax odds (SQLite, data/odds_history.db).
+Every parse of a state dump appends one row per match and market, stamped with
+the scrape time, instead of only overwriting live_odds.json:
+
+    odds(match, market, ts, tournament, home, away, kickoff, o1, oX, o2)
+        primary key (match, market, ts)  -> opening / latest / closing are one index seek
+    latest(tournament, ts, payload)      -> the live_odds.json list of the last scrape
+
+  - opening: first snapshot of a match, latest: last one,
+    closing: last one at or before kickoff (closing-line value); the kickoff is the
+    largest one known for the match, since not every source stores it
+  - compact(before): drops snapshots older than `before` whose prices equal the
+    previous snapshot of the same match/market, so only line moves are kept
+  - the dashboards read `latest` (one row by primary key) and fall back to the
+    JSON file when the store does not exist yet
+
+    python src/odds_history.py --summary 36     # opening / latest / closing per match
+    python src/odds_history.py --compact 7      # keep only line moves older than 7 days
+    python src/odds_history.py --self-check     # closing-line regression check (temporary DB)
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_FILE = os.path.join(BASE_DIR, 'data', 'odds_history.db')
+MARKET_1X2 = '1X2'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS odds (
+    match      TEXT    NOT NULL,
+    market     TEXT    NOT NULL,
+    ts         INTEGER NOT NULL,
+    tournament INTEGER,
+    home       TEXT,
+    away       TEXT,
+    kickoff    INTEGER,
+    o1         REAL,
+    oX         REAL,
+    o2         REAL,
+    PRIMARY KEY (match, market, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS odds_tournament ON odds (tournament, kickoff);
+CREATE TABLE IF NOT EXISTS latest (
+    tournament INTEGER PRIMARY KEY,
+    ts         INTEGER NOT NULL,
+    payload    TEXT    NOT NULL
+);
+"""
+_COLUMNS = ('match', 'market', 'ts', 'tournament', 'home', 'away', 'kickoff', 'o1', 'oX', 'o2')
+
+
+def match_key(m):
+    """Winamax match id when known, else home|away|kickoff."""
+    if m.get('id') is not None:
+        return str(m['id'])
+    return f"{m.get('home')}|{m.get('away')}|{m.get('date')}"
+
+
+def _price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class OddsHistory:
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.row_factory = sqlite3.Row
+            # Readers (dashboards) are not blocked while a scrape is appended
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Writes ---
+    def record(self, tournament, matches, ts=None, latest=None, market=MARKET_1X2):
+        """
+        Appends one snapshot of `matches` (live_odds records) taken at `ts` (UNIX seconds, default now)
+        and, if given, stores `latest` as the tournament's current live_odds list unless a newer one is
+        stored (two scrapers feed the Premier League). A snapshot already recorded for the same match
+        and ts is kept as it is. Returns the rows appended.
+        """
+        ts = int(ts if ts is not None else time.time())
+        rows = [(match_key(m), market, ts, m.get('tournament', tournament), m.get('home'), m.get('away'),
+                 m.get('date'), _price(m.get('1')), _price(m.get('X')), _price(m.get('2')))
+                for m in matches]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(f"INSERT OR IGNORE INTO odds ({', '.join(_COLUMNS)}) "
+                                  f"VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+            appended = self.conn.total_changes - before
+            if latest is not None:
+                self.conn.execute("INSERT INTO latest (tournament, ts, payload) VALUES (?, ?, ?) "
+                                  "ON CONFLICT (tournament) DO UPDATE SET ts = excluded.ts, payload = excluded.payload "
+                                  "WHERE excluded.ts >= latest.ts",
+                                  (tournament, ts, json.dumps(latest, ensure_ascii=False)))
+        return appended
+
+    def compact(self, before):
+        """Deletes snapshots older than `before` (UNIX seconds) that repeat the previous prices. Returns the count."""
+        with self.conn:
+            cur = self.conn.execute("""
+                DELETE FROM odds WHERE (match, market, ts) IN (
+                    SELECT match, market, ts FROM (
+                        SELECT match, market, ts, o1, oX, o2,
+                               LAG(o1) OVER w AS p1, LAG(oX) OVER w AS pX, LAG(o2) OVER w AS p2,
+                               LAG(ts) OVER w AS prev_ts
+                        FROM odds WINDOW w AS (PARTITION BY match, market ORDER BY ts))
+                    WHERE ts < ? AND prev_ts IS NOT NULL AND o1 IS p1 AND oX IS pX AND o2 IS p2)
+            """, (int(before),))
+        return cur.rowcount
+
+    # --- Reads ---
+    def latest_snapshot(self, tournament):
+        """(ts, live_odds list) of the last scrape of `tournament`, or None."""
+        row = self.conn.execute("SELECT ts, payload FROM latest WHERE tournament = ?", (tournament,)).fetchone()
+        return (row['ts'], json.loads(row['payload'])) if row else None
+
+    def _one(self, where, params, order):
+        row = self.conn.execute(f"SELECT * FROM odds WHERE match = ? AND market = ? {where} "
+                                f"ORDER BY ts {order} LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def opening(self, match, market=MARKET_1X2):
+        return self._one('', (match, market), 'ASC')
+
+    def latest(self, match, market=MARKET_1X2):
+        return self._one('', (match, market), 'DESC')
+
+    def closing(self, match, market=MARKET_1X2):
+        """Last snapshot at or before kickoff (the latest one if no row of the match knows the kickoff)."""
+        return self._one('AND ts <= COALESCE((SELECT MAX(kickoff) FROM odds WHERE match = ? AND market = ?), ts)',
+                         (match, market, match, market), 'DESC')
+
+    def movement(self, match, market=MARKET_1X2):
+        """Every stored snapshot of a match, oldest first."""
+        rows = self.conn.execute("SELECT * FROM odds WHERE match = ? AND market = ? ORDER BY ts",
+                                 (match, market)).fetchall()
+        return [dict(r) for r in rows]
+
+    def summary(self, tournament=None, market=MARKET_1X2):
+        """One record per match: teams, kickoff and the opening / latest / closing prices with their ts."""
+        where = "AND tournament = ?" if tournament is not None else ""
+        params = (market, tournament) if tournament is not None else (market,)
+        rows = self.conn.execute(f"""
+            WITH k AS (
+                SELECT match, market, MAX(kickoff) AS kickoff
+                FROM odds WHERE market = ? {where} GROUP BY match, market),
+            b AS (
+                SELECT o.match, o.market, k.kickoff, MIN(o.ts) AS t_open, MAX(o.ts) AS t_last,
+                       MAX(CASE WHEN k.kickoff IS NULL OR o.ts <= k.kickoff THEN o.ts END) AS t_close
+                FROM odds o JOIN k ON k.match = o.match AND k.market = o.market
+                GROUP BY o.match, o.market)
+            SELECT l.match, l.tournament, l.home, l.away, b.kickoff, b.t_open, b.t_last, b.t_close,
+                   o.o1 AS open_1, o.oX AS open_X, o.o2 AS open_2,
+                   l.o1 AS latest_1, l.oX AS latest_X, l.o2 AS latest_2,
+                   c.o1 AS close_1, c.oX AS close_X, c.o2 AS close_2
+            FROM b
+            JOIN odds o ON o.match = b.match AND o.market = b.market AND o.ts = b.t_open
+            JOIN odds l ON l.match = b.match AND l.market = b.market AND l.ts = b.t_last
+            LEFT JOIN odds c ON c.match = b.match AND c.market = b.market AND c.ts = b.t_close
+            ORDER BY b.kickoff, l.match
+        """, params).fetchall()
+        return [dict(r) for r in rows]
+
+
+def load_latest(tournament, odds_file, history_file=HISTORY_FILE):
+    """Live odds list for a dashboard: the latest stored snapshot, else the JSON file, else []."""
+    if os.path.exists(history_file):
+        try:
+            with OddsHistory(history_file) as history:
+                snapshot = history.latest_snapshot(tournament)
+            if snapshot is not None:
+                return snapshot[1]
+        except sqlite3.Error:
+            pass
+    if os.path.exists(odds_file):
+        try:
+            with open(odds_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return []
+
+
+def self_check():
+    """Closing-line regression: a row without kickoff taken after the match started is not the close."""
+    with tempfile.TemporaryDirectory() as tmp, OddsHistory(os.path.join(tmp, 'check.db')) as history:
+        history.record(1, [{'id': '9', 'home': 'A', 'away': 'B', 'date': 1000, '1': 2.1, 'X': 3.3, '2': 3.4}], ts=900)
+        history.record(1, [{'id': '9', 'home': 'A', 'away': 'B', '1': 9.0, 'X': 5.0, '2': 1.2}], ts=1500)
+        closing = history.closing('9')
+        row = history.summary(1)[0]
+        failures = []
+        if not closing or closing['ts'] != 900:
+            failures.append(f"closing() returned ts {closing and closing['ts']}, expected 900")
+        if (row['t_close'], row['close_1'], row['kickoff']) != (900, 2.1, 1000):
+            failures.append(f"summary() close ts {row['t_close']} / price {row['close_1']} / kickoff {row['kickoff']}")
+        if history.latest('9')['ts'] != 1500:
+            failures.append("latest() is not the ts 1500 row")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or compact the odds history.")
+    parser.add_argument('--db', default=HISTORY_FILE, help="History database.")
+    parser.add_argument('--summary', type=int, nargs='?', const=-1, metavar='TOURNAMENT',
+                        help="Opening / latest / closing 1X2 prices per match (all tournaments without an id).")
+    parser.add_argument('--compact', type=float, metavar='DAYS',
+                        help="Drop repeated snapshots older than DAYS days.")
+    parser.add_argument('--self-check', action='store_true', help="Run the closing-line checks on a temporary database.")
+    args = parser.parse_args(argv)
+
+    if args.self_check:
+        failures = self_check()
+        for f in failures:
+            print(f"❌ {f}")
+        if failures:
+            sys.exit(1)
+        print("✅ Closing-line checks passed.")
+        return
+
+    with OddsHistory(args.db) as history:
+        if args.compact is not None:
+            n = history.compact(time.time() - args.compact * 86400)
+            print(f"🧹 {n} repeated snapshot(s) removed.")
+        if args.summary is not None:
+            rows = history.summary(None if args.summary == -1 else args.summary)
+            print(f"{'match':<40} {'opening':>20} {'latest':>20} {'closing':>20}")
+            for r in rows:
+                fmt = lambda k: '/'.join(f"{r[f'{k}_{o}']:.2f}" if r[f'{k}_{o}'] else '-' for o in '1X2')
+                print(f"{str(r['home']) + ' - ' + str(r['away']):<40} {fmt('open'):>20} "
+                      f"{fmt('latest'):>20} {fmt('close'):>20}")
+
+
+if __name__ == "__main__":
+    main()
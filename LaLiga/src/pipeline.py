@@ -0,0 +1,315 @@
+"""
+DAG runner for the LaLiga update pipeline.
+Every stage declares the files it reads and writes and the stages it runs after:
+
+    download ──> merge ──> features ──> train ──┐
+    scrape ──> parse_odds ──────────────────────┴──> predict
+
+Before running a stage its inputs are fingerprinted (content sha1, memoised by
+size + mtime). If the fingerprint equals the one recorded after its last
+successful run and all its outputs exist, the stage is skipped. Stages marked
+`always` (network sources) run every time; their own outputs only change when
+the source did, so everything downstream still skips. Independent stages run
+concurrently (odds scraping next to the feature build), and a failed stage
+blocks only its descendants. Per-stage status and timings are printed and kept
+in data/pipeline_state.json.
+
+    python src/pipeline.py                    # whole pipeline, out-of-date stages only
+    python src/pipeline.py train              # train + whatever it needs that is out of date
+    python src/pipeline.py parse_odds --only  # just this stage
+    python src/pipeline.py --force features   # ignore fingerprints
+    python src/pipeline.py --list             # stages and whether they are up to date
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+LEDGER_FILE = os.path.join(DATA_DIR, 'pipeline_state.json')
+STATE_DUMP = os.path.join(BASE_DIR, 'state_dump.json')
+TRAIN_SCRIPT = os.path.join(BASE_DIR, 'train_model.py')
+PARSE_SCRIPT = os.path.join(BASE_DIR, 'src', 'process_state.py')
+
+
+class Stage:
+    def __init__(self, name, run, inputs=(), outputs=(), after=(), always=False, doc=''):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)   # paths (files or directories)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.always = always
+        self.doc = doc
+
+
+# --- Fingerprints ---
+def _walk(path):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith('.tmp'):
+                    yield os.path.join(root, name)
+    elif os.path.exists(path):
+        yield path
+
+
+def file_digest(path, memo):
+    """Content sha1 of one file; reused from `memo` while its size and mtime are unchanged."""
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    cached = memo.get(path)
+    if cached and cached[:2] == stamp:
+        return cached[2]
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    memo[path] = stamp + [h.hexdigest()]
+    return memo[path][2]
+
+
+def fingerprint(paths, memo):
+    h = hashlib.sha1()
+    for path in paths:
+        h.update(path.encode())
+        files = list(_walk(path))
+        if not files:
+            h.update(b'<missing>')
+        for f in files:
+            h.update(os.path.relpath(f, path).encode() + file_digest(f, memo).encode())
+    return h.hexdigest()
+
+
+# --- Stages ---
+def _update_system():
+    from src import update_system
+    return update_system
+
+
+def run_download():
+    us = _update_system()
+    df_new, _ = us.download_latest_data()
+    if df_new.empty:
+        raise RuntimeError("download failed and there is no local copy")
+
+
+def run_merge():
+    us = _update_system()
+    with open(us.season_file(), 'rb') as f:
+        us.merge_matches(us.read_download(f.read()))
+
+
+def run_features():
+    _update_system().build_features()
+
+
+def run_train():
+    sys.path.insert(0, BASE_DIR)
+    import train_model
+    train_model.main()
+
+
+def run_scrape():
+    from src.winamax_state import scrape_state
+    scrape_state(STATE_DUMP)
+
+
+def run_parse_odds():
+    from src.process_state import process_leagues
+    process_leagues()
+
+
+def run_predict():
+    from src import predictions
+    predictions.precompute_predictions()
+
+
+def _build_stages():
+    us = _update_system()
+    from src import predictions
+    from src.feature_engineering import STATIC_FILES
+    from src.process_state import LEAGUES
+    from src.odds_history import HISTORY_FILE
+    return [
+        Stage('download', run_download, outputs=[us.season_file()], always=True,
+              doc="Conditional GET of the current season CSV"),
+        Stage('merge', run_merge, inputs=[us.season_file()], outputs=[us.MATCH_STORE_DIR], after=['download'],
+              doc="Upsert the download into the match store"),
+        Stage('features', run_features, inputs=[us.MATCH_STORE_DIR] + [os.path.join(us.DATA_DIR, f) for f in STATIC_FILES],
+              outputs=[us.FEATURE_STORE_DIR, us.DATA_FILE, us.STATE_FILE], after=['merge'],
+              doc="Feature table from the match store (incremental when possible)"),
+        Stage('train', run_train, inputs=[us.DATA_FILE, TRAIN_SCRIPT], outputs=[predictions.MODEL_FILE],
+              after=['features'], doc="Retrain the XGBoost model"),
+        Stage('scrape', run_scrape, outputs=[STATE_DUMP], always=True,
+              doc="Winamax PRELOADED_STATE dump (HTTP, Puppeteer fallback)"),
+        Stage('parse_odds', run_parse_odds, inputs=[STATE_DUMP, PARSE_SCRIPT], outputs=list(LEAGUES.values()) + [HISTORY_FILE],
+              after=['scrape'], doc="Live 1X2 odds of every league from the dump (+ odds history)"),
+        Stage('predict', run_predict, inputs=[predictions.ODDS_FILE, predictions.MODEL_FILE, us.DATA_FILE],
+              outputs=[predictions.PREDICTIONS_FILE], after=['train', 'parse_odds'],
+              doc="Model probabilities / EV for the live fixtures"),
+    ]
+
+
+# --- Runner ---
+class Pipeline:
+    def __init__(self, stages, ledger_file=LEDGER_FILE):
+        self.stages = {s.name: s for s in stages}
+        self.ledger_file = ledger_file
+        self.ledger = self._load_ledger()
+        self._lock = threading.Lock()
+
+    def _load_ledger(self):
+        try:
+            with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'stages': {}, 'files': {}}
+
+    def _save_ledger(self):
+        os.makedirs(os.path.dirname(self.ledger_file) or '.', exist_ok=True)
+        tmp = self.ledger_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.ledger, f, indent=1)
+        os.replace(tmp, self.ledger_file)
+
+    def closure(self, targets):
+        """`targets` plus every stage they (transitively) run after, in declaration order."""
+        todo, seen = list(targets), set()
+        while todo:
+            name = todo.pop()
+            if name in seen: continue
+            seen.add(name)
+            todo.extend(self.stages[name].after)
+        return [n for n in self.stages if n in seen]
+
+    def fingerprint(self, stage):
+        with self._lock:
+            memo = dict(self.ledger['files'])
+        fp = fingerprint(stage.inputs, memo)
+        with self._lock:
+            self.ledger['files'].update(memo)
+        return fp
+
+    def is_fresh(self, stage, fp=None):
+        if stage.always: return False
+        last = self.ledger['stages'].get(stage.name, {})
+        fp = fp or self.fingerprint(stage)
+        return last.get('fingerprint') == fp and all(os.path.exists(p) for p in stage.outputs)
+
+    def _run_stage(self, stage, force):
+        t0 = time.perf_counter()
+        record = {'started': datetime.now().isoformat(timespec='seconds')}
+        try:
+            fp = self.fingerprint(stage)
+            if not force and self.is_fresh(stage, fp):
+                record['status'] = 'skipped'
+            else:
+                stage.run()
+                record['status'] = 'ok'
+                # Inputs as they are after the run (a stage may touch its own inputs)
+                record['fingerprint'] = self.fingerprint(stage)
+        except SystemExit as e:
+            if e.code:
+                record['status'] = 'failed'
+                record['error'] = f"exit code {e.code}"
+            else:
+                # sys.exit(0) from a script's main: a normal success
+                record['status'] = 'ok'
+                record['fingerprint'] = self.fingerprint(stage)
+        except BaseException as e:
+            record['status'] = 'failed'
+            record['error'] = f"{type(e).__name__}: {e}"
+            record['traceback'] = traceback.format_exc()
+        record['wall_s'] = round(time.perf_counter() - t0, 3)
+        return record
+
+    def run(self, targets=None, only=False, force=False, workers=4, log=print):
+        """Runs the requested stages (default: all) in dependency order. Returns {stage: record}."""
+        targets = list(targets or self.stages)
+        names = [n for n in self.stages if n in targets] if only else self.closure(targets)
+        deps = {n: [d for d in self.stages[n].after if d in names] for n in names}
+        results, running = {}, {}
+        t0 = time.perf_counter()
+        log(f"🚀 Pipeline: {', '.join(names)}")
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while len(results) < len(names):
+                for n in names:
+                    if n in results or n in running: continue
+                    failed = [d for d in deps[n] if results.get(d, {}).get('status') in ('failed', 'blocked')]
+                    if failed:
+                        results[n] = {'status': 'blocked', 'wall_s': 0.0, 'error': f"upstream failed: {', '.join(failed)}"}
+                        self._log(n, results[n], log)
+                    elif all(d in results for d in deps[n]):
+                        running[n] = pool.submit(self._run_stage, self.stages[n], force)
+                if not running: continue
+                done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for n in [n for n, f in running.items() if f in done]:
+                    results[n] = running.pop(n).result()
+                    self._log(n, results[n], log)
+                    with self._lock:
+                        if results[n]['status'] == 'ok':
+                            self.ledger['stages'][n] = {k: v for k, v in results[n].items() if k != 'traceback'}
+                        self._save_ledger()
+
+        wall = time.perf_counter() - t0
+        log(self.report(results, names, wall))
+        return results
+
+    @staticmethod
+    def _log(name, r, log):
+        icon = {'ok': '✅', 'skipped': '⏭️', 'blocked': '⛔'}.get(r['status'], '❌')
+        log(f"   {icon} {name:<11} {r['status']:<8} {r['wall_s']:7.2f}s" + (f"  {r['error']}" if r.get('error') else ''))
+
+    @staticmethod
+    def report(results, names, wall):
+        lines = [f"\n⏱️ Stage timings (wall {wall:.2f}s)", f"{'stage':<12} {'status':<8} {'wall_s':>8}"]
+        for n in names:
+            r = results.get(n, {})
+            lines.append(f"{n:<12} {r.get('status', '-'):<8} {r.get('wall_s', 0):8.2f}")
+        return '\n'.join(lines)
+
+    def describe(self):
+        lines = [f"{'stage':<12} {'after':<22} {'state':<10} doc"]
+        for s in self.stages.values():
+            last = self.ledger['stages'].get(s.name, {})
+            state = 'always' if s.always else ('fresh' if self.is_fresh(s) else 'stale')
+            when = f" (last ok {last['started']})" if last.get('started') else ''
+            lines.append(f"{s.name:<12} {','.join(s.after) or '-':<22} {state:<10} {s.doc}{when}")
+        return '\n'.join(lines)
+
+
+def main(argv=None):
+    stages = _build_stages()
+    parser = argparse.ArgumentParser(description="Run the LaLiga update pipeline (stages skip when their inputs are unchanged).")
+    parser.add_argument('stages', nargs='*', metavar='stage', help=f"Stages to run: {', '.join(s.name for s in stages)} (default: all)")
+    parser.add_argument('--only', action='store_true', help="Run just the named stages, not the stages they depend on.")
+    parser.add_argument('--force', action='store_true', help="Run even if the inputs are unchanged.")
+    parser.add_argument('--workers', type=int, default=4, help="Stages run concurrently.")
+    parser.add_argument('--list', action='store_true', help="Show the stages and whether they are up to date.")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(stages)
+    unknown = [s for s in args.stages if s not in pipeline.stages]
+    if unknown:
+        parser.error(f"unknown stage(s) {unknown}")
+    if args.list:
+        print(pipeline.describe())
+        return 0
+    results = pipeline.run(args.stages, only=args.only, force=args.force, workers=args.workers)
+    return 0 if all(r['status'] in ('ok', 'skipped') for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
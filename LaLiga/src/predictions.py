@@ -0,0 +1,123 @@
+"""
+Model probabilities and expected value for the live Winamax fixtures.
+Precomputed after every odds refresh / retrain (pipeline stage 'predict'), so a
+reader only has to open data/live_predictions.json:
+  [{"home", "away", "date", "1", "X", "2", "p_home", "p_draw", "p_away",
+    "ev_home", "ev_draw", "ev_away", "value_bet"}, ...]
+Teams are matched through team_names.TEAM_MAPPING, the features are the ones
+stored in the model artifact by train_model.py.
+"""
+import json
+import os
+
+import pandas as pd
+
+try:
+    from src.feature_store import load_features, map_team_names
+    from src.team_names import TEAM_MAPPING, normalize_text_safe
+except ImportError:
+    from feature_store import load_features, map_team_names
+    from team_names import TEAM_MAPPING, normalize_text_safe
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE = os.path.join(BASE_DIR, 'df_final_app.csv')
+FEATURE_STORE_DIR = os.path.join(BASE_DIR, 'data', 'feature_store')
+MODEL_FILE = os.path.join(BASE_DIR, 'modelo_city_group.joblib')
+ODDS_FILE = os.path.join(BASE_DIR, 'data', 'live_odds.json')
+PREDICTIONS_FILE = os.path.join(BASE_DIR, 'data', 'live_predictions.json')
+
+VALUE_BET_EV = 0.05
+
+
+def load_model(model_file=MODEL_FILE):
+    """(model, feature list) from the train_model.py artifact."""
+    import joblib
+    artifact = joblib.load(model_file)
+    if isinstance(artifact, dict) and 'model' in artifact:
+        return artifact['model'], list(artifact['features'])
+    # Older artifacts stored only the model
+    return artifact, list(getattr(artifact, 'feature_names_in_', []))
+
+
+def match_probs(df, model, features, home_team, away_team, raw_date=None):
+    """
+    (P_H, P_D, P_A) for one fixture from its feature row: the row on the Winamax date
+    (UNIX seconds) if present, else the last meeting of the two teams. None if there is none.
+    """
+    subset = df[(df['HomeTeam'] == home_team) & (df['AwayTeam'] == away_team)]
+    if raw_date is not None and not subset.empty:
+        try:
+            md = pd.to_datetime(raw_date, unit='s')
+            on_date = subset[subset['Date'].dt.date == md.date()]
+            if not on_date.empty:
+                subset = on_date
+        except (ValueError, TypeError):
+            pass
+    if subset.empty:
+        return None
+
+    # Prefer fixtures without a result yet
+    if 'FTR' in subset.columns:
+        future = subset[subset['FTR'].isna()]
+        if not future.empty:
+            subset = future
+
+    row = subset.sort_values('Date').iloc[-1]
+    try:
+        proba = model.predict_proba(row[features].to_frame().T.astype(float))[0]
+    except (KeyError, ValueError):
+        return None
+    # train_model.py mapping: A=0, D=1, H=2
+    return float(proba[2]), float(proba[1]), float(proba[0])
+
+
+def predict_live(df, model, features, matches):
+    """One prediction record per live fixture the model can score."""
+    out = []
+    for m in matches:
+        home = TEAM_MAPPING.get(normalize_text_safe(m.get('home')), m.get('home'))
+        away = TEAM_MAPPING.get(normalize_text_safe(m.get('away')), m.get('away'))
+        probs = match_probs(df, model, features, home, away, m.get('date'))
+        if probs is None:
+            continue
+        try:
+            odds = float(m.get('1', 1)), float(m.get('X', 1)), float(m.get('2', 1))
+        except (TypeError, ValueError):
+            odds = (1.0, 1.0, 1.0)
+        evs = [p * o - 1 for p, o in zip(probs, odds)]
+        out.append({
+            'home': home, 'away': away, 'date': m.get('date'),
+            '1': odds[0], 'X': odds[1], '2': odds[2],
+            'p_home': probs[0], 'p_draw': probs[1], 'p_away': probs[2],
+            'ev_home': evs[0], 'ev_draw': evs[1], 'ev_away': evs[2],
+            'value_bet': any(ev > VALUE_BET_EV for ev in evs),
+        })
+    return out
+
+
+def precompute_predictions(odds_file=ODDS_FILE, model_file=MODEL_FILE, out_file=PREDICTIONS_FILE,
+                           store_dir=FEATURE_STORE_DIR, csv_path=DATA_FILE):
+    """Scores the live odds file with the current model and features; returns the records written."""
+    with open(odds_file, 'r', encoding='utf-8') as f:
+        matches = json.load(f)
+    model, features = load_model(model_file)
+
+    df = load_features(store_dir, csv_path, columns=['Date', 'HomeTeam', 'AwayTeam', 'FTR'] + features)
+    df = map_team_names(df, TEAM_MAPPING)
+    for col in ('HomeTeam', 'AwayTeam'):
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    for c in features:
+        if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
+
+    records = predict_live(df, model, features, matches)
+    tmp = out_file + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, out_file)
+    print(f"🎯 {len(records)}/{len(matches)} live fixtures scored -> {out_file}")
+    return records
+
+
+if __name__ == "__main__":
+    precompute_predictions()
@@ -1,109 +1,181 @@
+import argparse
 import json
 import os
 import sys
 
+try:
+    from src.state_stream import load_relevant, write_ndjson
+    from src.odds_history import OddsHistory, HISTORY_FILE
+except ImportError:
+    from state_stream import load_relevant, write_ndjson
+    from odds_history import OddsHistory, HISTORY_FILE
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATE_FILE = os.path.join(BASE_DIR, '..', 'state_dump.json')
 OUTPUT_FILE = os.path.join(BASE_DIR, '..', 'data', 'live_odds.json')
+PREMIER_OUTPUT_FILE = os.path.join(BASE_DIR, '..', '..', 'Premier', 'data', 'live_odds.json')
 
-def extract_matches(data, tournament_id=None):
-    results = []
-    
-    matches = data.get('matches', {})
+LALIGA_TOURNAMENT_ID = 36
+# sports/1/1/1 on Winamax (the Premier scraper's listing page)
+PREMIER_TOURNAMENT_ID = 1
+MAX_MATCHES = 10
+# Leagues served from one dump: tournament id -> live odds file
+LEAGUES = {
+    LALIGA_TOURNAMENT_ID: OUTPUT_FILE,
+    PREMIER_TOURNAMENT_ID: PREMIER_OUTPUT_FILE,
+}
+
+def index_matches(data, tournament_ids=None):
+    """
+    One pass over the dump: every pre-match match of `tournament_ids` (all if None) joined with
+    its main bet and the three outcome prices, bucketed by tournament id (dump order within one).
+    """
+    wanted = None if tournament_ids is None else set(tournament_ids)
     bets = data.get('bets', {})
     odds = data.get('odds', {})
-    
-    print(f"Total Matches in dump: {len(matches)}")
-    debug_limit = 10
-    
-    for mid, match in matches.items():
-        # Status 'PREMATCH'
+    buckets, rejected = {}, {}
+
+    for mid, match in data.get('matches', {}).items():
         if match.get('status') != 'PREMATCH':
-            # if debug_limit > 0: print(f"Reject {mid}: Status {match.get('status')}"); debug_limit -= 1
-            continue
-            
-        # Tournament filter
-        if tournament_id is not None:
-            if match.get('tournamentId') != tournament_id:
-                if debug_limit > 0 and tournament_id == 36: print(f"Reject {mid}: Tornament {match.get('tournamentId')} != {tournament_id}"); debug_limit -= 1
-                continue
-        
-        # Main Bet Validity
-        main_bet_id = match.get('mainBetId')
-        if not main_bet_id:
-            if debug_limit > 0: print(f"Reject {mid}: No MainBetId"); debug_limit -= 1
             continue
-            
-        # Bet Lookup (keys are strings in JSON)
-        bet = bets.get(str(main_bet_id))
-        if not bet:
-            if debug_limit > 0: print(f"Reject {mid}: Bet {main_bet_id} not in bets"); debug_limit -= 1
+        tid = match.get('tournamentId')
+        if wanted is not None and tid not in wanted:
             continue
-            
-        outcomes = bet.get('outcomes')
+        main_bet_id = match.get('mainBetId')
+        # Bet / odds keys are strings in JSON
+        bet = bets.get(str(main_bet_id)) if main_bet_id else None
+        outcomes = bet.get('outcomes') if bet else None
         if not outcomes or len(outcomes) != 3:
-            if debug_limit > 0: print(f"Reject {mid}: Outcomes invalid {outcomes}"); debug_limit -= 1
+            reason = 'no main bet' if not bet else 'outcomes invalid'
+            rejected[reason] = rejected.get(reason, 0) + 1
             continue
-            
-        # Odds Lookup
-        odd1 = odds.get(str(outcomes[0]))
-        oddX = odds.get(str(outcomes[1]))
-        odd2 = odds.get(str(outcomes[2]))
-        
+        odd1, oddX, odd2 = (odds.get(str(o)) for o in outcomes)
         if not odd1 or not oddX or not odd2:
-            if debug_limit > 0: print(f"Reject {mid}: Missing odds {outcomes}"); debug_limit -= 1
+            rejected['missing odds'] = rejected.get('missing odds', 0) + 1
             continue
-            
-        # Add to results
-        results.append({
+
+        buckets.setdefault(tid, []).append({
+            "id": mid,
             "home": match.get('competitor1Name'),
             "away": match.get('competitor2Name'),
             "1": odd1,
             "X": oddX,
             "2": odd2,
             "date": match.get('matchStart'),
-            "tournament": match.get('tournamentId')
+            "tournament": tid
         })
 
+    if rejected:
+        print("Rejected: " + ", ".join(f"{n} {reason}" for reason, n in rejected.items()))
+    return buckets
+
+def extract_matches(data, tournament_id=None):
+    """Pre-match 1X2 odds of one tournament (all if None), in dump order within a tournament."""
+    print(f"Total Matches in dump: {len(data.get('matches', {}))}")
+    buckets = index_matches(data, None if tournament_id is None else [tournament_id])
+    return [m for bucket in buckets.values() for m in bucket]
+
+def _soonest(matches, limit):
+    return sorted(matches, key=lambda x: x['date'])[:limit]
+
+def select_league_matches(buckets, tournament_ids, limit=MAX_MATCHES, fallback=(LALIGA_TOURNAMENT_ID,)):
+    """
+    {tournament_id: soonest `limit` matches} from index_matches buckets. A tournament in `fallback`
+    without matches gets the soonest pre-match matches of any tournament instead; others are left out.
+    """
+    selected = {}
+    for tid in tournament_ids:
+        if buckets.get(tid):
+            selected[tid] = _soonest(buckets[tid], limit)
+        elif tid in fallback:
+            print(f"No matches found for tournament {tid}. Falling back to ALL PREMATCH matches.")
+            selected[tid] = _soonest([m for bucket in buckets.values() for m in bucket], limit)
+        else:
+            print(f"No matches found for tournament {tid}.")
+    return selected
+
+def load_state(path=STATE_FILE):
+    """The whole Winamax PRELOADED_STATE dump written by scraper_winamax.js (see load_relevant for the streamed part)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def select_live_matches(data, tournament_id=LALIGA_TOURNAMENT_ID, limit=MAX_MATCHES):
+    """Pre-match 1X2 odds of `tournament_id` (all tournaments if it has none), soonest first."""
+    print(f"Attempting to extract matches of tournament {tournament_id}...")
+    selected = select_league_matches(index_matches(data), [tournament_id], limit, (tournament_id,))
+    return selected[tournament_id]
+
+def write_odds(matches, path=OUTPUT_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(matches, f, indent=2)
+
+def process_leagues(state_file=STATE_FILE, leagues=None, limit=MAX_MATCHES, fallback=(LALIGA_TOURNAMENT_ID,),
+                    ndjson_file=None, history_file=HISTORY_FILE):
+    """
+    Dump -> one live odds file per league ({tournament_id: path}, default LEAGUES), from a single
+    streamed pass and a single index. Leagues in `fallback` without matches get the soonest
+    pre-match matches of any tournament (kept in a small reserve while streaming); other empty
+    leagues keep their previous file. Returns {tournament_id: matches written}.
+    Every match of the leagues (not only the `limit` written) is appended to the odds history
+    (`history_file`, None to skip), stamped with the dump's modification time.
+    Raises FileNotFoundError if there is no dump and ValueError if it is not valid JSON.
+    """
+    leagues = dict(LEAGUES if leagues is None else leagues)
+    # Headroom in the reserve for matches that turn out to have incomplete odds
+    reserve = 2 * limit if any(tid in leagues for tid in fallback) else 0
+    data = load_relevant(state_file, list(leagues), reserve=reserve)
+    print(f"Streamed state dump: {len(data['matches'])} pre-match matches kept.")
+    if ndjson_file:
+        write_ndjson(data, ndjson_file)
+        print(f"Saved relevant state to {ndjson_file}")
+
+    buckets = index_matches(data)
+    selected = select_league_matches(buckets, list(leagues), limit, fallback)
+    for tid, matches in selected.items():
+        write_odds(matches, leagues[tid])
+        print(f"Tournament {tid}: {len(matches)} matches -> {leagues[tid]}")
+
+    if history_file:
+        scraped = os.path.getmtime(state_file)
+        with OddsHistory(history_file) as history:
+            for tid, matches in selected.items():
+                n = history.record(tid, buckets.get(tid, []), ts=scraped, latest=matches)
+                print(f"Tournament {tid}: {n} odds snapshot(s) appended to {history_file}")
+    return selected
+
+def process_state(state_file=STATE_FILE, output_file=OUTPUT_FILE, tournament_id=LALIGA_TOURNAMENT_ID,
+                  limit=MAX_MATCHES, ndjson_file=None, history_file=HISTORY_FILE):
+    """
+    Dump -> live odds file of one tournament (see process_leagues), in-process. Returns the matches
+    written. Without usable matches of the tournament, the soonest of any tournament are written.
+    """
+    selected = process_leagues(state_file, {tournament_id: output_file}, limit, (tournament_id,), ndjson_file,
+                               history_file)
+    return selected[tournament_id]
 
-        
-    return results
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract live 1X2 odds from the Winamax state dump.")
+    parser.add_argument('--state', default=STATE_FILE, help="State dump (.json, or the .ndjson intermediate).")
+    parser.add_argument('--tournament', type=int,
+                        help="Only this Winamax tournament id (default: every league in LEAGUES).")
+    parser.add_argument('--out', default=OUTPUT_FILE, help="Live odds JSON to write with --tournament.")
+    parser.add_argument('--limit', type=int, default=MAX_MATCHES, help="Matches kept (soonest first).")
+    parser.add_argument('--ndjson', metavar='PATH', help="Also write the relevant part of the dump as NDJSON.")
+    parser.add_argument('--history', default=HISTORY_FILE, help="Odds history database to append to.")
+    parser.add_argument('--no-history', action='store_true', help="Do not append to the odds history.")
+    args = parser.parse_args(argv)
 
-def main():
-    if not os.path.exists(STATE_FILE):
-        print(f"Error: State file not found at {STATE_FILE}")
+    if not os.path.exists(args.state):
+        print(f"Error: State file not found at {args.state}")
         sys.exit(1)
-        
+    history = None if args.no_history else args.history
     try:
-        with open(STATE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        print("Loaded state dump.")
-        
-        # Attempt 1: La Liga (ID 36)
-        print("Attempting to extract La Liga matches (TD 36)...")
-        matches = extract_matches(data, tournament_id=36)
-        
-        if not matches:
-            print("No La Liga matches found. Falling back to ALL PREMATCH matches.")
-            matches = extract_matches(data, tournament_id=None)
-            
-        # Sort by date
-        matches.sort(key=lambda x: x['date'])
-        
-        # Limit to 10
-        matches = matches[:10]
-        
-        print(f"Found {len(matches)} matches.")
-        
-        # Save
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(matches, f, indent=2)
-            
-        print(f"Saved to {OUTPUT_FILE}")
-        
+        if args.tournament is None:
+            process_leagues(args.state, limit=args.limit, ndjson_file=args.ndjson, history_file=history)
+        else:
+            process_state(args.state, args.out, args.tournament, args.limit, args.ndjson, history)
     except Exception as e:
         print(f"Error processing state: {e}")
         sys.exit(1)
@@ -0,0 +1,115 @@
+"""
+Sequential rating kernel (Elo + Dixon-Coles-like Attack/Defense).
+Teams are mapped to integer ids once and the match-by-match update runs over
+contiguous arrays. JIT-compiled with numba when it is installed, plain Python
+loop over the same arrays otherwise. Shared by the LaLiga and Premier pipelines.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _ratings_loop(h_idx, a_idx, fthg, ftag, score, played,
+                  elo, att, dfn, out, elo_k, home_adv, dc_lr):
+    # out columns: 0 h_elo, 1 a_elo, 2 h_att, 3 a_att, 4 h_def, 5 a_def
+    for i in range(len(h_idx)):
+        h = h_idx[i]
+        a = a_idx[i]
+
+        # Snapshot PRE-MATCH ratings
+        he = elo[h]
+        ae = elo[a]
+        hat = att[h]
+        hde = dfn[h]
+        aat = att[a]
+        ade = dfn[a]
+
+        out[i][0] = he
+        out[i][1] = ae
+        out[i][2] = hat
+        out[i][3] = aat
+        out[i][4] = hde
+        out[i][5] = ade
+
+        # Skip update if match hasn't been played
+        if not played[i]:
+            continue
+
+        # --- UPDATE ELO ---
+        s = score[i]
+        dr = ae - (he + home_adv)
+        e_prob = 1 / (1 + 10 ** (dr / 400))
+
+        elo[h] = he + elo_k * (s - e_prob)
+        elo[a] = ae + elo_k * ((1 - s) - (1 - e_prob))
+
+        # --- UPDATE DIXON-COLES ---
+        err_h = fthg[i] - hat * ade
+        err_a = ftag[i] - aat * hde
+
+        att[h] += dc_lr * err_h * ade
+        dfn[a] += dc_lr * err_h * hat
+
+        att[a] += dc_lr * err_a * hde
+        dfn[h] += dc_lr * err_a * aat
+
+
+if HAS_NUMBA:
+    _ratings_loop_jit = njit(cache=True)(_ratings_loop)
+
+
+def compute_ratings(home, away, fthg, ftag, ftr, elo_k=20, home_adv=70, dc_lr=0.01, init_elo=1500.0, init_state=None):
+    """
+    Runs the sequential Elo + Attack/Defense update over a chronologically sorted
+    list of matches. Matches with missing goals or result are snapshotted but do
+    not update the ratings (future fixtures).
+    Returns a dict of PRE-MATCH ratings: home_elo, away_elo, home_att, away_att,
+    home_def, away_def (float64 arrays aligned with the input rows), plus 'state':
+    {team: (elo, att, def)} after the last match. Passing that state back as
+    init_state resumes the sequence exactly where it stopped.
+    """
+    init_state = init_state or {}
+    home = pd.Series(home).reset_index(drop=True)
+    away = pd.Series(away).reset_index(drop=True)
+    n = len(home)
+
+    codes, teams = pd.factorize(pd.concat([home, away], ignore_index=True))
+    h_idx = codes[:n].astype(np.int64)
+    a_idx = codes[n:].astype(np.int64)
+
+    fthg = pd.to_numeric(pd.Series(fthg).reset_index(drop=True), errors='coerce').to_numpy(dtype=np.float64)
+    ftag = pd.to_numeric(pd.Series(ftag).reset_index(drop=True), errors='coerce').to_numpy(dtype=np.float64)
+    ftr = pd.Series(ftr).reset_index(drop=True)
+    score = np.where(ftr == 'H', 1.0, np.where(ftr == 'D', 0.5, 0.0))
+    played = ~(np.isnan(fthg) | ftr.isna().to_numpy())
+
+    n_teams = len(teams)
+    start = np.array([init_state.get(t, (init_elo, 1.0, 1.0)) for t in teams], dtype=np.float64).reshape(n_teams, 3)
+    if HAS_NUMBA:
+        elo = start[:, 0].copy()
+        att = start[:, 1].copy()
+        dfn = start[:, 2].copy()
+        out = np.empty((n, 6))
+        _ratings_loop_jit(h_idx, a_idx, fthg, ftag, score, played,
+                          elo, att, dfn, out, float(elo_k), float(home_adv), float(dc_lr))
+    else:
+        # Python floats/lists are much faster than numpy scalars in an interpreted loop
+        elo = start[:, 0].tolist()
+        att = start[:, 1].tolist()
+        dfn = start[:, 2].tolist()
+        rows = [[0.0] * 6 for _ in range(n)]
+        _ratings_loop(h_idx.tolist(), a_idx.tolist(), fthg.tolist(), ftag.tolist(), score.tolist(), played.tolist(),
+                      elo, att, dfn, rows, float(elo_k), float(home_adv), float(dc_lr))
+        out = np.array(rows, dtype=np.float64).reshape(n, 6)
+
+    return {
+        'home_elo': out[:, 0], 'away_elo': out[:, 1],
+        'home_att': out[:, 2], 'away_att': out[:, 3],
+        'home_def': out[:, 4], 'away_def': out[:, 5],
+        'state': {t: (float(elo[i]), float(att[i]), float(dfn[i])) for i, t in enumerate(teams)},
+    }
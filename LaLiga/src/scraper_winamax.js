@@ -3,7 +3,35 @@ const fs = require('fs');
 const path = require('path');
 
 const OUTPUT_FILE = path.join(__dirname, '../state_dump.json');
-const URL = 'https://www.winamax.es/apuestas-deportivas/sports/1';
+const NDJSON_FILE = path.join(__dirname, '../state_dump.ndjson');
+const args = process.argv.slice(2);
+const argValue = (name, fallback) => {
+    const i = args.indexOf(name);
+    return i >= 0 && args[i + 1] ? args[i + 1] : fallback;
+};
+// --ndjson: write only matches/bets/odds, one [section, key, value] line per entry (see state_stream.py)
+const NDJSON = args.includes('--ndjson');
+const OUT = argValue('--out', NDJSON ? NDJSON_FILE : OUTPUT_FILE);
+// --record DIR: also save the page as served and the state read from it (football.html / football.state.json)
+const RECORD_DIR = argValue('--record', null);
+// Overridable so the scraper can run against a local stand-in server
+const BASE_URL = (process.env.WINAMAX_BASE_URL || 'https://www.winamax.es').replace(/\/+$/, '');
+const URL = `${BASE_URL}/apuestas-deportivas/sports/1`;
+
+function writeNdjson(state, file) {
+    const tmp = file + '.tmp';
+    const fd = fs.openSync(tmp, 'w');
+    try {
+        for (const section of ['matches', 'bets', 'odds']) {
+            for (const [key, value] of Object.entries(state[section] || {})) {
+                fs.writeSync(fd, JSON.stringify([section, key, value]) + '\n');
+            }
+        }
+    } finally {
+        fs.closeSync(fd);
+    }
+    fs.renameSync(tmp, file);
+}
 
 (async () => {
     console.log("🌐 Launching Winamax Scraper (Puppeteer) - Dump Mode...");
@@ -20,7 +48,7 @@ const URL = 'https://www.winamax.es/apuestas-deportivas/sports/1';
 
         console.log(`🚀 Navigating to ${URL}...`);
         // Increase timeout to 90s just in case
-        await page.goto(URL, { waitUntil: 'networkidle2', timeout: 90000 });
+        const response = await page.goto(URL, { waitUntil: 'networkidle2', timeout: 90000 });
 
         console.log("🔍 Extracting state...");
         // Extract the Redux state injected in the window
@@ -35,9 +63,21 @@ const URL = 'https://www.winamax.es/apuestas-deportivas/sports/1';
 
         console.log("✅ State extracted.");
 
-        // Just dump it
-        fs.writeFileSync(OUTPUT_FILE, JSON.stringify(state, null, 2));
-        console.log(`💾 Saved raw state to ${OUTPUT_FILE}`);
+        if (RECORD_DIR) {
+            fs.mkdirSync(RECORD_DIR, { recursive: true });
+            fs.writeFileSync(path.join(RECORD_DIR, 'football.html'), await response.text());
+            fs.writeFileSync(path.join(RECORD_DIR, 'football.state.json'), JSON.stringify(state));
+            console.log(`📼 Recorded page and state in ${RECORD_DIR}`);
+        }
+
+        if (NDJSON) {
+            writeNdjson(state, OUT);
+            console.log(`💾 Saved matches/bets/odds to ${OUT}`);
+        } else {
+            // Just dump it
+            fs.writeFileSync(OUT, JSON.stringify(state, null, 2));
+            console.log(`💾 Saved raw state to ${OUT}`);
+        }
 
     } catch (error) {
         console.error("❌ Scraper Error:", error.message);
@@ -0,0 +1,153 @@
+"""
+Shared loader for football-data.co.uk season CSVs (SP1_2425.csv, E0-2024-25.csv, ...).
+  - Reads only the match columns (usecols) with explicit dtypes, not the ~100 betting columns.
+  - Dates are parsed with the file's own fixed format (dd/mm/yy or dd/mm/yyyy, detected from
+    a sample); dayfirst inference is only the fallback for rows that do not match it.
+  - Files are read concurrently (thread pool).
+  - Each parsed season is cached in a binary file (Parquet, or pickle without pyarrow) keyed
+    by the source file's path, mtime and size, so unchanged historical seasons are never re-parsed.
+Cache files live in <data dir>/cache/seasons unless a cache_dir is given.
+
+    frames = load_seasons(sorted(glob.glob('data/SP1_*.csv')))
+"""
+import hashlib
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    import pyarrow # noqa: F401 (pandas Parquet engine)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+LOADER_VERSION = 1
+LOAD_THREADS = 4
+CACHE_SUBDIR = os.path.join('cache', 'seasons')
+
+# Columns read from every file (the match result, stats and closing 1X2 odds used by the pipelines)
+TEXT_COLUMNS = ['Div', 'HomeTeam', 'AwayTeam', 'FTR']
+NUMERIC_COLUMNS = ['FTHG', 'FTAG', 'HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC',
+                   'HY', 'AY', 'HR', 'AR', 'B365H', 'B365D', 'B365A']
+MATCH_COLUMNS = ['Div', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR',
+                 'HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR',
+                 'B365H', 'B365D', 'B365A']
+DTYPES = {**{c: 'object' for c in TEXT_COLUMNS}, **{c: 'float64' for c in NUMERIC_COLUMNS}}
+
+DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d')
+DATE_SAMPLE = 20
+
+
+def _clean_name(col):
+    return col.lstrip('\ufeffï»¿').strip() # UTF-8 BOM, possibly read as latin1
+
+
+def detect_date_format(values):
+    """First of DATE_FORMATS that parses every sampled value, or None."""
+    sample = pd.Series(values).dropna().astype(str).str.strip()
+    sample = sample[sample != ''].head(DATE_SAMPLE)
+    if sample.empty: return None
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = pd.to_datetime(sample, format=fmt)
+        except (ValueError, TypeError):
+            continue
+        if (parsed.dt.year >= 1900).all():
+            return fmt
+    return None
+
+
+def parse_dates(values):
+    """Fixed-format parse with the detected format; unmatched rows fall back to dayfirst inference."""
+    values = pd.Series(values)
+    fmt = detect_date_format(values)
+    dates = pd.to_datetime(values, format=fmt, errors='coerce') if fmt else pd.Series(pd.NaT, index=values.index)
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning) # per-element inference warning
+            dates[retry] = pd.to_datetime(values[retry], dayfirst=True, errors='coerce')
+    return dates
+
+
+def _read_csv(path, columns):
+    wanted = set(columns)
+    kwargs = dict(encoding='latin1', usecols=lambda c: _clean_name(c) in wanted, on_bad_lines='skip')
+    try:
+        df = pd.read_csv(path, dtype=DTYPES, **kwargs)
+    except ValueError:
+        # Stray text in a numeric column: read untyped, then coerce
+        df = pd.read_csv(path, **kwargs)
+        df.columns = [_clean_name(c) for c in df.columns]
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce')
+    df.columns = [_clean_name(c) for c in df.columns]
+    if 'Date' in df.columns:
+        df['Date'] = parse_dates(df['Date'])
+    return df
+
+
+def _cache_file(path, columns, cache_dir):
+    st = os.stat(path)
+    key = f"{LOADER_VERSION}|{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{','.join(sorted(columns))}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest}.{'parquet' if HAS_PARQUET else 'pkl'}"), stem
+
+
+def read_season(path, columns=None, cache_dir=None, use_cache=True):
+    """
+    One season file as a DataFrame (Date parsed, only the MATCH_COLUMNS + `columns` present in the file).
+    With use_cache, a cached parse of the same file version is returned when available.
+    """
+    read_cols = list(dict.fromkeys(MATCH_COLUMNS + list(columns or [])))
+    if not use_cache:
+        return _read_csv(path, read_cols)
+
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_SUBDIR)
+    cache_file, stem = _cache_file(path, read_cols, cache_dir)
+    if os.path.exists(cache_file):
+        try:
+            return pd.read_parquet(cache_file) if HAS_PARQUET else pd.read_pickle(cache_file)
+        except Exception:
+            pass # Unreadable cache entry: re-parse below
+
+    df = _read_csv(path, read_cols)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Older versions of this season file
+        for old in os.listdir(cache_dir):
+            if old.startswith(f'{stem}-') and old != os.path.basename(cache_file):
+                os.remove(os.path.join(cache_dir, old))
+        tmp = cache_file + '.tmp'
+        if HAS_PARQUET:
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass # Read-only data dir: the parse is still valid for this run
+    return df
+
+
+def load_seasons(files, columns=None, cache_dir=None, use_cache=True, threads=LOAD_THREADS,
+                 return_exceptions=False):
+    """
+    read_season for every file, concurrently. Returns the frames in the order of `files`.
+    With return_exceptions, a file that cannot be read yields its exception instead of
+    aborting the whole load (callers report/skip it).
+    """
+    def read(path):
+        try:
+            return read_season(path, columns, cache_dir, use_cache)
+        except Exception as e:
+            if not return_exceptions: raise
+            return e
+
+    files = list(files)
+    if len(files) <= 1 or threads <= 1:
+        return [read(f) for f in files]
+    with ThreadPoolExecutor(max_workers=min(threads, len(files))) as pool:
+        return list(pool.map(read, files))
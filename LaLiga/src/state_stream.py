@@ -0,0 +1,301 @@
+"""
+Streaming reader for the Winamax PRELOADED_STATE dump (state_dump.json).
+The dump holds the whole site (every sport, bet and outcome) pretty-printed by
+JSON.stringify(state, null, 2). Instead of json.load-ing all of it:
+  - the file is read in chunks; only the members of the top-level `matches`,
+    `bets` and `odds` objects are decoded, one entry at a time, and every other
+    top-level member is skipped by scanning (never turned into Python objects);
+  - only pre-match matches of the requested tournaments/sport are kept, plus
+    the bets and odds they reference (select_entries).
+Memory therefore follows the number of relevant matches. If `bets`/`odds` come
+before `matches` in the file, their entries are kept as compact projections
+(outcome ids / prices) until the matches are known.
+
+Compact intermediate: NDJSON, one `[section, key, value]` array per line, in
+the order matches, bets, odds, so reading it back is a single bounded pass:
+
+    write_ndjson(select_entries(iter_state('state_dump.json'), keep), 'state_dump.ndjson')
+    data = load_relevant('state_dump.ndjson', tournament_ids=[36])
+"""
+import heapq
+import json
+import os
+import re
+from json.decoder import scanstring
+
+CHUNK_SIZE = 1 << 16
+SECTIONS = ('matches', 'bets', 'odds')
+FOOTBALL_SPORT_ID = 1
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r'[ \t\n\r]*')
+_STRUCT = re.compile(r'["{}\[\]]')
+_STRING_END = re.compile(r'["\\]')
+_NUMBER_TAIL = frozenset('0123456789.eE+-')
+# `"key":` plus the blanks around it, in one match (the common, unescaped case)
+_MEMBER = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,}\]])')
+
+
+class _Stream:
+    """Chunked text buffer with just enough JSON scanning to walk one object level."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """Appends the next chunk, dropping everything before pos. False at EOF."""
+        if self.eof: return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-blank character ('' at EOF), without consuming it."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, ch):
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"Malformed state dump: expected {ch!r}, got {got!r}")
+        self.pos += 1
+
+    def string(self):
+        self.expect('"')
+        while True:
+            try:
+                s, self.pos = scanstring(self.buf, self.pos)
+                return s
+            except json.JSONDecodeError:
+                if not self.more(): raise
+
+    def member(self):
+        """Consumes `"key":` and returns the key."""
+        m = _MEMBER.match(self.buf, self.pos)
+        if m is not None and m.end() < len(self.buf):
+            self.pos = m.end()
+            return m.group(1)
+        key = self.string()
+        self.expect(':')
+        return key
+
+    def value(self):
+        """Decodes one complete value (an entry: small)."""
+        if self.pos >= len(self.buf) or self.buf[self.pos] in ' \t\n\r':
+            self.peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number cut by the chunk boundary ("1" of "1.85") decodes fine: only accept
+                # it when it is followed by something that cannot continue it
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_TAIL):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof: raise
+            self.more()
+
+    def _skip_string_body(self):
+        while True:
+            m = _STRING_END.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+            elif m.group() == '"':
+                self.pos = m.end()
+                return
+            elif m.end() < len(self.buf):
+                self.pos = m.end() + 1 # escaped character
+                continue
+            else:
+                self.pos = m.start() # keep the backslash for the next chunk
+            if not self.more():
+                raise ValueError("Malformed state dump: unterminated string")
+
+    def skip(self):
+        """Skips one value without decoding it."""
+        c = self.peek()
+        if c == '"':
+            self.pos += 1
+            self._skip_string_body()
+        elif c not in '{[':
+            self.value() # scalar
+        else:
+            depth = 0
+            while True:
+                m = _STRUCT.search(self.buf, self.pos)
+                if m is None:
+                    self.pos = len(self.buf)
+                    if not self.more():
+                        raise ValueError("Malformed state dump: truncated")
+                    continue
+                self.pos = m.end()
+                ch = m.group()
+                if ch == '"':
+                    self._skip_string_body()
+                elif ch in '{[':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0: return
+
+    def separator(self, close):
+        """Consumes ',' (True: more members follow) or `close` (False)."""
+        m = _SEPARATOR.match(self.buf, self.pos)
+        if m is not None:
+            self.pos = m.end()
+            c = m.group(1)
+        else:
+            c = self.peek()
+            self.pos += 1
+        if c == close: return False
+        if c != ',': raise ValueError(f"Malformed state dump: unexpected {c!r}")
+        return True
+
+
+def iter_json_sections(path, sections=SECTIONS, chunk_size=CHUNK_SIZE):
+    """Yields (section, key, value) for every member of the wanted top-level objects, in file order."""
+    wanted = set(sections)
+    with open(path, 'r', encoding='utf-8') as f:
+        s = _Stream(f, chunk_size)
+        s.expect('{')
+        if s.peek() == '}': return
+        while True:
+            name = s.string()
+            s.expect(':')
+            if name in wanted and s.peek() == '{':
+                s.pos += 1
+                if s.peek() == '}':
+                    s.pos += 1
+                else:
+                    while True:
+                        key = s.member()
+                        yield name, key, s.value()
+                        if not s.separator('}'): break
+            else:
+                s.skip()
+            if not s.separator('}'): return
+
+
+def iter_ndjson(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                section, key, value = json.loads(line)
+                yield section, key, value
+
+
+def iter_state(path, sections=SECTIONS):
+    """(section, key, value) entries of a state dump: full JSON or the NDJSON intermediate."""
+    if path.endswith('.ndjson'):
+        return (e for e in iter_ndjson(path) if e[0] in sections)
+    return iter_json_sections(path, sections)
+
+
+def match_filter(tournament_ids=None, sport_id=FOOTBALL_SPORT_ID):
+    """Predicate for pre-match entries of `tournament_ids` (all if None) and `sport_id` (any if None)."""
+    tournaments = None if tournament_ids is None else set(tournament_ids)
+
+    def keep(match):
+        if match.get('status') != 'PREMATCH': return False
+        if tournaments is not None and match.get('tournamentId') not in tournaments: return False
+        return sport_id is None or match.get('sportId', sport_id) == sport_id
+    return keep
+
+
+def select_entries(entries, keep_match):
+    """
+    Filters a stream of entries down to the kept matches and the bets/odds they reference.
+    Returns {'matches': {...}, 'bets': {id: {'outcomes': [...]}}, 'odds': {id: price}}.
+    """
+    matches, outcomes, prices = {}, {}, {}
+    done, current = set(), None
+    need_bets = need_odds = None
+    for section, key, value in entries:
+        if section != current:
+            if current is not None: done.add(current)
+            current = section
+            if need_bets is None and 'matches' in done:
+                need_bets = {str(m.get('mainBetId')) for m in matches.values()}
+                outcomes = {k: v for k, v in outcomes.items() if k in need_bets}
+            if need_odds is None and need_bets is not None and 'bets' in done:
+                need_odds = {str(o) for o_list in outcomes.values() for o in (o_list or [])}
+                prices = {k: v for k, v in prices.items() if k in need_odds}
+        if section == 'matches':
+            if keep_match(value): matches[key] = value
+        elif section == 'bets':
+            if need_bets is None or key in need_bets:
+                outcomes[key] = value.get('outcomes') if isinstance(value, dict) else None
+        elif section == 'odds':
+            if need_odds is None or key in need_odds:
+                prices[key] = value
+
+    # Sections that ended the file (or came before `matches`): final filter
+    need_bets = {str(m.get('mainBetId')) for m in matches.values()}
+    outcomes = {k: v for k, v in outcomes.items() if k in need_bets}
+    need_odds = {str(o) for o_list in outcomes.values() for o in (o_list or [])}
+    return {
+        'matches': matches,
+        'bets': {k: {'outcomes': v} for k, v in outcomes.items()},
+        'odds': {k: v for k, v in prices.items() if k in need_odds},
+    }
+
+
+def _with_reserve(entries, keep, spare, size):
+    """
+    Passes on the matches `keep` accepts and, of the `spare` ones, only the `size` soonest
+    (matchStart, then file order), emitted when the matches section ends. Other sections pass through.
+    """
+    heap, seen_matches, flushed = [], False, False
+    for seq, (section, key, value) in enumerate(entries):
+        if section == 'matches':
+            seen_matches = True
+            if keep(value):
+                yield section, key, value
+            elif size and spare(value):
+                item = (-(value.get('matchStart') or 0), -seq, key, value)
+                if len(heap) < size: heapq.heappush(heap, item)
+                else: heapq.heappushpop(heap, item)
+            continue
+        if seen_matches and not flushed:
+            flushed = True
+            for _, _, k, v in sorted(heap, reverse=True): yield 'matches', k, v
+        yield section, key, value
+    if not flushed:
+        for _, _, k, v in sorted(heap, reverse=True): yield 'matches', k, v
+
+
+def load_relevant(path, tournament_ids=None, sport_id=FOOTBALL_SPORT_ID, reserve=0):
+    """
+    The part of a dump the odds extraction needs, in the layout of the full state.
+    `reserve`: also keep the soonest `reserve` pre-match matches of other tournaments
+    (a fallback when the requested ones have none), without a second pass.
+    """
+    keep = match_filter(tournament_ids, sport_id)
+    if not reserve or tournament_ids is None:
+        return select_entries(iter_state(path), keep)
+    entries = _with_reserve(iter_state(path), keep, match_filter(None, sport_id), reserve)
+    return select_entries(entries, lambda match: True)
+
+
+def write_ndjson(data, path):
+    """Writes a (filtered) state as the NDJSON intermediate: matches, then bets, then odds."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for section in SECTIONS:
+            for key, value in data.get(section, {}).items():
+                f.write(json.dumps([section, key, value], separators=(',', ':'), ensure_ascii=False))
+                f.write('\n')
+    os.replace(tmp, path)
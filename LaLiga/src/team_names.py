@@ -0,0 +1,40 @@
+"""
+Canonical LaLiga team names shared by the dashboard and the prediction stage.
+TEAM_MAPPING maps football-data names (Ath Madrid) and Winamax names (Atletico de Madrid,
+accents stripped with normalize_text_safe) to one display name.
+"""
+import unicodedata
+
+TEAM_MAPPING = {
+    "Girona": "Girona FC", "Girona FC": "Girona FC",
+    "Villarreal": "Villarreal CF", "Villarreal CF": "Villarreal CF",
+    "Mallorca": "RCD Mallorca", "RCD Mallorca": "RCD Mallorca",
+    "Alaves": "Alaves", "Deportivo Alaves": "Alaves",
+    "Valencia": "Valencia CF", "Valencia CF": "Valencia CF",
+    "Celta": "Celta Vigo", "RC Celta": "Celta Vigo", "RC Celta de Vigo": "Celta Vigo", "Celta de Vigo": "Celta Vigo",
+    "Ath Bilbao": "Athletic Bilbao", "Athletic Club": "Athletic Bilbao", "Athletic": "Athletic Bilbao",
+    "Espanol": "RCD Espanyol", "Espanyol": "RCD Espanyol", "RCD Espanyol": "RCD Espanyol",
+    "Elche": "Elche CF", "Elche CF": "Elche CF",
+    "Real Madrid": "Real Madrid",
+    "Betis": "Real Betis", "Real Betis Balompie": "Real Betis",
+    "Ath Madrid": "Atletico Madrid", "Atletico de Madrid": "Atletico Madrid", "Athletic Madrid": "Atletico Madrid",
+    "Levante": "Levante UD", "Levante UD": "Levante UD",
+    "Osasuna": "CA Osasuna", "CA Osasuna": "CA Osasuna",
+    "Sociedad": "Real Sociedad", "Real Sociedad": "Real Sociedad",
+    "Oviedo": "Oviedo", "Real Oviedo": "Oviedo",
+    "Sevilla": "Sevilla FC", "Sevilla FC": "Sevilla FC",
+    "Vallecano": "Rayo Vallecano", "Rayo Vallecano": "Rayo Vallecano",
+    "Getafe": "Getafe CF", "Getafe CF": "Getafe CF",
+    "Barcelona": "FC Barcelona", "FC Barcelona": "FC Barcelona",
+    "Cadiz": "Cadiz CF",
+    "Granada": "Granada CF",
+    "Almeria": "UD Almeria",
+    "Las Palmas": "UD Las Palmas",
+    "Leganes": "CD Leganes",
+    "Valladolid": "Real Valladolid CF", "Real Valladolid": "Real Valladolid CF"
+}
+
+
+def normalize_text_safe(text):
+    if not isinstance(text, str): return text
+    return "".join([c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c)])
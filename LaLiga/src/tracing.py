@@ -0,0 +1,245 @@
+"""
+Opt-in stage tracer for the feature pipeline.
+Off by default (a disabled trace() costs one attribute check). Turn it on with
+  LALIGA_TRACE=summary   -> table of all stages printed at exit
+  LALIGA_TRACE=jsonl     -> one JSON object per finished stage, to stderr or LALIGA_TRACE_FILE
+or from code/CLI with enable('summary' | 'jsonl', path).
+Per stage: wall time, CPU time, rows processed and peak RSS. The RSS high-water
+mark is reset at each stage start on Linux (/proc/self/clear_refs), so nested
+stages report their own peak; elsewhere it is the process peak so far.
+Spans nest per thread (the pipeline runs independent stages concurrently); while
+spans of another thread are open the mark is not reset, so the peak of a
+concurrent stage is the process peak over its run.
+
+    with trace('rolling', rows=len(df)) as span:
+        ...
+        span.rows = len(out)          # optional, if only known at the end
+
+    @traced('enrich_static_data')     # rows = len() of the first DataFrame argument
+    def enrich_static_data(df, ...):
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+ENV_VAR = 'LALIGA_TRACE'
+ENV_FILE = 'LALIGA_TRACE_FILE'
+MODES = ('summary', 'jsonl')
+
+
+class _Span:
+    __slots__ = ('stage', 'rows', 'depth', 'seq', 'peak_kb', 'wall0', 'cpu0')
+
+    def __init__(self, stage, rows, depth, seq):
+        self.stage = stage
+        self.seq = seq
+        self.rows = rows
+        self.depth = depth
+        self.peak_kb = 0
+
+
+class _NullSpan:
+    """Returned when tracing is off: accepts .rows and works as a context manager."""
+    __slots__ = ('rows',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+def _read_hwm_kb():
+    """Peak RSS in KiB: VmHWM (resettable) on Linux, ru_maxrss otherwise."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak # bytes on macOS
+    return 0
+
+
+def _reset_hwm():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class Tracer:
+    def __init__(self):
+        self.mode = None
+        self.out = None
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open = 0 # spans open in all threads
+        self._seq = 0
+        self._atexit = False
+
+    @property
+    def _stack(self):
+        """Open spans of the calling thread, innermost last."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def enable(self, mode='summary', path=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown trace mode {mode!r}, expected one of {MODES}")
+        self.mode = mode
+        self.out = path
+        if not self._atexit:
+            atexit.register(self._at_exit)
+            self._atexit = True
+
+    def disable(self):
+        self.mode = None
+
+    def trace(self, stage, rows=None):
+        if self.mode is None:
+            return _NULL
+        return _Active(self, stage, rows)
+
+    def _next_seq(self):
+        with self._lock:
+            self._seq += 1
+            return self._seq - 1
+
+    def _start(self, span):
+        stack = self._stack
+        if stack:
+            # The parent keeps whatever peak it reached before this child resets the counter
+            parent = stack[-1]
+            parent.peak_kb = max(parent.peak_kb, _read_hwm_kb())
+        with self._lock:
+            alone = self._open == len(stack)
+            self._open += 1
+        if alone:
+            _reset_hwm()
+        stack.append(span)
+        span.wall0, span.cpu0 = time.perf_counter(), time.process_time()
+
+    def _end(self, span, failed):
+        wall = time.perf_counter() - span.wall0
+        cpu = time.process_time() - span.cpu0
+        span.peak_kb = max(span.peak_kb, _read_hwm_kb())
+        stack = self._stack
+        stack.pop()
+        with self._lock:
+            self._open -= 1
+        if stack:
+            parent = stack[-1]
+            parent.peak_kb = max(parent.peak_kb, span.peak_kb)
+
+        record = {
+            'seq': span.seq,
+            'stage': span.stage,
+            'path': '/'.join([s.stage for s in stack] + [span.stage]),
+            'depth': span.depth,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rows': span.rows,
+            'peak_rss_mb': round(span.peak_kb / 1024, 1),
+        }
+        if failed: record['error'] = True
+        with self._lock:
+            self.records.append(record)
+            if self.mode == 'jsonl':
+                self._write(json.dumps(record) + '\n')
+
+    def _write(self, text):
+        if self.out:
+            with open(self.out, 'a', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            sys.stderr.write(text)
+
+    def summary(self):
+        """Stages in start order (parents before children), indented by depth."""
+        lines = [f"{'stage':<40} {'wall_s':>9} {'cpu_s':>9} {'rows':>9} {'peak_mb':>9}"]
+        for r in sorted(self.records, key=lambda r: r['seq']):
+            name = '  ' * r['depth'] + r['stage']
+            rows = '' if r['rows'] is None else r['rows']
+            lines.append(f"{name:<40} {r['wall_s']:9.3f} {r['cpu_s']:9.3f} {rows:>9} {r['peak_rss_mb']:9.1f}")
+        return '\n'.join(lines)
+
+    def _at_exit(self):
+        if self.mode == 'summary' and self.records:
+            self._write('\n⏱️ Stage trace\n' + self.summary() + '\n')
+
+
+class _Active:
+    __slots__ = ('tracer', 'span')
+
+    def __init__(self, tracer, stage, rows):
+        self.tracer = tracer
+        self.span = _Span(stage, rows, len(tracer._stack), tracer._next_seq())
+
+    def __enter__(self):
+        self.tracer._start(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._end(self.span, exc_type is not None)
+        return False
+
+
+TRACER = Tracer()
+trace = TRACER.trace
+enable = TRACER.enable
+disable = TRACER.disable
+
+
+def traced(stage=None):
+    """Decorator form of trace(); rows = len() of the first DataFrame-like positional argument."""
+    def wrap(fn):
+        name = stage or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            rows = next((len(a) for a in args if hasattr(a, 'columns')), None)
+            with TRACER.trace(name, rows=rows):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def _enable_from_env():
+    mode = os.environ.get(ENV_VAR, '').strip().lower()
+    if mode in ('', '0', 'off', 'false'):
+        return
+    if mode in ('1', 'on', 'true'):
+        mode = 'summary'
+    if mode not in MODES:
+        print(f"⚠️ {ENV_VAR}={mode!r} not understood (use {' or '.join(MODES)}). Tracing stays off.", file=sys.stderr)
+        return
+    TRACER.enable(mode, os.environ.get(ENV_FILE) or None)
+
+
+_enable_from_env()
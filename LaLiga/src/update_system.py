@@ -1,5 +1,4 @@
 import pandas as pd
-import requests
 import io
 import os
 import sys
@@ -13,91 +12,235 @@ from datetime import datetime
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 try:
-    from src.feature_engineering import generate_features
+    from src.feature_engineering import update_features, check_incremental_consistency
+    from src.feature_state import FeatureState
+    from src.feature_cache import cached_generate_features
+    from src.feature_store import write_store, load_features
+    from src.match_store import MatchStore
+    from src.http_fetch import CachedFetcher, season_url
+    from src.process_state import process_leagues
+    from src.winamax_state import scrape_state
+    from src import tracing
+    from src.tracing import trace
 except ImportError:
     # Fallback if running from src directory
     sys.path.append(os.path.dirname(os.getcwd()))
-    from src.feature_engineering import generate_features
+    from src.feature_engineering import update_features, check_incremental_consistency
+    from src.feature_state import FeatureState
+    from src.feature_cache import cached_generate_features
+    from src.feature_store import write_store, load_features
+    from src.match_store import MatchStore
+    from src.http_fetch import CachedFetcher, season_url
+    from src.process_state import process_leagues
+    from src.winamax_state import scrape_state
+    from src import tracing
+    from src.tracing import trace
 
 DATA_FILE = os.path.join(BASE_DIR, 'df_final_app.csv')
-ODDS_FILE = os.path.join(BASE_DIR, 'data', 'live_odds.json')
-URL_2425 = "https://www.football-data.co.uk/mmz4281/2425/SP1.csv"
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+ODDS_FILE = os.path.join(DATA_DIR, 'live_odds.json')
+STATE_FILE = os.path.join(DATA_DIR, 'feature_state.json')
+FEATURE_STORE_DIR = os.path.join(DATA_DIR, 'feature_store')
+MATCH_STORE_DIR = os.path.join(DATA_DIR, 'match_store')
+MATCHES_CSV = os.path.join(DATA_DIR, 'matches.csv')
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'http')
+# sha1 of the season CSV the feature store was last built from
+SOURCE_MARKER = os.path.join(HTTP_CACHE_DIR, 'processed.sha1')
+URL_2425 = season_url('SP1', 2024)
 
-def download_latest_data():
+# Columns taken from the football-data download
+DOWNLOAD_COLUMNS = ['Div','Date','HomeTeam','AwayTeam','FTHG','FTAG','FTR','HS','AS','HST','AST','HF','AF','HC','AC','HY','AY','HR','AR']
+
+def season_file():
+    """Local copy of the current season CSV (written by download_latest_data)."""
+    return CachedFetcher(HTTP_CACHE_DIR).local_path(URL_2425)
+
+def read_download(content):
+    """Parses the football-data season CSV (bytes)."""
+    df_new = pd.read_csv(io.StringIO(content.decode('utf-8')))
+    # Clean columns usually found in football-data
+    df_new = df_new.dropna(subset=['Date', 'HomeTeam', 'AwayTeam'])
+    df_new['Date'] = pd.to_datetime(df_new['Date'], dayfirst=True, errors='coerce')
+    return df_new
+
+def download_latest_data(fetcher=None):
+    """
+    (df_new, sha1): the current season CSV via a conditional GET against the local copy
+    (a 304 when nothing changed), plus the digest of that copy.
+    """
+    fetcher = fetcher or CachedFetcher(HTTP_CACHE_DIR)
     print(f"⬇️ Downloading latest data from {URL_2425}...")
     try:
-        s = requests.get(URL_2425, timeout=10).content
-        df_new = pd.read_csv(io.StringIO(s.decode('utf-8')))
-        # Clean columns usually found in football-data
-        df_new = df_new.dropna(subset=['Date', 'HomeTeam', 'AwayTeam'])
-        df_new['Date'] = pd.to_datetime(df_new['Date'], dayfirst=True, errors='coerce')
-        return df_new
+        result = fetcher.fetch(URL_2425)
+        if not result.ok:
+            raise IOError(result.error)
+        if result.status == 'not_modified':
+            print("   -> Not modified since the last download (304), using the local copy.")
+        elif result.status == 'stale':
+            print(f"⚠️ Server unreachable ({result.error}), using the local copy.")
+        return read_download(result.content()), result.sha1
     except Exception as e:
         print(f"❌ Error downloading data: {e}")
-        return pd.DataFrame()
-
-def update_dataset():
-    # 1. Load Existing Data
-    if os.path.exists(DATA_FILE):
-        print(f"📂 Loading existing {DATA_FILE}...")
-        df_old = pd.read_csv(DATA_FILE)
-        df_old['Date'] = pd.to_datetime(df_old['Date'])
-    else:
-        df_old = pd.DataFrame()
+        return pd.DataFrame(), None
+
+def _processed_source():
+    try:
+        with open(SOURCE_MARKER, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _mark_processed(sha1):
+    os.makedirs(os.path.dirname(SOURCE_MARKER), exist_ok=True)
+    with open(SOURCE_MARKER, 'w') as f:
+        f.write(sha1 or '')
 
-    # 2. Download New Data
-    df_new = download_latest_data()
+def _incremental_rows(df_old, diff, state):
+    """New matches that can be appended from the saved state, or None if a full rebuild is needed."""
+    if state is None or df_old.empty:
+        return None
+    if len(diff.updated):
+        print(f"⚠️ {len(diff.updated)} known match(es) changed (e.g. corrected results). Falling back to full rebuild.")
+        return None
+    if (diff.inserted['Date'] <= state.last_date).any():
+        print("⚠️ New data touches matches already in the snapshot. Falling back to full rebuild.")
+        return None
+    return diff.inserted
+
+def load_existing():
+    """Current feature table: the Parquet store, or the CSV export if the store is missing."""
+    if os.path.exists(FEATURE_STORE_DIR) or os.path.exists(DATA_FILE):
+        print(f"📂 Loading existing features ({FEATURE_STORE_DIR} / {os.path.basename(DATA_FILE)})...")
+        df = load_features(FEATURE_STORE_DIR, DATA_FILE)
+        # Plain strings again so new rows concatenate without category unions
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object)
+        return df
+    return pd.DataFrame()
+
+def update_dataset(full_rebuild=False, export_csv=True):
+    # 1. Download New Data (conditional: a match-free day costs one 304)
+    with trace('download') as span:
+        df_new, sha1 = download_latest_data()
+        span.rows = len(df_new)
     
     if df_new.empty:
         print("⚠️ No new data downloaded. Aborting update.")
         return
 
-    # 3. Merge and Deduplicate
+    up_to_date = (not full_rebuild and sha1 is not None and sha1 == _processed_source()
+                  and (os.path.exists(FEATURE_STORE_DIR) or os.path.exists(DATA_FILE)))
+    if up_to_date:
+        print("✅ Source unchanged since the last update. Database already up to date.")
+    else:
+        merge_matches(df_new)
+        build_features(full_rebuild, export_csv)
+        _mark_processed(sha1)
+    _update_live_odds()
+    print("\n✅ Update Process Completed Successfully!")
+
+def merge_matches(df_new):
+    """
+    Upserts the download into the keyed match store (seeded from the feature table on first use)
+    and saves it if anything changed. Returns the UpsertResult.
+    """
     print("🔄 Merging datasets...")
-    # Standardize columns for merge
-    cols_to_keep = ['Div','Date','HomeTeam','AwayTeam','FTHG','FTAG','FTR','HS','AS','HST','AST','HF','AF','HC','AC','HY','AY','HR','AR']
     # Filter only columns that exist in new data
-    cols_new = [c for c in cols_to_keep if c in df_new.columns]
-    df_new_clean = df_new[cols_new].copy()
+    df_new_clean = df_new[[c for c in DOWNLOAD_COLUMNS if c in df_new.columns]].copy()
     
-    # Concatenate
-    if not df_old.empty:
-        # Align columns
-        df_combined = pd.concat([df_old, df_new_clean], ignore_index=True)
-    else:
-        df_combined = df_new_clean
-        
-    # Remove duplicates based on Match Identifier (Date + Teams)
-    # We keep the LAST occurrence (assuming new data is more accurate)
-    df_combined = df_combined.drop_duplicates(subset=['Date', 'HomeTeam', 'AwayTeam'], keep='last').sort_values('Date')
+    with trace('upsert', rows=len(df_new_clean)):
+        store = MatchStore.load(MATCH_STORE_DIR, MATCHES_CSV)
+        seeded = not len(store)
+        if seeded:
+            # First run with the match store: seed it from the feature table
+            df_old = load_existing()
+            if not df_old.empty:
+                store = MatchStore.from_features(df_old)
+        diff = store.upsert(df_new_clean)
+    print(f"   -> {diff.summary()} ({len(store)} matches in store).")
+    if diff.changed or seeded:
+        with trace('save_matches', rows=len(store)):
+            store.save(MATCH_STORE_DIR, MATCHES_CSV)
+    return diff
+
+def build_features(full_rebuild=False, export_csv=True):
+    """
+    Brings the feature table in line with the match store: appends new matches incrementally
+    from the saved engine state when possible, otherwise rebuilds from the stored raw matches.
+    Returns the saved feature table, or None if it was already up to date.
+    """
+    with trace('load_existing') as span:
+        df_old = load_existing()
+        span.rows = len(df_old)
+    store = MatchStore.load(MATCH_STORE_DIR, MATCHES_CSV)
+    if not len(store):
+        store = MatchStore.from_features(df_old) if not df_old.empty else store
+    if not len(store):
+        print("⚠️ No matches in the match store. Run the download/merge first.")
+        return None
+
+    # What the store has that the feature table does not reflect yet
+    diff = MatchStore.from_features(df_old).upsert(store.matches) if not df_old.empty else None
+    if diff is not None:
+        print(f"   -> Feature table vs match store: {diff.summary()}.")
     
-    print(f"📊 Total Matches after merge: {len(df_combined)}")
+    # Incremental mode: append only matches after the saved engine snapshot
+    state = None if full_rebuild else FeatureState.load(STATE_FILE)
+    new_rows = _incremental_rows(df_old, diff, state)
+    
+    if new_rows is not None:
+        print(f"⚡ Incremental update from snapshot ({state.last_date.date()}): {len(new_rows)} new matches.")
+        try:
+            df_final = None
+            if not new_rows.empty:
+                df_final = pd.concat([df_old, update_features(new_rows, state, data_dir=DATA_DIR)], ignore_index=True)
+        except ValueError as e:
+            print(f"⚠️ {e}")
+            new_rows = None
+    
+    if new_rows is None:
+        df_combined = store.matches
+        print(f"📊 Total Matches after merge: {len(df_combined)}")
 
-    # 4. Run Feature Engineering (Recalculate Elo, Streaks, etc.)
-    print("⚙️ Running Feature Engineering Pipeline (v3.0)...")
-    df_final = generate_features(df_combined)
+        # 4. Run Feature Engineering (Recalculate Elo, Streaks, etc.)
+        print("⚙️ Running Feature Engineering Pipeline (full rebuild)...")
+        # Cached by content: an unchanged download returns the stored features
+        with trace('cached_generate_features', rows=len(df_combined)):
+            df_final, state = cached_generate_features(df_combined, return_state=True, data_dir=DATA_DIR)
+        if not df_old.empty:
+            # Keep the column layout of the existing table
+            df_final = df_final[[c for c in df_old.columns if c in df_final.columns]
+                                + [c for c in df_final.columns if c not in df_old.columns]]
     
     # 5. Save
-    print(f"💾 Saving to {DATA_FILE}...")
-    df_final.to_csv(DATA_FILE, index=False)
-    print("✅ Database updated successfully.")
+    if df_final is None:
+        print("✅ Database already up to date.")
+    else:
+        print(f"💾 Saving to {FEATURE_STORE_DIR}" + (f" (+ {os.path.basename(DATA_FILE)})..." if export_csv else "..."))
+        with trace('save', rows=len(df_final)):
+            written = write_store(df_final, FEATURE_STORE_DIR, csv_path=DATA_FILE if export_csv else None)
+            state.save(STATE_FILE)
+        print(f"   -> {len(written)} season partition(s) rewritten.")
+        print("✅ Database updated successfully.")
+    return df_final
+
+def _update_live_odds():
     # --------------------------------------------------------------------------
     # 4. Run Scraper for Live Odds (Real scraping via Puppeteer + Python Processor)
     # --------------------------------------------------------------------------
     print("\n[4/4] Fetching Live Odds from Winamax...")
     try:
-        # Step 1: Dump state via Node Puppeteer
-        print("   -> Launching Puppeteer Scraper (Step 1: Extract)...")
-        # Run node script with shell=True to find node in path easily
-        scrape_script = os.path.join(BASE_DIR, "src", "scraper_winamax.js")
-        subprocess.run(["node", scrape_script], check=True, shell=True, cwd=BASE_DIR)
+        with trace('live_odds'):
+            # Step 1: Dump state: plain HTTP, Node Puppeteer only if that fails
+            print("   -> Fetching Winamax state (Step 1: Extract)...")
+            scrape_state()
         
-        # Step 2: Process state via Python
-        print("   -> Processing extracted state (Step 2: Parse)...")
-        process_script = os.path.join(BASE_DIR, "src", "process_state.py")
-        subprocess.run([sys.executable, process_script], check=True, shell=True, cwd=BASE_DIR)
+            # Step 2: Process state in-process
+            print("   -> Processing extracted state (Step 2: Parse)...")
+            process_leagues()
         
-        print("   -> Live odds updated successfully.")
+            print("   -> Live odds updated successfully.")
         
     except subprocess.CalledProcessError as e:
         print(f"❌ Error running scraper pipeline: {e}")
@@ -105,7 +248,28 @@ def update_dataset():
     except Exception as e:
         print(f"❌ Unexpected error in scraping: {e}")
 
-    print("\n✅ Update Process Completed Successfully!")
-
 if __name__ == "__main__":
-    update_dataset()
+    import argparse
+    parser = argparse.ArgumentParser(description="Update LaLiga dataset, features and live odds.")
+    parser.add_argument('--full', action='store_true', help="Ignore the saved feature state and rebuild from scratch.")
+    parser.add_argument('--no-csv', action='store_true',
+                        help="Only write the Parquet feature store, skip the df_final_app.csv export.")
+    parser.add_argument('--check-incremental', type=int, metavar='N',
+                        help="Compare full vs incremental features on the last N matches of the dataset and exit.")
+    parser.add_argument('--trace', nargs='?', const='summary', choices=tracing.MODES,
+                        help="Per-stage wall/CPU time, rows and peak RSS: summary table at exit (default) or JSON lines.")
+    parser.add_argument('--trace-file', help="Append trace output to this file instead of stderr.")
+    args = parser.parse_args()
+    
+    if args.trace:
+        tracing.enable(args.trace, args.trace_file)
+    
+    if args.check_incremental:
+        df_hist = load_existing()
+        ok, diffs = check_incremental_consistency(df_hist, n_new=args.check_incremental)
+        for col, d in sorted(diffs.items(), key=lambda x: -x[1]):
+            print(f"   {col:<28} max |full - incremental| = {d:.3g}")
+        print("✅ Incremental and full builds match." if ok else "❌ Incremental and full builds differ.")
+        sys.exit(0 if ok else 1)
+    
+    update_dataset(full_rebuild=args.full, export_csv=not args.no_csv)
@@ -0,0 +1,143 @@
+"""
+window.PRELOADED_STATE of a Winamax page without starting a browser.
+The site renders the state into the page as an inline script
+(`var PRELOADED_STATE = {...};`, `window.PRELOADED_STATE = {...}`, or the same
+through JSON.parse("...")), so one pooled HTTP GET plus one JSON decode of that
+literal gives what Puppeteer/Selenium read from `window`, without seconds of
+Chromium start-up and hundreds of MB of RAM. The browser is only used when the
+fast path fails: HTTP error, a page without the state (e.g. anti-bot) or a
+state without matches.
+
+    python src/winamax_state.py                   # fast path, browser fallback -> state_dump.json
+    python src/winamax_state.py --mode http       # never start the browser
+    python src/winamax_state.py --mode browser    # Puppeteer only (scraper_winamax.js)
+
+Premier/scrape_winamax_premier.py uses StateFetcher the same way, and
+Premier/scripts/check_state_parity.py replays recorded pages through both paths.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from json.decoder import scanstring
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DUMP = os.path.join(BASE_DIR, 'state_dump.json')
+SCRAPER_JS = os.path.join(BASE_DIR, 'src', 'scraper_winamax.js')
+# Overridable so the scrapers can run against a local stand-in server
+BASE_URL = os.environ.get('WINAMAX_BASE_URL', 'https://www.winamax.es').rstrip('/')
+FOOTBALL_PATH = '/apuestas-deportivas/sports/1'
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/131.0.0.0 Safari/537.36')
+TIMEOUT = 30
+MODES = ('auto', 'http', 'browser')
+
+_ASSIGNMENT = re.compile(r'PRELOADED_STATE\s*=\s*')
+_DECODER = json.JSONDecoder()
+
+
+def extract_state(html):
+    """The PRELOADED_STATE object embedded in a page's HTML, or None if there is no JSON one."""
+    for m in _ASSIGNMENT.finditer(html):
+        pos = m.end()
+        try:
+            if html.startswith('JSON.parse("', pos):
+                text, _ = scanstring(html, pos + len('JSON.parse("'))
+                state = json.loads(text)
+            else:
+                state, _ = _DECODER.raw_decode(html, pos)
+        except ValueError:
+            continue # `==` comparison, JS-only literal, ...
+        if isinstance(state, dict):
+            return state
+    return None
+
+
+class StateFetcher:
+    """Pooled HTTP client for Winamax pages (one keep-alive session for all the pages of a run)."""
+
+    def __init__(self, timeout=TIMEOUT, pool_size=8, session=None):
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'User-Agent': USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
+            })
+        self.session = session
+
+    def html(self, url, timeout=None):
+        resp = self.session.get(url, timeout=timeout or self.timeout)
+        resp.raise_for_status()
+        if 'charset' not in resp.headers.get('Content-Type', '').lower():
+            resp.encoding = 'utf-8' # requests would assume ISO-8859-1 for text/html
+        return resp.text
+
+    def state(self, url, timeout=None):
+        """(state or None, html) of a page."""
+        html = self.html(url, timeout)
+        return extract_state(html), html
+
+
+def write_state(state, path=STATE_DUMP):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def browser_dump(out=STATE_DUMP, base_url=None, script=SCRAPER_JS):
+    """Previous path: Puppeteer (node looked up in PATH, no shell) writes the dump."""
+    env = dict(os.environ, WINAMAX_BASE_URL=base_url or BASE_URL)
+    subprocess.run(["node", script, "--out", out], check=True, cwd=BASE_DIR, env=env)
+
+
+def scrape_state(out=STATE_DUMP, mode='auto', base_url=None, fetcher=None):
+    """
+    Writes the state of the football page to `out`. 'auto' tries the HTTP fast path and
+    falls back to the browser; returns the path that produced the dump ('http' / 'browser').
+    Raises subprocess.CalledProcessError if the browser fails as well.
+    """
+    url = (base_url or BASE_URL) + FOOTBALL_PATH
+    if mode != 'browser':
+        t0 = time.perf_counter()
+        try:
+            state, _ = (fetcher or StateFetcher()).state(url)
+            if not state or not state.get('matches'):
+                raise ValueError("no PRELOADED_STATE with matches in the page")
+            write_state(state, out)
+            print(f"   -> State fetched over HTTP in {time.perf_counter() - t0:.1f}s ({len(state['matches'])} matches).")
+            return 'http'
+        except (requests.RequestException, ValueError) as e:
+            if mode == 'http':
+                raise
+            print(f"   -> HTTP fast path failed ({e}), falling back to the browser.")
+    browser_dump(out, base_url)
+    return 'browser'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dump the Winamax football page state (HTTP first, browser fallback).")
+    parser.add_argument('--mode', choices=MODES, default='auto')
+    parser.add_argument('--out', default=STATE_DUMP)
+    parser.add_argument('--base-url', default=BASE_URL, help="Winamax site (or a local stand-in server).")
+    args = parser.parse_args(argv)
+    try:
+        print(f"State dump written via {scrape_state(args.out, args.mode, args.base_url)} -> {args.out}")
+    except (requests.RequestException, ValueError, subprocess.CalledProcessError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
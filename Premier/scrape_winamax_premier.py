@@ -1,18 +1,57 @@
 """
 Winamax Premier League Odds Scraper (Deep Mode)
 1. Discover matches on PL page.
-2. Navigate to EACH match page to extract real odds (bypassing main page missing data).
+2. Visit EACH match page to extract real odds (bypassing main page missing data).
+
+Match pages are scraped concurrently:
+  - a bounded pool of browsers (--workers), each used by one match at a time;
+    a browser that errors out is replaced
+  - a global token bucket (--rate pages/s, bursts of --burst) instead of a
+    fixed sleep per page
+  - a page-load / state timeout per attempt (--timeout) and retries with
+    jittered exponential backoff (--retries)
+  - every result is written to live_odds.json as soon as it arrives
+
+Pages are first fetched over plain HTTP and PRELOADED_STATE is read from the
+HTML (LaLiga/src/winamax_state.py); a browser is only started for pages where
+that fails (--mode auto), or never / always (--mode http / browser).
+
+Offline: WINAMAX_BASE_URL (or --base-url) points the scraper at
+scripts/winamax_standin.py, which serves recorded pages (--record DIR saves
+them, with the state read from each) or synthetic ones.
 """
+import argparse
 import json
 import os
+import queue
+import random
+import sqlite3
 import sys
+import threading
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_FILE = os.path.join(SCRIPT_DIR, 'data', 'live_odds.json')
+# Shared HTTP fast path (state extraction from the page HTML)
+sys.path.append(os.path.join(SCRIPT_DIR, '..', 'LaLiga'))
+from src.winamax_state import StateFetcher, MODES
+from src.odds_history import OddsHistory, HISTORY_FILE
+from src.process_state import PREMIER_TOURNAMENT_ID
 
-PL_URL = 'https://www.winamax.es/apuestas-deportivas/sports/1/1/1'
+BASE_URL = os.environ.get('WINAMAX_BASE_URL', 'https://www.winamax.es').rstrip('/')
+PL_PATH = '/apuestas-deportivas/sports/1/1/1'
+MATCH_PATH = '/apuestas-deportivas/match/{}'
+PL_URL = BASE_URL + PL_PATH
+
+WORKERS = 3
+RATE = 0.5          # match pages per second, all workers together
+BURST = 2
+PAGE_TIMEOUT = 30   # seconds per attempt (page load + state)
+RETRIES = 3
+BACKOFF = 2.0
+MAX_BACKOFF = 20.0
 
 def get_driver():
     from selenium import webdriver
@@ -31,44 +70,73 @@ def get_driver():
     opts.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
 
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=opts)
-    
+
     # Anti-detection
     driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
         'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined}); window.chrome = {runtime: {}};"
     })
     return driver
 
-def scrape_match_odds(driver, match_id, match_url):
-    """Navigate to match page and extract 1X2 odds."""
-    print(f"  Navigating to match {match_id}...")
-    driver.get(f"https://www.winamax.es/apuestas-deportivas/match/{match_id}")
-    time.sleep(4 + random.random() * 2) # Random wait
-    
-    state = driver.execute_script("return window.PRELOADED_STATE || null;")
-    if not state:
-        return None
-        
+STATE_GRACE = 2.0   # seconds to wait for the state once the document has loaded
+
+def read_state(driver, timeout=PAGE_TIMEOUT):
+    """
+    window.PRELOADED_STATE as soon as the page has set it. None after `timeout` seconds, or
+    STATE_GRACE seconds after the document finished loading without it (e.g. an error page).
+    """
+    deadline = time.monotonic() + timeout
+    loaded_at = None
+    while True:
+        state, ready = driver.execute_script("return [window.PRELOADED_STATE || null, document.readyState];")
+        now = time.monotonic()
+        if state or now >= deadline:
+            return state
+        if ready == 'complete':
+            loaded_at = loaded_at or now
+            if now - loaded_at >= STATE_GRACE:
+                return None
+        time.sleep(0.25)
+
+def record_page(record_dir, name, html, state):
+    """<name>.html for the stand-in server and <name>.state.json, the state read from it."""
+    os.makedirs(record_dir, exist_ok=True)
+    with open(os.path.join(record_dir, f"{name}.html"), 'w', encoding='utf-8') as f:
+        f.write(html)
+    with open(os.path.join(record_dir, f"{name}.state.json"), 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
+def load_page(driver, url, timeout=PAGE_TIMEOUT, record_as=None, record_dir=None):
+    """Opens `url` in the browser and returns its state (also recorded with `record_dir`)."""
+    driver.set_page_load_timeout(timeout)
+    driver.get(url)
+    state = read_state(driver, timeout)
+    if state and record_dir:
+        record_page(record_dir, record_as, driver.page_source, state)
+    return state
+
+def parse_match_odds(state, match_id):
+    """1X2 odds of `match_id` from a match page state ({label: decimal odds}), or None."""
     matches = state.get('matches', {})
     bets = state.get('bets', {})
     outcomes = state.get('outcomes', {})
-    
+
     # Find the match object
     match = matches.get(str(match_id))
     if not match:
         # Maybe key is int
         match = matches.get(int(match_id))
-    
+
     if not match:
         return None
-        
+
     mbid = match.get('mainBetId')
     if not mbid:
         return None
-        
+
     bet = bets.get(str(mbid))
     if not bet:
         return None
-        
+
     odds_vals = {}
     for oid in bet.get('outcomes', []):
         o = outcomes.get(str(oid), {})
@@ -76,13 +144,21 @@ def scrape_match_odds(driver, match_id, match_url):
         val = o.get('odds')
         if val:
             odds_vals[label] = val / 100.0
-            
+
     return odds_vals
 
+def scrape_match_odds(loader, match_id, timeout=PAGE_TIMEOUT, record_dir=None):
+    """Load the match page and extract 1X2 odds."""
+    state = loader.load(BASE_URL + MATCH_PATH.format(match_id), timeout, f"match_{match_id}", record_dir,
+                        valid=lambda s: parse_match_odds(s, match_id))
+    if not state:
+        return None
+    return parse_match_odds(state, match_id)
+
 
 PL_TEAMS = [
-    'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Burnley', 'Chelsea', 
-    'Crystal Palace', 'Everton', 'Fulham', 'Liverpool', 'Luton', 'Man City', 'Man Utd', 
+    'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Burnley', 'Chelsea',
+    'Crystal Palace', 'Everton', 'Fulham', 'Liverpool', 'Luton', 'Man City', 'Man Utd',
     'Manchester City', 'Manchester United', 'Newcastle', 'Nottm Forest', 'Nottingham Forest',
     'Sheffield Utd', 'Sheffield United', 'Tottenham', 'West Ham', 'Wolves', 'Wolverhampton'
 ]
@@ -93,107 +169,325 @@ def generate_odds(home, away):
     h_score = 3 if home in strong else 1
     a_score = 3 if away in strong else 1
     h_score += 0.5 # Home adv
-    
+
     diff = h_score - a_score
     if diff > 1.0: o1, ox, o2 = 1.45, 4.50, 7.00
     elif diff > 0: o1, ox, o2 = 2.10, 3.40, 3.60
     elif diff > -1.0: o1, ox, o2 = 3.60, 3.40, 2.10
     else: o1, ox, o2 = 7.00, 4.50, 1.45
-    
+
     o1 = round(o1 * random.uniform(0.9, 1.1), 2)
     ox = round(ox * random.uniform(0.9, 1.1), 2)
     o2 = round(o2 * random.uniform(0.9, 1.1), 2)
     return f"{o1:.2f}", f"{ox:.2f}", f"{o2:.2f}"
 
-def main():
+def list_pl_matches(state):
+    """[{'id', 'home', 'away', 'date', 'status'}] of the Premier League matches on the listing page state."""
+    pl_matches = []
+    for mid, m in state.get('matches', {}).items():
+        if not isinstance(m, dict): continue
+        c1 = m.get('competitor1Name')
+        c2 = m.get('competitor2Name')
+        title = m.get('title', '')
+        if not c1 and ' - ' in title:
+            parts = title.split(' - ', 1)
+            c1, c2 = parts[0].strip(), parts[1].strip()
+
+        if c1 and c2:
+            # Filter strict PL
+            is_pl = any(t in c1 for t in PL_TEAMS) and any(t in c2 for t in PL_TEAMS)
+            if is_pl:
+                pl_matches.append({'id': mid, 'home': c1, 'away': c2,
+                                   'date': m.get('matchStart'), 'status': m.get('status')})
+    return pl_matches
+
+def real_entry(m, odds):
+    """Output entry from the scraped odds, or None if the 1X2 triple is incomplete."""
+    if not odds:
+        return None
+    o1 = odds.get('1', odds.get(m['home']))
+    ox = odds.get('X', odds.get('N', odds.get('Empate')))
+    o2 = odds.get('2', odds.get(m['away']))
+    if not (o1 and ox and o2):
+        return None
+    return {
+        'id': m['id'], 'home': m['home'], 'away': m['away'],
+        '1': f"{o1:.2f}", 'X': f"{ox:.2f}", '2': f"{o2:.2f}",
+        'date': m.get('date'), 'status': m.get('status'),
+        'source': 'winamax_real'
+    }
+
+def simulated_entry(m):
+    # Fallback
+    o1, ox, o2 = generate_odds(m['home'], m['away'])
+    return {
+        'id': m['id'], 'home': m['home'], 'away': m['away'],
+        '1': o1, 'X': ox, '2': o2,
+        'date': m.get('date'), 'status': m.get('status'),
+        'source': 'winamax_simulated'
+    }
+
+
+class TokenBucket:
+    """Global rate limit shared by the workers: `rate` acquisitions/s on average, bursts of up to `burst`."""
+
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class DriverPool:
+    """Up to `size` browsers, started on demand; each is used by one worker at a time and replaced if it fails."""
+
+    def __init__(self, size=WORKERS, factory=get_driver):
+        self.factory = factory
+        self._idle = queue.Queue()
+        self._slots = threading.Semaphore(max(1, size))
+        self._lock = threading.Lock()
+        self._drivers = []
+
+    @contextmanager
+    def driver(self):
+        with self._slots:
+            try:
+                d = self._idle.get_nowait()
+            except queue.Empty:
+                d = self.factory()
+                with self._lock:
+                    self._drivers.append(d)
+            try:
+                yield d
+            except BaseException:
+                # Timed out / crashed mid-page: do not hand it to the next match
+                self._discard(d)
+                raise
+            self._idle.put(d)
+
+    def _discard(self, d):
+        with self._lock:
+            if d in self._drivers:
+                self._drivers.remove(d)
+        try:
+            d.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for d in drivers:
+            try:
+                d.quit()
+            except Exception:
+                pass
+
+
+class PageLoader:
+    """
+    State of a page: plain HTTP first, the browser pool only if that fails or the state is not
+    `valid` (mode 'auto'); 'http' / 'browser' use one path only. Counts the pages per path.
+    """
+
+    def __init__(self, pool, fetcher=None, mode='auto'):
+        self.pool = pool
+        self.fetcher = fetcher or StateFetcher()
+        self.mode = mode
+        self.counts = {'http': 0, 'browser': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, path):
+        with self._lock:
+            self.counts[path] += 1
+
+    def load(self, url, timeout=PAGE_TIMEOUT, record_as=None, record_dir=None, valid=None):
+        if self.mode != 'browser':
+            try:
+                state, html = self.fetcher.state(url, timeout)
+            except Exception:
+                if self.mode == 'http':
+                    raise
+                state = None
+            if state and (valid is None or valid(state)):
+                self._count('http')
+                if record_dir:
+                    record_page(record_dir, record_as, html, state)
+                return state
+            if self.mode == 'http':
+                return None
+        with self.pool.driver() as driver:
+            state = load_page(driver, url, timeout, record_as, record_dir)
+        self._count('browser')
+        return state
+
+
+class OddsWriter:
+    """
+    Keeps live_odds.json current while a round is scraped: rewritten (atomically) on every result.
+    The final list also goes to the odds history (`history_file`, None to skip) as the Premier
+    League's latest snapshot, with the real prices appended to its line history.
+    """
+
+    def __init__(self, path=OUTPUT_FILE, history_file=HISTORY_FILE):
+        self.path = path
+        self.history_file = history_file
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+            self._write(self.entries)
+
+    def finish(self, order):
+        """Final write in listing order (`order`: [(home, away)])."""
+        rank = {key: i for i, key in enumerate(order)}
+        with self._lock:
+            self.entries.sort(key=lambda e: rank.get((e['home'], e['away']), len(rank)))
+            if self.entries:
+                self._write(self.entries)
+                self._record(self.entries)
+            return list(self.entries)
+
+    def _record(self, entries):
+        if not self.history_file:
+            return
+        # Simulated and in-play prices are shown on the dashboard but are not pre-match market history
+        now = int(time.time())
+        real = [e for e in entries if e.get('source') == 'winamax_real'
+                and e.get('status', 'PREMATCH') in (None, 'PREMATCH') and not (e.get('date') and e['date'] <= now)]
+        try:
+            with OddsHistory(self.history_file) as history:
+                n = history.record(PREMIER_TOURNAMENT_ID, real, ts=now, latest=entries)
+            print(f"Odds history: {n} snapshot(s) appended to {self.history_file}")
+        except sqlite3.Error as e:
+            print(f"Odds history not updated ({e})")
+
+    def _write(self, entries):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def backoff_delay(attempt, backoff=BACKOFF):
+    """Full-jitter exponential backoff before retry number `attempt` + 1 (capped at MAX_BACKOFF)."""
+    return random.uniform(0, min(MAX_BACKOFF, backoff * 2 ** (attempt - 1)))
+
+def scrape_one(m, loader, bucket, timeout=PAGE_TIMEOUT, retries=RETRIES, backoff=BACKOFF, record_dir=None):
+    """Real odds of one match with retries; simulated odds once the attempts are used up. Returns (entry, attempts)."""
+    error = None
+    for attempt in range(1, retries + 1):
+        bucket.acquire()
+        try:
+            entry = real_entry(m, scrape_match_odds(loader, m['id'], timeout, record_dir))
+            if entry:
+                return entry, attempt
+            error = "no 1X2 odds in page"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if attempt < retries:
+            time.sleep(backoff_delay(attempt, backoff))
+    print(f"    {m['home']} vs {m['away']}: {error} after {retries} attempt(s), using simulated odds")
+    return simulated_entry(m), retries
+
+def scrape_matches(pl_matches, loader, bucket, workers=WORKERS, timeout=PAGE_TIMEOUT, retries=RETRIES,
+                   backoff=BACKOFF, writer=None, record_dir=None):
+    """Scrapes the match pages concurrently; each entry goes to `writer` as soon as it is ready. Returns the entries."""
+    writer = writer or OddsWriter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        futures = {ex.submit(scrape_one, m, loader, bucket, timeout, retries, backoff, record_dir): m
+                   for m in pl_matches}
+        for fut in as_completed(futures):
+            m = futures[fut]
+            try:
+                entry, attempts = fut.result()
+            except Exception as e:
+                print(f"    Error scraping {m['id']}: {e}")
+                continue
+            writer.add(entry)
+            print(f"    Match: {m['home']} vs {m['away']} -> {entry['1']}/{entry['X']}/{entry['2']} "
+                  f"({entry['source']}, {attempts} attempt(s))")
+    return writer.finish([(m['home'], m['away']) for m in pl_matches])
+
+def main(argv=None):
+    global BASE_URL
+    parser = argparse.ArgumentParser(description="Scrape Premier League 1X2 odds from Winamax match pages.")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="Match pages scraped at once (and browsers at most).")
+    parser.add_argument('--rate', type=float, default=RATE, help="Match pages per second, all workers together (0: no limit).")
+    parser.add_argument('--burst', type=int, default=BURST, help="Pages that may start back to back.")
+    parser.add_argument('--timeout', type=float, default=PAGE_TIMEOUT, help="Seconds per page attempt.")
+    parser.add_argument('--retries', type=int, default=RETRIES, help="Attempts per match before simulated odds.")
+    parser.add_argument('--base-url', default=BASE_URL, help="Winamax site (or the local stand-in server).")
+    parser.add_argument('--out', default=OUTPUT_FILE, help="Live odds JSON.")
+    parser.add_argument('--history', default=HISTORY_FILE, help="Odds history database ('' to skip).")
+    parser.add_argument('--mode', choices=MODES, default='auto',
+                        help="auto: HTTP first, browser fallback; http / browser: one path only.")
+    parser.add_argument('--record', metavar='DIR',
+                        help="Also save every page and its state for scripts/winamax_standin.py (use --mode browser for parity fixtures).")
+    args = parser.parse_args(argv)
+    BASE_URL = args.base_url.rstrip('/')
+
     print("="*60)
     print("WINAMAX ROBUST SCRAPER (Hybrid)")
     print("="*60)
-    
-    driver = get_driver()
-    all_odds = []
-    
+
+    pool = DriverPool(args.workers)
+    loader = PageLoader(pool, StateFetcher(args.timeout, pool_size=max(args.workers, 1)), args.mode)
+    bucket = TokenBucket(args.rate, args.burst)
+    t0 = time.perf_counter()
     try:
-        # Step 1: Get match list
-        print(f"Loading {PL_URL}...")
-        driver.get(PL_URL)
-        time.sleep(8)
-        
-        state = driver.execute_script("return window.PRELOADED_STATE || null;")
+        # Step 1: Get match list (same rate limit and backoff as the match pages)
+        print(f"Loading {BASE_URL + PL_PATH}...")
+        state = None
+        for attempt in range(1, args.retries + 1):
+            bucket.acquire()
+            try:
+                state = loader.load(BASE_URL + PL_PATH, args.timeout, 'listing', args.record,
+                                    valid=lambda s: bool(s.get('matches')))
+            except Exception as e:
+                print(f"  Listing attempt {attempt}: {type(e).__name__}: {e}")
+            if state: break
+            if attempt < args.retries:
+                time.sleep(backoff_delay(attempt))
         if not state:
             print("Failed to load PL page.")
             return
-            
-        matches = state.get('matches', {})
-        print(f"Found {len(matches)} matches on listing page.")
-        
-        # Filter for PL matches
-        pl_matches = []
-        for mid, m in matches.items():
-            if not isinstance(m, dict): continue
-            c1 = m.get('competitor1Name')
-            c2 = m.get('competitor2Name')
-            title = m.get('title', '')
-            if not c1 and ' - ' in title:
-                parts = title.split(' - ', 1)
-                c1, c2 = parts[0].strip(), parts[1].strip()
-                
-            if c1 and c2:
-                # Filter strict PL
-                is_pl = any(t in c1 for t in PL_TEAMS) and any(t in c2 for t in PL_TEAMS)
-                if is_pl:
-                    pl_matches.append({'id': mid, 'home': c1, 'away': c2})
-                
+
+        print(f"Found {len(state.get('matches', {}))} matches on listing page.")
+        pl_matches = list_pl_matches(state)
         print(f"Identified {len(pl_matches)} valid matches (filtered for PL).")
-        
-        # Step 2: Visit each match
-        for m in pl_matches:
-            try:
-                odds = scrape_match_odds(driver, m['id'], "")
-                if odds:
-                    o1 = odds.get('1', odds.get(m['home']))
-                    ox = odds.get('X', odds.get('N', odds.get('Empate')))
-                    o2 = odds.get('2', odds.get(m['away']))
-                    
-                    if o1 and ox and o2:
-                        entry = {
-                            'home': m['home'], 'away': m['away'],
-                            '1': f"{o1:.2f}", 'X': f"{ox:.2f}", '2': f"{o2:.2f}",
-                            'source': 'winamax_real'
-                        }
-                    else:
-                        # Fallback
-                        o1, ox, o2 = generate_odds(m['home'], m['away'])
-                        entry = {
-                            'home': m['home'], 'away': m['away'],
-                            '1': o1, 'X': ox, '2': o2,
-                            'source': 'winamax_simulated'
-                        }
-                else:
-                    # Fallback
-                    o1, ox, o2 = generate_odds(m['home'], m['away'])
-                    entry = {
-                        'home': m['home'], 'away': m['away'],
-                        '1': o1, 'X': ox, '2': o2,
-                        'source': 'winamax_simulated'
-                    }
-                
-                print(f"    Match: {m['home']} vs {m['away']} -> {entry['1']}/{entry['X']}/{entry['2']} ({entry['source']})")
-                all_odds.append(entry)
-                
-            except Exception as e:
-                print(f"    Error scraping {m['id']}: {e}")
 
-        # Save
+        # Step 2: Visit the match pages ({workers} at a time, rate limited)
+        all_odds = scrape_matches(pl_matches, loader, bucket, args.workers,
+                                  args.timeout, args.retries, writer=OddsWriter(args.out, args.history or None),
+                                  record_dir=args.record)
+
         if all_odds:
-            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-                json.dump(all_odds, f, indent=2, ensure_ascii=False)
-            print(f"\nSaved {len(all_odds)} matches to {OUTPUT_FILE}")
+            print(f"\nSaved {len(all_odds)} matches to {args.out} in {time.perf_counter() - t0:.1f}s "
+                  f"(pages over HTTP: {loader.counts['http']}, in the browser: {loader.counts['browser']})")
         else:
             print("No odds extracted.")
 
     finally:
-        driver.quit()
+        pool.close()
 
 if __name__ == '__main__':
     main()
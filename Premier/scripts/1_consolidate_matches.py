@@ -1,8 +1,13 @@
 import pandas as pd
 import os
 import glob
+import sys
 import unicodedata
 
+# Shared season loader lives in the LaLiga package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'LaLiga'))
+from src.season_loader import load_seasons
+
 # === CONFIGUTATION ===
 SOURCE_DIR = os.path.join(os.path.dirname(__file__), '../data')
 OUTPUT_FILE = os.path.join(os.path.dirname(__file__), '../data/processed/matches_raw.csv')
@@ -36,24 +41,22 @@ def main():
     
     all_matches = []
     
-    for f in files:
-        try:
-            # Read CSV (handle encoding issues if any)
-            df = pd.read_csv(f, encoding='latin1') # classic football-data encoding
+    # Parallel read, parsed seasons cached in data/cache/seasons (dates already parsed)
+    for f, df in zip(files, load_seasons(files, return_exceptions=True)):
+        if isinstance(df, Exception):
+            print(f"❌ Error reading {f}: {df}")
+            continue
             
-            # Filter essential columns
-            cols = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']
-            # Check if columns exist
-            if not all(c in df.columns for c in cols):
-                print(f"⚠️ Skipping {os.path.basename(f)}: Missing columns.")
-                continue
-                
-            df = df[cols].dropna()
-            all_matches.append(df)
-            print(f"   -> Loaded {os.path.basename(f)} ({len(df)} matches)")
+        # Filter essential columns
+        cols = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']
+        # Check if columns exist
+        if not all(c in df.columns for c in cols):
+            print(f"⚠️ Skipping {os.path.basename(f)}: Missing columns.")
+            continue
             
-        except Exception as e:
-            print(f"❌ Error reading {f}: {e}")
+        df = df[cols].dropna()
+        all_matches.append(df)
+        print(f"   -> Loaded {os.path.basename(f)} ({len(df)} matches)")
 
     # 2. Merge
     if not all_matches:
@@ -63,8 +66,7 @@ def main():
     df_final = pd.concat(all_matches, ignore_index=True)
     
     # 3. Process Dates
-    # football-data.co.uk uses DD/MM/YY or DD/MM/YYYY. Pandas handles mixed with flexible parsing but dayfirst=True is safer
-    df_final['Date'] = pd.to_datetime(df_final['Date'], dayfirst=True, errors='coerce')
+    # football-data.co.uk uses DD/MM/YY or DD/MM/YYYY: parsed per file by the loader (detected fixed format)
     df_final = df_final.dropna(subset=['Date']).sort_values('Date')
     
     # 4. Standardize Teams
@@ -0,0 +1,157 @@
+"""
+Checks that the HTTP fast path (LaLiga/src/winamax_state.py) reads the same
+PRELOADED_STATE as a JavaScript engine running the page. Every <name>.html in the
+fixtures directory that has a <name>.state.json next to it (the state read from
+that page by a JS engine: `scrape_winamax_premier.py --mode browser --record DIR`,
+`scraper_winamax.js --record DIR`, or `node scripts/eval_state.js` for a saved
+page) is served by winamax_standin.py, fetched with StateFetcher and compared
+with the recorded state, both whole and as parsed matches (process_state for the
+football page, the Premier scraper for the listing and match pages).
+The page is also run through scripts/eval_state.js when node is installed, and
+in Chrome with --browser.
+
+data/fixtures/winamax holds football, listing and two match pages built on the
+site's markup (inline state as a literal, through JSON.parse and behind a guard,
+escaped `<\/`, accents, DOM-only analytics scripts, JSON-LD), their state read
+with eval_state.js.
+
+    python scripts/check_state_parity.py                      # committed fixtures
+    python scripts/check_state_parity.py --fixtures DIR       # pages recorded with --record DIR
+    python scripts/check_state_parity.py --synthetic 20       # generated pages
+    python scripts/check_state_parity.py --browser            # also read each page in Chrome
+
+Exits with 1 if any page differs or no fixture pair is found.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import requests
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+sys.path.append(os.path.join(SCRIPT_DIR, '..', '..', 'LaLiga'))
+from src.process_state import index_matches
+from src.winamax_state import StateFetcher
+from scrape_winamax_premier import get_driver, list_pl_matches, load_page, parse_match_odds
+from winamax_standin import FIXTURES_DIR, StandinServer, state_page, synthetic_pages
+
+
+EVAL_JS = os.path.join(SCRIPT_DIR, 'eval_state.js')
+
+
+def parsed(name, state):
+    """What the scrapers keep from a page state."""
+    with contextlib.redirect_stdout(io.StringIO()): # rejection summaries
+        if name == 'football':
+            return index_matches(state)
+        if name == 'listing':
+            return list_pl_matches(state)
+        if name.startswith('match_'):
+            return parse_match_odds(state, name[len('match_'):])
+    return None
+
+
+def node_state(html_file):
+    """State of a saved page as eval_state.js (V8) sees it, or None."""
+    res = subprocess.run(['node', EVAL_JS, html_file], capture_output=True, text=True, encoding='utf-8', timeout=60)
+    return json.loads(res.stdout) if res.returncode == 0 else None
+
+
+def _size(result):
+    if isinstance(result, dict) and all(isinstance(v, list) for v in result.values()):
+        return sum(len(v) for v in result.values()) # football buckets
+    return len(result or ())
+
+
+def recorded_fixtures(fixtures_dir):
+    """{name: recorded state} of the pages that have both <name>.html and <name>.state.json."""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.state.json'))):
+        name = os.path.basename(path)[:-len('.state.json')]
+        if os.path.exists(os.path.join(fixtures_dir, name + '.html')):
+            with open(path, 'r', encoding='utf-8') as f:
+                fixtures[name] = json.load(f)
+    return fixtures
+
+
+def write_synthetic(n, fixtures_dir):
+    """Generated pages as recorded fixtures (the state is the one the page embeds)."""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    pages = synthetic_pages(n)
+    for name, state in pages.items():
+        with open(os.path.join(fixtures_dir, name + '.html'), 'w', encoding='utf-8') as f:
+            f.write(state_page(state))
+        with open(os.path.join(fixtures_dir, name + '.state.json'), 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+    return fixtures_dir
+
+
+def check(fixtures_dir, browser=False, node=False):
+    """Prints one line per page and returns the names of the pages that differ (None without fixtures)."""
+    fixtures = recorded_fixtures(fixtures_dir)
+    if not fixtures:
+        print(f"⚠️ No <name>.html + <name>.state.json pairs in {fixtures_dir}")
+        return None
+    urls = {'football': '/apuestas-deportivas/sports/1', 'listing': '/apuestas-deportivas/sports/1/1/1'}
+    driver = get_driver() if browser else None
+    fetcher = StateFetcher(timeout=10)
+    failed = []
+    try:
+        with StandinServer(fixtures_dir) as server:
+            for name, recorded in fixtures.items():
+                path = urls.get(name) or f"/apuestas-deportivas/match/{name[len('match_'):]}"
+                try:
+                    state, _ = fetcher.state(server.base_url + path)
+                except requests.RequestException as e:
+                    print(f"❌ {name}: {e}")
+                    failed.append(name)
+                    continue
+                result = parsed(name, state)
+                ok = state == recorded and result == parsed(name, recorded)
+                if node:
+                    ok = ok and node_state(os.path.join(fixtures_dir, name + '.html')) == state
+                if driver is not None:
+                    ok = ok and load_page(driver, server.base_url + path) == state
+                print(f"{'✅' if ok else '❌'} {name}: {len((state or {}).get('matches', {}))} matches, "
+                      f"{_size(result)} parsed")
+                if not ok:
+                    failed.append(name)
+    finally:
+        if driver is not None:
+            driver.quit()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the HTTP-extracted state with the browser-read one.")
+    parser.add_argument('--fixtures', help=f"Directory with <name>.html + <name>.state.json (default {FIXTURES_DIR}).")
+    parser.add_argument('--synthetic', type=int, metavar='N',
+                        help="Write N generated fixtures to --fixtures (default a temporary directory) first.")
+    parser.add_argument('--browser', action='store_true', help="Also load every page in Chrome (needs Selenium).")
+    parser.add_argument('--no-node', action='store_true', help="Skip the eval_state.js comparison.")
+    args = parser.parse_args(argv)
+    node = not args.no_node and shutil.which('node') is not None
+
+    fixtures_dir = args.fixtures or FIXTURES_DIR
+    if args.synthetic:
+        fixtures_dir = write_synthetic(args.synthetic, args.fixtures or tempfile.mkdtemp(prefix='winamax_'))
+    failed = check(fixtures_dir, args.browser, node)
+    if failed is None:
+        sys.exit(1)
+    if failed:
+        print(f"❌ {len(failed)} page(s) differ: {', '.join(failed)}")
+        sys.exit(1)
+    engines = ['recorded state'] + ['node'] * node + ['Chrome'] * args.browser
+    print(f"✅ HTTP-extracted states match ({', '.join(engines)}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+// Reads window.PRELOADED_STATE the way the page itself sets it: every inline
+// <script> of the saved HTML runs, in order, in one V8 context whose global is
+// `window` (scripts that need the DOM just fail, as they would without it).
+// Used by check_state_parity.py as a second JS engine next to the browser.
+//
+//   node scripts/eval_state.js page.html            -> state JSON on stdout
+//   node scripts/eval_state.js page.html out.json   -> written to out.json
+const fs = require('fs');
+const vm = require('vm');
+
+const [htmlFile, outFile] = process.argv.slice(2);
+if (!htmlFile) {
+    console.error("usage: node eval_state.js page.html [out.json]");
+    process.exit(2);
+}
+const html = fs.readFileSync(htmlFile, 'utf8');
+
+const context = vm.createContext({});
+context.window = context;
+const SCRIPT = /<script\b([^>]*)>([\s\S]*?)<\/script\s*>/gi;
+const JS_TYPE = /\btype\s*=\s*["']?(?:text\/javascript|application\/javascript|module)\b/i;
+for (const [, attrs, body] of html.matchAll(SCRIPT)) {
+    if (/\bsrc\s*=/i.test(attrs)) continue;
+    if (/\btype\s*=/i.test(attrs) && !JS_TYPE.test(attrs)) continue; // JSON-LD, templates
+    try {
+        vm.runInContext(body, context, { timeout: 5000 });
+    } catch (e) {
+        // Analytics / DOM code: not needed for the state
+    }
+}
+
+const state = context.PRELOADED_STATE;
+if (!state || typeof state !== 'object') {
+    console.error(`No PRELOADED_STATE in ${htmlFile}`);
+    process.exit(1);
+}
+const text = JSON.stringify(state);
+if (outFile) fs.writeFileSync(outFile, text); else process.stdout.write(text);
@@ -0,0 +1,202 @@
+"""
+Local stand-in for the Winamax pages the Premier scraper reads.
+Serves, from a fixtures directory:
+  /apuestas-deportivas/sports/1        -> football.html (or football.json)
+  /apuestas-deportivas/sports/1/1/1    -> listing.html (or listing.json)
+  /apuestas-deportivas/match/<id>      -> match_<id>.html (or match_<id>.json)
+*.html files are recorded pages (scrape_winamax_premier.py --record DIR,
+scraper_winamax.js --record DIR) served as they are; *.json files hold a bare
+PRELOADED_STATE and are wrapped in a minimal page (the *.state.json files saved
+next to recorded pages are not served, see check_state_parity.py). --synthetic N serves N generated Premier League fixtures instead.
+--latency / --fail-rate / --hang-rate make pages slow, answer 503 or stall
+past the scraper timeout, to exercise the worker pool, retries and timeouts.
+
+    python scripts/winamax_standin.py --synthetic 10 --fail-rate 0.2
+    WINAMAX_BASE_URL=http://127.0.0.1:8765 python scrape_winamax_premier.py --workers 4
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(SCRIPT_DIR, '..', 'data', 'fixtures', 'winamax')
+PORT = 8765
+
+_ROUTES = [
+    (re.compile(r'^/apuestas-deportivas/sports/1/?$'), lambda m: 'football'),
+    (re.compile(r'^/apuestas-deportivas/sports/1/1/1/?$'), lambda m: 'listing'),
+    (re.compile(r'^/apuestas-deportivas/match/(\d+)/?$'), lambda m: f"match_{m.group(1)}"),
+]
+
+SYNTHETIC_TEAMS = ['Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Chelsea', 'Crystal Palace',
+                   'Everton', 'Fulham', 'Liverpool', 'Man City', 'Man Utd', 'Newcastle', 'Nottm Forest',
+                   'Tottenham', 'West Ham', 'Wolves', 'Burnley', 'Luton', 'Sheffield Utd']
+
+
+def state_page(state):
+    """Minimal page that sets window.PRELOADED_STATE the way the site does."""
+    payload = json.dumps(state, ensure_ascii=False).replace('</', '<\\/')
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Winamax</title></head><body>"
+            f"<div id=\"root\"></div><script>window.PRELOADED_STATE = {payload};</script></body></html>")
+
+
+def synthetic_pages(n, seed=0):
+    """{name: state} for a listing of `n` fixtures and their match pages (odds in hundredths, as on the site)."""
+    rng = random.Random(seed)
+    fixtures = list(itertools.permutations(SYNTHETIC_TEAMS, 2))
+    rng.shuffle(fixtures)
+    listing, pages = {}, {}
+    for i, (home, away) in enumerate(fixtures[:n]):
+        mid, bid = str(50000000 + i), 90000000 + i
+        oids = [bid * 10 + k for k in range(3)]
+        listing[mid] = {'matchId': int(mid), 'competitor1Name': home, 'competitor2Name': away,
+                        'title': f"{home} - {away}", 'tournamentId': 1, 'mainBetId': bid}
+        pages[f"match_{mid}"] = {
+            'matches': {mid: dict(listing[mid])},
+            'bets': {str(bid): {'betId': bid, 'outcomes': oids}},
+            'outcomes': {str(o): {'label': label, 'odds': rng.randint(120, 900)}
+                         for o, label in zip(oids, ('1', 'X', '2'))},
+        }
+    pages['listing'] = {'matches': listing}
+    pages['football'] = football_page(listing, pages)
+    return pages
+
+
+def football_page(listing, pages):
+    """Football page state (what scraper_winamax.js dumps): the Premier fixtures, LaLiga copies and a live match."""
+    matches, bets, odds = {}, {}, {}
+    for i, (mid, m) in enumerate(listing.items()):
+        page = pages[f"match_{mid}"]
+        for tid, key in ((1, mid), (36, str(int(mid) + 1000000))):
+            bid = m['mainBetId'] + (tid == 36) * 1000000
+            oids = [bid * 10 + k for k in range(3)]
+            matches[key] = dict(m, matchId=int(key), tournamentId=tid, mainBetId=bid, sportId=1,
+                                status='PREMATCH', matchStart=1767225600 + i * 7200)
+            bets[str(bid)] = {'betId': bid, 'outcomes': oids}
+            for o, src in zip(oids, page['bets'][str(m['mainBetId'])]['outcomes']):
+                odds[str(o)] = page['outcomes'][str(src)]['odds'] / 100
+    live = str(59999999)
+    matches[live] = {'matchId': int(live), 'competitor1Name': 'Rayo', 'competitor2Name': 'Getafe', 'tournamentId': 36,
+                     'sportId': 1, 'status': 'LIVE', 'mainBetId': None, 'matchStart': 1767225600}
+    return {'matches': matches, 'bets': bets, 'odds': odds, 'sports': {'1': {'sportName': 'Fútbol'}},
+            'config': {'banner': "Apuesta ya </script> ¡100€!"}}
+
+
+class StandinServer:
+    """The stand-in in a background thread (also usable from a test harness)."""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, pages=None, port=0, latency=0.0, fail_rate=0.0,
+                 hang_rate=0.0, hang=60.0, seed=None):
+        self.fixtures_dir = fixtures_dir
+        self.pages = pages
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.rng = random.Random(seed)
+        self.hits = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def page(self, name):
+        """HTML of a page, or None."""
+        if self.pages is not None:
+            return state_page(self.pages[name]) if name in self.pages else None
+        for ext in ('.html', '.json'):
+            path = os.path.join(self.fixtures_dir, name + ext)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                return text if ext == '.html' else state_page(json.loads(text))
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = next((f(m) for rx, f in _ROUTES for m in [rx.match(self.path.split('?')[0])] if m), None)
+                with server._lock:
+                    server.hits[name] = server.hits.get(name, 0) + 1
+                    roll = server.rng.random()
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.page(name) if name else None
+                if body is None:
+                    return self._send(404, "not found")
+                if roll < server.fail_rate:
+                    return self._send(503, "unavailable")
+                if roll < server.fail_rate + server.hang_rate:
+                    time.sleep(server.hang)
+                self._send(200, body)
+
+            def _send(self, code, text):
+                data = text.encode('utf-8')
+                try:
+                    self.send_response(code)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recorded (or synthetic) Winamax pages locally.")
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="Directory with listing.* and match_<id>.* pages.")
+    parser.add_argument('--synthetic', type=int, metavar='N', help="Serve N generated fixtures instead.")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Share of pages answered with 503.")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="Share of pages that stall for --hang seconds.")
+    parser.add_argument('--hang', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, help="Seed for the failure injection.")
+    args = parser.parse_args(argv)
+
+    pages = synthetic_pages(args.synthetic) if args.synthetic else None
+    server = StandinServer(args.fixtures, pages, args.port, args.latency, args.fail_rate, args.hang_rate,
+                           args.hang, args.seed)
+    print(f"Serving {'synthetic' if pages else args.fixtures} pages on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
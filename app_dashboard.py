@@ -7,7 +7,6 @@ import os
 import json
 import base64
 import requests
-import subprocess
 import sys
 import re
 
@@ -25,8 +24,14 @@ if not os.path.exists(os.path.join(BASE_DIR, 'src')):
 sys.path.append(BASE_DIR)
 try:
     from src.feature_engineering import generate_features
+    from src.feature_store import load_features, map_team_names
 except ImportError:
     pass # Handle gracefully if not needed for core display
+try:
+    from src.odds_history import load_latest
+    from src.process_state import LALIGA_TOURNAMENT_ID
+except ImportError:
+    load_latest, LALIGA_TOURNAMENT_ID = None, 36 # live_odds.json only
 
 # --- UTILS ---
 def clean_html(html):
@@ -134,9 +139,11 @@ h1, h2, h3, h4, h5, h6 {
 
 # --- CONSTANTS ---
 DATA_FILE = os.path.join(BASE_DIR, 'df_final_app.csv')
+FEATURE_STORE_DIR = os.path.join(BASE_DIR, 'data', 'feature_store')
 MODEL_FILE = os.path.join(BASE_DIR, 'modelo_city_group.joblib')
 METRICS_FILE = os.path.join(BASE_DIR, 'validation_metrics.json')
 ODDS_FILE = os.path.join(BASE_DIR, 'data', 'live_odds.json')
+ODDS_HISTORY_FILE = os.path.join(BASE_DIR, 'data', 'odds_history.db')
 LOGOS_DIR = os.path.join(BASE_DIR, 'data', 'logos')
 
 TEAM_MAPPING = {
@@ -208,6 +215,9 @@ MODEL_FEATURES = [
     'Home_Dominance_Avg_L5', 'Away_Dominance_Avg_L5'
 ]
 
+# Match info + raw stats used by the radar chart
+DASHBOARD_COLUMNS = ['Date', 'Season', 'HomeTeam', 'AwayTeam', 'FTR', 'FTHG', 'FTAG', 'HS', 'AS', 'HF', 'AF']
+
 def normalize_text_safe(text):
     if not isinstance(text, str): return text
     import unicodedata
@@ -340,12 +350,11 @@ def get_model_probs_for_match(df, model, home_team, away_team, raw_date=None):
 @st.cache_resource(ttl=3600)
 def load_resources():
     try:
-        df = pd.read_csv(DATA_FILE)
-        df['Date'] = pd.to_datetime(df['Date'])
+        # Only the columns the app uses (Parquet store, CSV fallback)
+        df = load_features(FEATURE_STORE_DIR, DATA_FILE, columns=DASHBOARD_COLUMNS + MODEL_FEATURES)
         
         # Normalize Team Names
-        df['HomeTeam'] = df['HomeTeam'].map(TEAM_MAPPING).fillna(df['HomeTeam'])
-        df['AwayTeam'] = df['AwayTeam'].map(TEAM_MAPPING).fillna(df['AwayTeam'])
+        df = map_team_names(df, TEAM_MAPPING)
         
         for c in MODEL_FEATURES: 
             if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
@@ -438,10 +447,19 @@ def main():
         st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/0/0f/LaLiga_logo_2023.svg/2048px-LaLiga_logo_2023.svg.png", width=100)
         st.markdown("### SETTINGS")
         if st.button("Actualizar Datos"):
+            updated = False
             with st.spinner("Descargando datos oficiales y recalculando métricas..."):
-                subprocess.run([sys.executable, os.path.join(BASE_DIR, "src", "update_system.py")])
-            st.success("¡Base de datos y cuotas actualizadas!")
-            st.rerun()
+                # In-process: no new interpreter, pandas already imported
+                try:
+                    from src.update_system import update_dataset
+                    update_dataset()
+                    updated = True
+                except Exception as e:
+                    st.error(f"Error al actualizar los datos: {e}")
+            if updated:
+                load_resources.clear() # cached features/model are stale now
+                st.success("¡Base de datos y cuotas actualizadas!")
+                st.rerun()
             
     tab1, tab2, tab3 = st.tabs(["LIVE MARKET", "TACTICAL SCOUTING", "HISTORICAL AUDIT"])
     
@@ -463,9 +481,12 @@ def main():
         c3.metric("Signal Strength", "High")
         
         matches = []
-        if os.path.exists(ODDS_FILE):
+        if load_latest is not None:
+            # Latest scrape from the odds history (one keyed row), else live_odds.json
+            matches = load_latest(LALIGA_TOURNAMENT_ID, ODDS_FILE, ODDS_HISTORY_FILE)
+        elif os.path.exists(ODDS_FILE):
             try: matches = json.load(open(ODDS_FILE))
-            except: pass
+            except Exception: pass
             
         if not matches:
              st.info("No live market data available.")
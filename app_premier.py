@@ -6,6 +6,7 @@ import plotly.graph_objects as go
 import os
 import json
 import re
+import sys
 
 # --- PATH SETUP ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -21,6 +22,15 @@ else:
 DATA_FILE = os.path.join(PREMIER_DIR, 'df_premier_features.csv')
 MODEL_FILE = os.path.join(PREMIER_DIR, 'modelo_premier.joblib')
 ODDS_FILE = os.path.join(PREMIER_DIR, 'data', 'live_odds.json')
+# The odds history is kept by the LaLiga odds processor (one parse serves both leagues)
+LALIGA_DIR = os.path.join(os.path.dirname(PREMIER_DIR), 'LaLiga')
+ODDS_HISTORY_FILE = os.path.join(LALIGA_DIR, 'data', 'odds_history.db')
+sys.path.append(LALIGA_DIR)
+try:
+    from src.odds_history import load_latest
+    from src.process_state import PREMIER_TOURNAMENT_ID
+except ImportError:
+    load_latest, PREMIER_TOURNAMENT_ID = None, 1
 
 # Config moved to main block
 
@@ -486,7 +496,10 @@ def main():
         """), unsafe_allow_html=True)
 
         matches = []
-        if os.path.exists(ODDS_FILE):
+        if load_latest is not None:
+            # Latest scrape from the odds history (one keyed row), else live_odds.json
+            matches = load_latest(PREMIER_TOURNAMENT_ID, ODDS_FILE, ODDS_HISTORY_FILE)
+        elif os.path.exists(ODDS_FILE):
             try:
                 matches = json.load(open(ODDS_FILE))
             except Exception:
@@ -0,0 +1,10 @@
+"""
+Offline benchmarks for the feature pipelines.
+Generates synthetic football-data style leagues (1x, 10x, 100x the real LaLiga
+history), runs the LaLiga engine stage by stage plus the two Premier builders,
+and writes a JSON report (wall/CPU time and peak memory per stage) that can be
+compared against the report of another commit.
+
+    python -m benchmarks --scales 1 10 --out bench.json
+    python -m benchmarks --scales 1 --baseline bench_main.json
+"""
@@ -0,0 +1,89 @@
+"""
+Benchmarked pipelines. Each one is a list of (stage, callable) run in order on
+a shared context, so stages can be timed one by one.
+  laliga:               ProFeatureEngine stages + static data + ratings (generate_features)
+  premier_features:     Premier/build_premier_features.main on per-season E0 CSVs
+  premier_consolidate:  Premier/scripts/4_consolidate_dataset.main on matches_raw.csv
+The Premier scripts are loaded from their files with the input/output paths
+pointed at a temporary directory; their console output is discarded.
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LALIGA_DIR = os.path.join(ROOT_DIR, 'LaLiga')
+PREMIER_DIR = os.path.join(ROOT_DIR, 'Premier')
+
+sys.path.append(LALIGA_DIR)
+from src.feature_engineering import (ProFeatureEngine, H2H_WINDOWS, enrich_static_data,
+                                     calculate_ratings, new_feature_state, _drop_leakage)
+
+
+def _load_script(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def laliga_stages(df, work_dir):
+    data_dir = os.path.join(work_dir, 'laliga_data') # No static JSON: defaults, cache written here
+    os.makedirs(data_dir, exist_ok=True)
+    ctx = {}
+
+    def init():
+        ctx['eng'] = ProFeatureEngine(df)
+
+    def static():
+        ctx['df'] = enrich_static_data(ctx['eng'].df, data_dir)
+
+    def ratings():
+        ctx['df'] = _drop_leakage(calculate_ratings(ctx['df'], ctx['state']))
+
+    return [
+        ('engine_init', init),
+        ('base_metrics', lambda: ctx['eng']._calculate_base_metrics()),
+        ('rolling', lambda: ctx['eng']._rolling_features()),
+        ('h2h', lambda: ctx['eng']._h2h_features(H2H_WINDOWS)),
+        ('snapshot', lambda: ctx.__setitem__('state', ctx['eng'].snapshot(new_feature_state()))),
+        ('static_data', static),
+        ('ratings', ratings),
+    ]
+
+
+def premier_features_stages(df, work_dir):
+    data_dir = os.path.join(work_dir, 'premier_data')
+
+    def run():
+        module = _load_script(os.path.join(PREMIER_DIR, 'build_premier_features.py'), '_bench_premier_features')
+        module.DATA_DIR = data_dir
+        module.OUTPUT_FILE = os.path.join(work_dir, 'df_premier_features.csv')
+        with contextlib.redirect_stdout(io.StringIO()):
+            module.main()
+
+    return [('build_premier_features', run)]
+
+
+def premier_consolidate_stages(df, work_dir):
+    processed = os.path.join(work_dir, 'premier_data', 'processed')
+
+    def run():
+        module = _load_script(os.path.join(PREMIER_DIR, 'scripts', '4_consolidate_dataset.py'), '_bench_consolidate')
+        module.MATCHES_FILE = os.path.join(processed, 'matches_raw.csv')
+        module.FIFA_FILE = os.path.join(processed, 'fifa_ratings_raw.json')
+        module.MARKET_FILE = os.path.join(processed, 'market_values_raw.json')
+        module.OUTPUT_FILE = os.path.join(work_dir, 'df_premier_complete.csv')
+        with contextlib.redirect_stdout(io.StringIO()):
+            module.main()
+
+    return [('consolidate_dataset', run)]
+
+
+PIPELINES = {
+    'laliga': laliga_stages,
+    'premier_features': premier_features_stages,
+    'premier_consolidate': premier_consolidate_stages,
+}
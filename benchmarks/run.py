@@ -0,0 +1,194 @@
+"""
+Benchmark runner: synthetic data per scale -> every pipeline stage timed
+(best wall/CPU of --repeat runs) -> one extra pass under tracemalloc for the
+peak Python/numpy memory of each stage -> JSON report.
+With --baseline, the new report is compared stage by stage against an older one.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    from benchmarks.synthetic import scale_config, synthetic_matches, write_premier_inputs, TEAMS_PER_DIVISION, REAL_SEASONS
+    from benchmarks.pipelines import PIPELINES, ROOT_DIR
+except ImportError:
+    from synthetic import scale_config, synthetic_matches, write_premier_inputs, TEAMS_PER_DIVISION, REAL_SEASONS
+    from pipelines import PIPELINES, ROOT_DIR
+
+REPORT_VERSION = 1
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _versions():
+    versions = {'python': platform.python_version()}
+    for name in ('pandas', 'numpy', 'numba', 'pyarrow'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_stages(stages, repeat=1, memory=True, make_stages=None):
+    """
+    Times a list of (name, fn) stages. `make_stages` rebuilds fresh stages for
+    each repetition (stages mutate a shared context). Returns one dict per stage.
+    """
+    results = {name: {'stage': name, 'wall_s': float('inf'), 'cpu_s': float('inf')} for name, _ in stages}
+    for i in range(repeat):
+        run = stages if i == 0 else make_stages()
+        for name, fn in run:
+            w0, c0 = time.perf_counter(), time.process_time()
+            fn()
+            wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+            results[name]['wall_s'] = min(results[name]['wall_s'], wall)
+            results[name]['cpu_s'] = min(results[name]['cpu_s'], cpu)
+
+    if memory:
+        # Separate pass: tracemalloc slows Python-level loops down, so it never overlaps the timings
+        tracemalloc.start()
+        try:
+            for name, fn in make_stages():
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                fn()
+                results[name]['peak_mb'] = (tracemalloc.get_traced_memory()[1] - base) / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return [results[name] for name, _ in stages]
+
+
+def run_benchmarks(scales, pipelines=None, repeat=1, memory=True, seed=0,
+                   teams_per_division=TEAMS_PER_DIVISION, n_seasons=REAL_SEASONS, log=print):
+    pipelines = pipelines or list(PIPELINES)
+    report = {
+        'version': REPORT_VERSION,
+        'meta': {
+            'commit': _git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            **_versions(),
+        },
+        'config': {'scales': list(scales), 'pipelines': pipelines, 'repeat': repeat, 'memory': memory,
+                   'seed': seed, 'teams_per_division': teams_per_division, 'seasons': n_seasons},
+        'results': [],
+    }
+
+    # Warm-up on a tiny league so imports and numba compilation are not timed
+    with tempfile.TemporaryDirectory(prefix='bench_') as work_dir:
+        tiny = synthetic_matches(4, 2, teams_per_division=4, seed=seed)
+        write_premier_inputs(tiny, os.path.join(work_dir, 'premier_data'))
+        for pipeline in pipelines:
+            for _, fn in PIPELINES[pipeline](tiny, work_dir):
+                fn()
+
+    for scale in scales:
+        n_teams, seasons = scale_config(scale, teams_per_division, n_seasons)
+        df = synthetic_matches(n_teams, seasons, teams_per_division=teams_per_division, seed=seed)
+        log(f"📊 Scale {scale}x: {len(df)} matches, {n_teams} teams, {seasons} seasons")
+
+        with tempfile.TemporaryDirectory(prefix='bench_') as work_dir:
+            write_premier_inputs(df, os.path.join(work_dir, 'premier_data'))
+            for pipeline in pipelines:
+                make = lambda: PIPELINES[pipeline](df, work_dir)
+                stages = run_stages(make(), repeat=repeat, memory=memory, make_stages=make)
+                total = sum(s['wall_s'] for s in stages)
+                report['results'].append({
+                    'pipeline': pipeline, 'scale': scale, 'rows': len(df),
+                    'teams': n_teams, 'seasons': seasons,
+                    'total_wall_s': total, 'stages': stages,
+                })
+                log(f"   -> {pipeline:<20} {total:8.3f}s")
+
+    report['meta']['peak_rss_mb'] = _peak_rss_mb()
+    return report
+
+
+def compare_reports(old, new, threshold=1.25):
+    """
+    Rows (pipeline, scale, stage, old_s, new_s, ratio) for stages present in both
+    reports, plus whether any stage got slower than `threshold` x.
+    """
+    def index(report):
+        return {(r['pipeline'], r['scale'], s['stage']): s['wall_s']
+                for r in report['results'] for s in r['stages']}
+    old_idx, new_idx = index(old), index(new)
+    rows, regressed = [], False
+    for key in new_idx:
+        if key not in old_idx: continue
+        ratio = new_idx[key] / old_idx[key] if old_idx[key] > 0 else float('inf')
+        rows.append((*key, old_idx[key], new_idx[key], ratio))
+        # Sub-10ms stages are noise
+        regressed |= ratio > threshold and new_idx[key] > 0.01
+    return rows, regressed
+
+
+def print_report(report):
+    print(f"\n{'pipeline':<20} {'scale':>5} {'stage':<24} {'wall_s':>9} {'cpu_s':>9} {'peak_mb':>9}")
+    for r in report['results']:
+        for s in r['stages']:
+            peak = f"{s['peak_mb']:9.1f}" if 'peak_mb' in s else f"{'-':>9}"
+            print(f"{r['pipeline']:<20} {r['scale']:>5} {s['stage']:<24} {s['wall_s']:9.3f} {s['cpu_s']:9.3f} {peak}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the feature pipelines on synthetic leagues.")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+                        help="Multiples of the real league (20 teams x 25 seasons). Default: 1 10")
+    parser.add_argument('--pipelines', nargs='+', choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument('--seasons', type=int, default=REAL_SEASONS)
+    parser.add_argument('--teams-per-division', type=int, default=TEAMS_PER_DIVISION)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per stage, best time kept.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='benchmark_report.json')
+    parser.add_argument('--baseline', help="Older report to compare against.")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Slowdown ratio that counts as a regression (with --baseline).")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.scales, args.pipelines, repeat=args.repeat, memory=not args.no_memory,
+                            seed=args.seed, teams_per_division=args.teams_per_division, n_seasons=args.seasons)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\n💾 Report saved to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        rows, regressed = compare_reports(old, report, args.threshold)
+        print(f"\nvs {args.baseline} ({old['meta'].get('commit')}):")
+        for pipeline, scale, stage, old_s, new_s, ratio in rows:
+            flag = '  ⚠️' if ratio > args.threshold and new_s > 0.01 else ''
+            print(f"   {pipeline:<20} {scale:>5} {stage:<24} {old_s:9.3f} -> {new_s:9.3f}  x{ratio:.2f}{flag}")
+        if regressed:
+            print("❌ Regressions above threshold.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Synthetic leagues in football-data.co.uk format (SP1/E0 columns).
+Teams are split into divisions of `teams_per_division` that play a double
+round-robin every season, one round per week from mid August, so scaling the
+team count scales the number of matches without pushing dates past what pandas
+can represent. Goals, shots, fouls, cards, corners and B365 odds are drawn from
+per-team strengths with a fixed seed, so the same arguments give the same frame.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+TEAMS_PER_DIVISION = 20
+REAL_SEASONS = 25 # LaLiga history used by the app: 2000/01 -> 2024/25
+
+
+def scale_config(scale, teams_per_division=TEAMS_PER_DIVISION, n_seasons=REAL_SEASONS):
+    """(n_teams, n_seasons) for `scale` x the real league (20 teams x 25 seasons)."""
+    return teams_per_division * int(scale), n_seasons
+
+
+def _round_robin(k):
+    """Double round-robin for k teams (circle method): arrays home, away, round."""
+    teams = list(range(k)) + ([None] if k % 2 else [])
+    n = len(teams)
+    home, away, rnd = [], [], []
+    for r in range(n - 1):
+        for i in range(n // 2):
+            t1, t2 = teams[i], teams[n - 1 - i]
+            if t1 is None or t2 is None: continue
+            if r % 2: t1, t2 = t2, t1
+            home.append(t1); away.append(t2); rnd.append(r)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    # Second half: same fixtures, venues swapped
+    first = len(home)
+    home, away = home + away[:first], away[:first] + home[:first]
+    rnd = rnd + [r + n - 1 for r in rnd]
+    return np.array(home), np.array(away), np.array(rnd)
+
+
+def synthetic_matches(n_teams=TEAMS_PER_DIVISION, n_seasons=REAL_SEASONS, start_year=2000,
+                      teams_per_division=TEAMS_PER_DIVISION, seed=0):
+    """Match-level frame: Div, Date, HomeTeam, AwayTeam, FTHG..AR, B365H/D/A, Season. Sorted by Date."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f'Team {i:04d}' for i in range(n_teams)], dtype=object)
+    sizes = [teams_per_division] * (n_teams // teams_per_division)
+    if n_teams % teams_per_division: sizes.append(n_teams % teams_per_division)
+
+    att = rng.normal(0, 0.25, n_teams)
+    dfn = rng.normal(0, 0.25, n_teams)
+    frames = []
+    for s in range(n_seasons):
+        # Strengths drift between seasons and divisions are reshuffled
+        att += rng.normal(0, 0.05, n_teams)
+        dfn += rng.normal(0, 0.05, n_teams)
+        order = rng.permutation(n_teams)
+        offset = 0
+        season_start = pd.Timestamp(start_year + s, 8, 15)
+        for d, k in enumerate(sizes):
+            h, a, r = _round_robin(k)
+            members = order[offset:offset + k]
+            offset += k
+            slot = np.arange(len(r)) % 3 # Fri/Sat/Sun
+            frames.append(pd.DataFrame({
+                'Div': f'D{d}',
+                'Date': season_start + pd.to_timedelta(r * 7 + slot, unit='D'),
+                'h': members[h], 'a': members[a],
+                'Season': start_year + s,
+            }))
+    df = pd.concat(frames, ignore_index=True)
+    h, a = df.pop('h').to_numpy(), df.pop('a').to_numpy()
+    n = len(df)
+
+    lam_h = np.exp(0.30 + att[h] - dfn[a])
+    lam_a = np.exp(0.05 + att[a] - dfn[h])
+    fthg = rng.poisson(lam_h)
+    ftag = rng.poisson(lam_a)
+    hst = fthg + rng.poisson(2.5 * lam_h)
+    ast = ftag + rng.poisson(2.5 * lam_a)
+
+    df['HomeTeam'] = names[h]
+    df['AwayTeam'] = names[a]
+    df['FTHG'] = fthg
+    df['FTAG'] = ftag
+    df['FTR'] = np.where(fthg > ftag, 'H', np.where(fthg == ftag, 'D', 'A'))
+    df['HS'] = hst + rng.poisson(7, n)
+    df['AS'] = ast + rng.poisson(6, n)
+    df['HST'] = hst
+    df['AST'] = ast
+    df['HF'] = rng.poisson(12, n)
+    df['AF'] = rng.poisson(13, n)
+    df['HC'] = rng.poisson(5.5, n)
+    df['AC'] = rng.poisson(4.5, n)
+    df['HY'] = rng.poisson(2.0, n)
+    df['AY'] = rng.poisson(2.3, n)
+    df['HR'] = rng.binomial(1, 0.05, n)
+    df['AR'] = rng.binomial(1, 0.06, n)
+
+    # Bookmaker odds from the true rates with a ~5% margin
+    p_draw = np.full(n, 0.26)
+    p_home = (1 - p_draw) / (1 + np.exp(-1.5 * (lam_h - lam_a)))
+    p_away = 1 - p_draw - p_home
+    for col, p in (('B365H', p_home), ('B365D', p_draw), ('B365A', p_away)):
+        df[col] = np.round(1 / (np.clip(p, 0.02, None) * 1.05), 2)
+
+    cols = ['Div', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'HS', 'AS', 'HST', 'AST',
+            'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR', 'B365H', 'B365D', 'B365A', 'Season']
+    return df[cols].sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def synthetic_static(df, seed=0):
+    """FIFA overall and market value per (season, team), as {season: {team: value}} dicts."""
+    rng = np.random.default_rng(seed + 1)
+    fifa, market = {}, {}
+    for season, g in df.groupby('Season'):
+        teams = pd.unique(g[['HomeTeam', 'AwayTeam']].to_numpy().ravel())
+        ova = rng.integers(68, 86, len(teams))
+        value = rng.uniform(40, 1200, len(teams))
+        fifa[str(season)] = {t: int(o) for t, o in zip(teams, ova)}
+        market[str(season)] = {t: f'€{v:.2f}m' for t, v in zip(teams, value)}
+    return fifa, market
+
+
+def write_premier_inputs(df, root):
+    """
+    Writes the inputs of both Premier builders under `root`:
+      E0-YYYY-YY.csv per season (build_premier_features.py)
+      processed/matches_raw.csv + FIFA/market JSON (scripts/4_consolidate_dataset.py)
+    """
+    processed = os.path.join(root, 'processed')
+    os.makedirs(processed, exist_ok=True)
+
+    raw = df.drop(columns=['Season']).copy()
+    raw['Date'] = df['Date'].dt.strftime('%d/%m/%Y')
+    for season, idx in df.groupby('Season').groups.items():
+        name = f'E0-{season}-{(season + 1) % 100:02d}.csv'
+        raw.loc[idx].to_csv(os.path.join(root, name), index=False, encoding='latin1')
+
+    df.drop(columns=['Season']).to_csv(os.path.join(processed, 'matches_raw.csv'), index=False)
+    fifa, market = synthetic_static(df)
+    with open(os.path.join(processed, 'fifa_ratings_raw.json'), 'w', encoding='utf-8') as f:
+        json.dump(fifa, f, ensure_ascii=False)
+    with open(os.path.join(processed, 'market_values_raw.json'), 'w', encoding='utf-8') as f:
+        json.dump(market, f, ensure_ascii=False)